@@ -0,0 +1,399 @@
+"""Benchmark suite for the calculation, database, PDF and startup paths
+
+Run from the repository root:
+
+    uv run python -m benchmarks.run --output benchmark_results.json
+    uv run python -m benchmarks.run --compare baseline.json
+
+Synthetic openings are generated from a fixed seed, the database benchmarks
+use a temporary SQLite file, and results are written as JSON so runs from
+different commits can be compared with --compare. The startup benchmark
+launches main.py with the environment's DATABASE_URL, so point it at the
+database setup (or an unreachable one) the measurement should reflect.
+"""
+from typing import Callable, Dict, List, Optional
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel, create_engine
+from calculations import (
+    calculate_new_width,
+    calculate_new_height,
+    calculate_wing,
+    calculate_rope,
+    calculate_net,
+    calculate_batch,
+)
+from config import COLOR_OPTIONS
+from frame_rules import frame_rules
+import services.database_service as database_service
+from services.database_service import CalculationFilter, DatabaseService
+from services.circuit_breaker import CircuitState
+
+DEFAULT_SEED = 1234
+DEFAULT_OPENINGS = 100_000
+DEFAULT_DB_ROWS = 5_000
+DEFAULT_PDF_ROWS = (10, 1_000, 10_000)
+REGRESSION_THRESHOLD = 1.2
+STARTUP_TIMEOUT = 60
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def make_openings(count: int, seed: int = DEFAULT_SEED) -> List[tuple]:
+    """Synthetic (width, height, frame, color) openings, identical for a given seed"""
+    rng = random.Random(seed)
+    frames = frame_rules.current.frames
+    return [
+        (rng.randint(300, 2500), rng.randint(300, 2500), rng.choice(frames), rng.choice(COLOR_OPTIONS))
+        for _ in range(count)
+    ]
+
+def make_calculation_data(openings: List[tuple]) -> List[dict]:
+    return [
+        {
+            'selected_width': width,
+            'selected_height': height,
+            'frame_type': frame,
+            'color': color,
+            'calculated_width': calculate_new_width(width, frame),
+            'calculated_height': calculate_new_height(height, frame),
+            'wing_size': calculate_wing(calculate_new_height(height, frame), frame),
+            'rope_length': calculate_rope(width, height),
+            'net_size': float(calculate_net(width, frame)),
+            'customer_name': f'Stranka {index % 200:03d}',
+        }
+        for index, (width, height, frame, color) in enumerate(openings)
+    ]
+
+def make_rows(calculations_data: List[dict]) -> List[dict]:
+    """Table rows as the UI passes them to the PDF service"""
+    return [
+        {
+            'id': index,
+            'selected_width': data['selected_width'],
+            'selected_height': data['selected_height'],
+            'frame': data['frame_type'],
+            'color': data['color'],
+            'quantity': data.get('quantity', 1),
+            'calculated_width': data['calculated_width'],
+            'calculated_height': data['calculated_height'],
+            'wing': data['wing_size'],
+            'rope': data['rope_length'],
+            'net': data['net_size'],
+        }
+        for index, data in enumerate(calculations_data, start=1)
+    ]
+
+def measure(func: Callable[[], object], items: int, repeat: int, setup: Optional[Callable[[], object]] = None) -> dict:
+    """Time `func` `repeat` times; `setup` runs untimed before each call"""
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return summarize(timings, items)
+
+def summarize(timings: List[float], items: int) -> dict:
+    median = statistics.median(timings)
+    return {
+        'items': items,
+        'repeat': len(timings),
+        'min_s': min(timings),
+        'median_s': median,
+        'mean_s': statistics.fmean(timings),
+        'max_s': max(timings),
+        'per_item_us': median / items * 1e6 if items else None,
+    }
+
+def bench_calculations(count: int, repeat: int, seed: int) -> Dict[str, dict]:
+    openings = make_openings(count, seed)
+
+    def scalar():
+        for width, height, frame, _ in openings:
+            new_height = calculate_new_height(height, frame)
+            calculate_new_width(width, frame)
+            calculate_wing(new_height, frame)
+            calculate_rope(width, height)
+            calculate_net(width, frame)
+
+    widths = [opening[0] for opening in openings]
+    heights = [opening[1] for opening in openings]
+    frames = [opening[2] for opening in openings]
+    return {
+        'calculations.scalar': measure(scalar, count, repeat),
+        'calculations.batch': measure(lambda: calculate_batch(widths, heights, frames), count, repeat),
+    }
+
+def bench_database(count: int, repeat: int, seed: int, directory: str) -> Dict[str, dict]:
+    """DatabaseService against a SQLite file, each repeat on an emptied table"""
+    engine = create_engine(f"sqlite:///{os.path.join(directory, 'benchmark.db')}")
+    SQLModel.metadata.create_all(engine)
+    original_engine = database_service.engine
+    database_service.engine = engine
+    calculations_data = make_calculation_data(make_openings(count, seed))
+    single_count = min(count, 500)
+
+    def empty_table():
+        SQLModel.metadata.drop_all(engine)
+        SQLModel.metadata.create_all(engine)
+
+    def fill_table():
+        empty_table()
+        DatabaseService.create_calculations(calculations_data)
+
+    def walk_pages():
+        after = None
+        while True:
+            page = DatabaseService.get_calculations_page(50, after=after)
+            if len(page) < 50:
+                return
+            after = (page[-1].created_at, page[-1].id)
+
+    searches = [
+        CalculationFilter(customer='Stranka 04'),
+        CalculationFilter(min_width=1000, max_width=1200, min_height=1000, max_height=1200),
+        CalculationFilter(frame_type=frame_rules.current.frames[0], color=COLOR_OPTIONS[0]),
+        CalculationFilter(customer='stranka 1', color=COLOR_OPTIONS[1], min_width=500),
+    ]
+
+    def run_searches():
+        for filters in searches:
+            DatabaseService.search_calculations(filters, 50)
+
+    def delete_all():
+        DatabaseService.delete_calculations([calc.id for calc in DatabaseService.get_all_calculations()])
+
+    try:
+        return {
+            'database.create_calculation': measure(
+                lambda: [DatabaseService.create_calculation(data) for data in calculations_data[:single_count]],
+                single_count, repeat, setup=empty_table),
+            'database.create_calculations': measure(
+                lambda: DatabaseService.create_calculations(calculations_data), count, repeat, setup=empty_table),
+            'database.get_all_calculations': measure(
+                DatabaseService.get_all_calculations, count, repeat, setup=fill_table),
+            'database.get_calculations_page': measure(walk_pages, count, repeat, setup=fill_table),
+            'database.search_calculations': measure(run_searches, len(searches), repeat, setup=fill_table),
+            'database.delete_calculations': measure(delete_all, count, repeat, setup=fill_table),
+        }
+    finally:
+        database_service.engine = original_engine
+        engine.dispose()
+
+def bench_pdf(row_counts: List[int], repeat: int, seed: int) -> Dict[str, dict]:
+    """PdfService.generate_pdf with the document cache cleared before every run"""
+    from services.pdf_service import PdfService, load_weasyprint, pdf_cache
+    try:
+        # pdf_service imports WeasyPrint lazily, so load it here to skip the group cleanly
+        load_weasyprint()
+    except (ImportError, OSError) as e:
+        # WeasyPrint needs the pango/cairo system libraries
+        return {f'pdf.generate_pdf.{rows}': {'skipped': str(e)} for rows in row_counts}
+
+    results = {}
+    for row_count in row_counts:
+        rows = make_rows(make_calculation_data(make_openings(row_count, seed)))
+        runs = repeat if row_count <= 1_000 else 1
+        sizes = []
+        result = measure(lambda: sizes.append(len(PdfService.generate_pdf(rows, 'Benchmark'))),
+                         row_count, runs, setup=pdf_cache.clear)
+        result['pdf_bytes'] = sizes[-1]
+        results[f'pdf.generate_pdf.{row_count}'] = result
+    return results
+
+def bench_event_loop(count: int, seed: int, directory: str, interval: float = 0.001) -> Dict[str, dict]:
+    """Scheduling lag of a ticker task while UI handlers run against aiosqlite
+
+    The handlers are a CSV import, history paging and a full history walk,
+    i.e. the work done by the import, table and export handlers.
+    """
+    from services.import_service import ImportService
+    from services.history_service import HistoryPager, iter_history_row_chunks
+
+    csv_file = io.StringIO()
+    csv_file.write('width,height,frame,color\n')
+    for width, height, frame, color in make_openings(count, seed):
+        csv_file.write(f'{width},{height},{frame},{color}\n')
+    csv_file.seek(0)
+
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(directory, 'event_loop.db')}")
+        async with engine.begin() as connection:
+            await connection.run_sync(SQLModel.metadata.create_all)
+        original_engine, original_state = database_service.async_engine, database_service.db_circuit_breaker.state
+        database_service.async_engine = engine
+        database_service.db_circuit_breaker.state = CircuitState.CLOSED
+
+        lags = []
+        stop = asyncio.Event()
+
+        async def ticker():
+            while not stop.is_set():
+                start = time.perf_counter()
+                await asyncio.sleep(interval)
+                lags.append(time.perf_counter() - start - interval)
+
+        async def handlers():
+            await ImportService.import_csv(csv_file)
+            pager = HistoryPager()
+            for page in range(1, 21):
+                await pager.fetch(page)
+            async for _ in iter_history_row_chunks(500):
+                pass
+
+        try:
+            ticker_task = asyncio.create_task(ticker())
+            start = time.perf_counter()
+            await handlers()
+            elapsed = time.perf_counter() - start
+            stop.set()
+            await ticker_task
+        finally:
+            database_service.async_engine = original_engine
+            database_service.db_circuit_breaker.state = original_state
+            await engine.dispose()
+
+        lags.sort()
+        return {
+            'items': count,
+            'handlers_s': elapsed,
+            'ticks': len(lags),
+            'lag_median_ms': statistics.median(lags) * 1e3,
+            'lag_p95_ms': lags[int(len(lags) * 0.95) - 1] * 1e3 if len(lags) >= 20 else max(lags) * 1e3,
+            'lag_max_ms': max(lags) * 1e3,
+        }
+
+    return {'event_loop.handlers_lag': asyncio.run(scenario())}
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def time_to_first_response(timeout: float = STARTUP_TIMEOUT) -> float:
+    """Launch main.py and return the seconds until `/` answers"""
+    port = free_port()
+    url = f'http://127.0.0.1:{port}/'
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, 'main.py'], cwd=REPOSITORY_ROOT, env={**os.environ, 'PORT': str(port)},
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f'main.py exited with code {process.returncode} before answering')
+            try:
+                with urllib.request.urlopen(url, timeout=timeout):
+                    return time.perf_counter() - start
+            except urllib.error.HTTPError:
+                return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.02)
+        raise TimeoutError(f'main.py did not answer within {timeout}s')
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+def bench_startup(repeat: int) -> Dict[str, dict]:
+    """Cold start of the server, as after a container restart or a deploy"""
+    try:
+        timings = [time_to_first_response() for _ in range(repeat)]
+    except (RuntimeError, TimeoutError) as e:
+        return {'startup.first_response': {'skipped': str(e)}}
+    return {'startup.first_response': summarize(timings, 1)}
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float = REGRESSION_THRESHOLD) -> List[str]:
+    """Print median time ratios against a baseline and return the regressed benchmarks"""
+    regressions = []
+    for name, result in results.items():
+        key = 'median_s' if 'median_s' in result else 'lag_p95_ms'
+        previous = baseline.get(name, {}).get(key)
+        current = result.get(key)
+        if not previous or current is None:
+            continue
+        ratio = current / previous
+        flag = ' REGRESSION' if ratio > threshold else ''
+        print(f'{name:40} {previous:12.6f} -> {current:12.6f} {key} ({ratio:.2f}x){flag}')
+        if flag:
+            regressions.append(name)
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', default='benchmark_results.json', help='JSON file to write results to')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--only', nargs='+', choices=['calculations', 'database', 'pdf', 'event_loop', 'startup'],
+                        help='run only these groups')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--openings', type=int, default=DEFAULT_OPENINGS)
+    parser.add_argument('--db-rows', type=int, default=DEFAULT_DB_ROWS)
+    parser.add_argument('--pdf-rows', type=int, nargs='+', default=list(DEFAULT_PDF_ROWS))
+    args = parser.parse_args(argv)
+    groups = set(args.only or ['calculations', 'database', 'pdf', 'event_loop', 'startup'])
+    baseline = None
+    if args.compare:
+        # Read first, the baseline may be the file this run overwrites
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)['results']
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        if 'calculations' in groups:
+            results.update(bench_calculations(args.openings, args.repeat, args.seed))
+        if 'database' in groups:
+            results.update(bench_database(args.db_rows, args.repeat, args.seed, directory))
+        if 'pdf' in groups:
+            results.update(bench_pdf(args.pdf_rows, args.repeat, args.seed))
+        if 'event_loop' in groups:
+            results.update(bench_event_loop(args.db_rows, args.seed, directory))
+        if 'startup' in groups:
+            results.update(bench_startup(min(args.repeat, 3)))
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as output_file:
+        json.dump(report, output_file, indent=2)
+
+    for name, result in results.items():
+        print(f'{name:40} {json.dumps(result)}')
+    print(f'Results written to {args.output}')
+
+    if baseline is not None and compare(results, baseline):
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,40 +1,80 @@
-def calculate_new_width(width, frame):
-    if frame == '18mm':
-        return (int(width) - 30)
-    elif frame == '25mm':
-        return (int(width) - 24)
-    elif frame == '26mm':
-        return (int(width) - 40)
-    elif frame == '18mm-flis':
-        return (int(width) - 62)
-    else:
-        raise ValueError("Invalid frame value")
-    
-def calculate_new_height(height, frame):
-    if frame == '18mm':
-        return (int(height) - 50)
-    elif frame == '25mm':
-        return (int(height) - 55)
-    elif frame == '26mm':
-        return (int(height) - 77)
-    elif frame == '18mm-flis':
-        return (int(height) - 62)
-    else:
-        raise ValueError("Invalid frame value")
-
-def calculate_wing(new_height, frame):
-    if frame == '18mm-flis':
-        return (int(new_height) - 11)
-    else:
-        return (int(new_height) - 7)
+import functools
+import numpy as np
+from frame_rules import frame_rules
+
+# Every function takes an optional RuleSet; by default it uses the current
+# rules. Pass one snapshot of frame_rules.current to all calls made for the
+# same opening so a reload in between cannot mix two rule sets.
+
+def calculate_new_width(width, frame, rules=None):
+    return int(width) - (rules or frame_rules.current).rule(frame).width_offset
+
+def calculate_new_height(height, frame, rules=None):
+    return int(height) - (rules or frame_rules.current).rule(frame).height_offset
+
+def calculate_wing(new_height, frame, rules=None):
+    return int(new_height) - (rules or frame_rules.current).rule(frame).wing_offset
 
 def calculate_rope(width, height):
     return((int(width) + int(height)) * 2)
 
-def calculate_net(width, frame):
-    if frame == '18mm' or frame == '18mm-flis':
-        return (int(width) / 2)
-    elif frame == '25mm' or frame == '26mm':
-        return (int(width) / 3)
-    else:
-        raise ValueError("Invalid frame value")
\ No newline at end of file
+def calculate_net(width, frame, rules=None):
+    return int(width) / (rules or frame_rules.current).rule(frame).net_divisor
+
+@functools.lru_cache(maxsize=4096)
+def _calculate_opening(width, height, frame, rules):
+    # Keyed by the RuleSet object, so a reload starts with fresh entries
+    rule = rules.rule(frame)
+    new_height = height - rule.height_offset
+    return width - rule.width_offset, new_height, new_height - rule.wing_offset, calculate_rope(width, height), width / rule.net_divisor
+
+def calculate_opening(width, height, frame, rules=None):
+    """Calculate every result column of one opening with a single rule set
+
+    Returns a dict keyed by the table column names plus `rule_version`.
+    Results are memoized per (width, height, frame) and rule set.
+    """
+    rules = rules or frame_rules.current
+    new_width, new_height, wing, rope, net = _calculate_opening(int(width), int(height), frame, rules)
+    return {
+        'calculated_width': new_width,
+        'calculated_height': new_height,
+        'wing': wing,
+        'rope': rope,
+        'net': net,
+        'rule_version': rules.version,
+    }
+
+def _frame_indices(frames, rules):
+    frames = np.asarray(frames, dtype=object)
+    unique_frames, inverse = np.unique(frames, return_inverse=True)
+    try:
+        lookup = np.array([rules.index[frame] for frame in unique_frames], dtype=np.intp)
+    except KeyError:
+        raise ValueError("Invalid frame value") from None
+    return lookup[inverse].reshape(frames.shape)
+
+def calculate_batch(widths, heights, frames, rules=None):
+    """Calculate all result columns for many openings in one vectorized pass.
+
+    Returns a dict of NumPy arrays keyed by the table column names
+    (calculated_width, calculated_height, wing, rope, net).
+    """
+    rules = rules or frame_rules.current
+    widths = np.asarray(widths).astype(np.int64)
+    heights = np.asarray(heights).astype(np.int64)
+    if widths.shape != heights.shape:
+        raise ValueError("Widths and heights must have the same length")
+    index = _frame_indices(frames, rules)
+    if index.shape != widths.shape:
+        raise ValueError("Frames must have the same length as widths")
+
+    new_width = widths - rules.width_offsets[index]
+    new_height = heights - rules.height_offsets[index]
+    return {
+        'calculated_width': new_width,
+        'calculated_height': new_height,
+        'wing': new_height - rules.wing_offsets[index],
+        'rope': (widths + heights) * 2,
+        'net': widths / rules.net_divisors[index],
+    }
@@ -0,0 +1,61 @@
+import { convertDynamicProperties } from "../../static/utils/dynamic_properties.js";
+
+// q-table whose rows are kept here and changed by applyDiff messages from DiffTable
+export default {
+  template: `
+    <q-table
+      ref="qRef"
+      v-bind="$attrs"
+      :columns="convertedColumns"
+      :rows="rows"
+      :row-key="rowKey"
+    >
+      <template v-for="(_, slot) in $slots" v-slot:[slot]="slotProps">
+        <slot :name="slot" v-bind="slotProps || {}" />
+      </template>
+    </q-table>
+  `,
+  props: {
+    columns: Array,
+    rowKey: { type: String, default: "id" },
+  },
+  data() {
+    return { rows: [] };
+  },
+  computed: {
+    convertedColumns() {
+      this.columns.forEach((column) => convertDynamicProperties(column, false));
+      return this.columns;
+    },
+  },
+  methods: {
+    applyDiff(diff) {
+      // Frozen rows are not made deeply reactive, which keeps large tables cheap
+      if (diff.replace) {
+        this.rows = diff.replace.map(Object.freeze);
+        return;
+      }
+      const key = this.rowKey;
+      let rows = this.rows.slice();
+      if (diff.remove) {
+        const removed = new Set(diff.remove);
+        rows = rows.filter((row) => !removed.has(row[key]));
+      }
+      const positions = new Map(rows.map((row, index) => [row[key], index]));
+      for (const patch of diff.patch || []) {
+        const index = positions.get(patch[key]);
+        if (index !== undefined) rows[index] = Object.freeze({ ...rows[index], ...patch });
+      }
+      for (const row of diff.upsert || []) {
+        const index = positions.get(row[key]);
+        if (index === undefined) {
+          positions.set(row[key], rows.length);
+          rows.push(Object.freeze(row));
+        } else {
+          rows[index] = Object.freeze(row);
+        }
+      }
+      this.rows = rows;
+    },
+  },
+};
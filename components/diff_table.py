@@ -0,0 +1,164 @@
+from typing import Any, Dict, Hashable, List, Optional
+import asyncio
+from nicegui import ui
+
+class RowDiff:
+    """Row changes waiting to be sent, folded to at most one change per row key
+
+    Removals are applied before patches and upserts on the client, so a row
+    removed and added again in the same tick ends up at the end of the table
+    like it does on the server. After `replace` every further change is
+    already part of the `rows` list it holds a reference to.
+    """
+
+    def __init__(self, row_key: str):
+        self.row_key = row_key
+        self.clear()
+
+    def clear(self) -> None:
+        self.rows: Optional[List[dict]] = None
+        self.upserts: Dict[Hashable, dict] = {}
+        self.patches: Dict[Hashable, dict] = {}
+        self.removes: Dict[Hashable, None] = {}  # Ordered set
+
+    def __bool__(self) -> bool:
+        return self.rows is not None or bool(self.upserts or self.patches or self.removes)
+
+    def replace(self, rows: List[dict]) -> None:
+        self.clear()
+        self.rows = rows
+
+    def upsert(self, rows: List[dict]) -> None:
+        if self.rows is not None:
+            return
+        for row in rows:
+            key = row[self.row_key]
+            self.patches.pop(key, None)
+            self.upserts[key] = row
+
+    def patch(self, rows: List[dict]) -> None:
+        if self.rows is not None:
+            return
+        for row in rows:
+            key = row[self.row_key]
+            if key in self.upserts:
+                self.upserts[key] = {**self.upserts[key], **row}
+            elif key not in self.removes:
+                self.patches[key] = {**self.patches.get(key, {}), **row}
+
+    def remove(self, keys: List[Hashable]) -> None:
+        if self.rows is not None:
+            return
+        for key in keys:
+            self.upserts.pop(key, None)
+            self.patches.pop(key, None)
+            self.removes[key] = None
+
+    def take(self) -> Optional[dict]:
+        """The message for the client, or None without changes; resets the diff"""
+        if not self:
+            return None
+        if self.rows is not None:
+            message = {'replace': list(self.rows)}
+        else:
+            message = {key: value for key, value in (
+                ('remove', list(self.removes)),
+                ('patch', list(self.patches.values())),
+                ('upsert', list(self.upserts.values())),
+            ) if value}
+        self.clear()
+        return message
+
+class DiffTable(ui.table, component='diff_table.js'):
+    """ui.table that sends row changes instead of the whole row list
+
+    A plain ui.table keeps its rows in the element props, so every added or
+    removed row, and every selection or pagination change, sends all rows to
+    the browser again. Here the rows live in the component on the client and
+    change through `applyDiff` messages. Changes made within one event-loop
+    tick go out as a single message, and a full replacement costs one message
+    no matter how many rows it has.
+    """
+
+    def __init__(self, *, rows: List[Dict], **kwargs: Any) -> None:
+        super().__init__(rows=[], **kwargs)
+        del self._props['rows']
+        self._rows: List[Dict] = []
+        self._diff = RowDiff(self.row_key)
+        self._flush_scheduled = False
+        if rows:
+            self.update_rows(rows)
+
+    @property
+    def rows(self) -> List[Dict]:
+        """List of rows; change it through the row methods so the client follows"""
+        return self._rows
+
+    @rows.setter
+    def rows(self, value: List[Dict]) -> None:
+        self.update_rows(value, clear_selection=False)
+
+    def _schedule_flush(self) -> None:
+        if self._flush_scheduled:
+            return
+        self._flush_scheduled = True
+        try:
+            asyncio.get_running_loop().call_soon(self._flush)
+        except RuntimeError:
+            self._flush()
+
+    def _flush(self) -> None:
+        self._flush_scheduled = False
+        message = self._diff.take()
+        if message is not None and not self.is_deleted:
+            self.run_method('applyDiff', message)
+
+    def _remove_selected(self, keys: set) -> None:
+        selected = [row for row in self.selected if row[self.row_key] not in keys]
+        if len(selected) != len(self.selected):
+            self.selected[:] = selected
+            self.update()
+
+    def add_rows(self, rows: List[Dict]) -> None:
+        """Add rows to the end of the table, replacing rows with the same key in place"""
+        positions = {row[self.row_key]: index for index, row in enumerate(self._rows)}
+        for row in rows:
+            index = positions.get(row[self.row_key])
+            if index is None:
+                positions[row[self.row_key]] = len(self._rows)
+                self._rows.append(row)
+            else:
+                self._rows[index] = row
+        self._diff.upsert(rows)
+        self._schedule_flush()
+
+    def remove_rows(self, rows: List[Dict]) -> None:
+        keys = {row[self.row_key] for row in rows}
+        self._rows[:] = [row for row in self._rows if row[self.row_key] not in keys]
+        self._diff.remove(list(keys))
+        self._remove_selected(keys)
+        self._schedule_flush()
+
+    def patch_rows(self, rows: List[Dict]) -> None:
+        """Change some fields of existing rows; each row holds its key and the changed fields"""
+        patches = {row[self.row_key]: row for row in rows}
+        for index, row in enumerate(self._rows):
+            patch = patches.get(row[self.row_key])
+            if patch is not None:
+                self._rows[index] = {**row, **patch}
+        self._diff.patch(rows)
+        self._schedule_flush()
+
+    def update_rows(self, rows: List[Dict], *, clear_selection: bool = True) -> None:
+        """Replace all rows in one message"""
+        self._rows[:] = rows
+        self._diff.replace(self._rows)
+        if clear_selection and self.selected:
+            self.selected.clear()
+            self.update()
+        self._schedule_flush()
+
+    def _update_table(self, rows: List[Dict], columns_from_df: List[Dict], clear_selection: bool,
+                      columns: Optional[List[Dict]], column_defaults: Optional[Dict]) -> None:
+        super()._update_table(self._rows, columns_from_df, clear_selection, columns, column_defaults)
+        self.update_rows(rows, clear_selection=False)
@@ -3,6 +3,7 @@ TABLE_COLUMNS = [
     {'name': 'selected_height', 'label': 'Visina', 'field': 'selected_height', 'required': True, 'align': 'left'},
     {'name': 'frame', 'label': 'Ram', 'field': 'frame', 'required': True, 'align': 'left'},
     {'name': 'color', 'label': 'Boja', 'field': 'color', 'required': True, 'align': 'left'},
+    {'name': 'quantity', 'label': 'Kolicina', 'field': 'quantity', 'required': True, 'align': 'left'},
     {'name': 'calculated_width', 'label': 'Izracun Sirina', 'field': 'calculated_width', 'required': True, 'align': 'left'},
     {'name': 'calculated_height', 'label': 'Izracun Visina', 'field': 'calculated_height', 'required': True, 'align': 'left'},
     {'name': 'wing', 'label': 'Krilo', 'field': 'wing', 'required': True, 'align': 'left'},
@@ -10,6 +11,26 @@ TABLE_COLUMNS = [
     {'name': 'net', 'label': 'Mrezica', 'field': 'net', 'required': True, 'align': 'left'},
 ]
 
-FRAME_OPTIONS = ['18mm', '18mm-flis', '25mm', '26mm']
+# The history table also shows whose job each row is; PDFs name the customer in their header instead
+HISTORY_COLUMNS = [
+    {'name': 'customer_name', 'label': 'Stranka', 'field': 'customer_name', 'required': False, 'align': 'left'},
+    *TABLE_COLUMNS,
+]
+
+COLOR_OPTIONS = ['Bjela', 'Smedja', 'Antracit', 'Siva', 'Zlatni hrast']
+
+# Cutting list: pieces cut from stock per opening, as (table column, pieces per opening)
+CUT_PIECES = {
+    'Ram': [('calculated_width', 2), ('calculated_height', 2)],
+    'Krilo': [('wing', 2)],
+    'Spaga': [('rope', 1)],
+    'Mrezica': [('net', 1)],
+}
 
-COLOR_OPTIONS = ['Bjela', 'Smedja', 'Antracit', 'Siva', 'Zlatni hrast']
\ No newline at end of file
+# Stock length and saw kerf in mm for each material
+CUT_STOCK = {
+    'Ram': {'length': 6000, 'kerf': 3},
+    'Krilo': {'length': 6000, 'kerf': 3},
+    'Spaga': {'length': 100000, 'kerf': 0},
+    'Mrezica': {'length': 30000, 'kerf': 0},
+}
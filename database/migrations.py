@@ -0,0 +1,34 @@
+from alembic import command
+from alembic.config import Config
+import asyncio
+import logging
+import os
+from database.config import DATABASE_URL, DB_HEALTH_PROBE_INTERVAL
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+def alembic_config(url: str = DATABASE_URL) -> Config:
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("sqlalchemy.url", url.replace("%", "%%"))
+    return config
+
+def upgrade_schema(url: str = DATABASE_URL) -> None:
+    """Apply pending Alembic revisions (a no-op when the schema is current)"""
+    command.upgrade(alembic_config(url), "head")
+
+async def upgrade_when_available(url: str = DATABASE_URL, interval: float = DB_HEALTH_PROBE_INTERVAL) -> None:
+    """Background task retrying the migration until the database accepts it
+
+    The container starts the app even if its own `alembic upgrade head` failed
+    because the database was down; this applies the pending revisions once the
+    database is back.
+    """
+    while True:
+        try:
+            await asyncio.to_thread(upgrade_schema, url)
+        except Exception as e:
+            logging.info(f"Schema migration deferred: {str(e)}")
+            await asyncio.sleep(interval)
+            continue
+        logging.info("Database schema is up to date")
+        return
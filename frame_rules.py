@@ -0,0 +1,117 @@
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Awaitable, Callable, Mapping, Optional, Tuple
+import asyncio
+import json
+import logging
+import os
+import numpy as np
+
+FRAME_RULES_PATH = os.getenv("FRAME_RULES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), 'frame_rules.json'))
+FRAME_RULES_RELOAD_INTERVAL = float(os.getenv("FRAME_RULES_RELOAD_INTERVAL", "5"))
+
+RULE_FIELDS = ('width_offset', 'height_offset', 'wing_offset', 'net_divisor')
+
+@dataclass(frozen=True)
+class FrameRule:
+    """Offsets in mm subtracted from an opening, and the divisor of its width for the net"""
+    width_offset: int
+    height_offset: int
+    wing_offset: int
+    net_divisor: int
+
+class RuleSet:
+    """Immutable, compiled set of frame rules
+
+    `rules` maps a frame to its FrameRule for the scalar calculations; the
+    NumPy arrays hold the same values indexed by position in `frames` for
+    the batch engine.
+    """
+
+    def __init__(self, version: str, rules: Mapping[str, FrameRule]):
+        self.version = version
+        self.rules = MappingProxyType(dict(rules))
+        self.frames: Tuple[str, ...] = tuple(rules)
+        self.index = MappingProxyType({frame: index for index, frame in enumerate(self.frames)})
+        for name in RULE_FIELDS:
+            array = np.array([getattr(rule, name) for rule in rules.values()], dtype=np.int64)
+            array.flags.writeable = False
+            setattr(self, f'{name}s', array)
+
+    def rule(self, frame: str) -> FrameRule:
+        try:
+            return self.rules[frame]
+        except KeyError:
+            raise ValueError("Invalid frame value") from None
+
+def parse_rule_set(data: dict) -> RuleSet:
+    """Validate the contents of a rules file; raises ValueError describing the first problem"""
+    version = data.get('version')
+    if not isinstance(version, str) or not version:
+        raise ValueError("Frame rules need a non-empty version string")
+    frames = data.get('frames')
+    if not isinstance(frames, dict) or not frames:
+        raise ValueError("Frame rules need at least one frame")
+    rules = {}
+    for frame, values in frames.items():
+        if not isinstance(values, dict) or set(values) != set(RULE_FIELDS):
+            raise ValueError(f"Frame {frame!r} needs exactly {', '.join(RULE_FIELDS)}")
+        if not all(isinstance(values[name], int) and values[name] >= 0 for name in RULE_FIELDS):
+            raise ValueError(f"Frame {frame!r} values must be non-negative integers")
+        if values['net_divisor'] == 0:
+            raise ValueError(f"Frame {frame!r} net_divisor must not be 0")
+        rules[frame] = FrameRule(**values)
+    return RuleSet(version, rules)
+
+def load_rule_set(path: str) -> RuleSet:
+    with open(path, encoding='utf-8') as rules_file:
+        return parse_rule_set(json.load(rules_file))
+
+class FrameRuleRegistry:
+    """The current RuleSet, reloaded when its file changes
+
+    A reload builds a complete new RuleSet and then replaces the reference in
+    one assignment, so a caller that reads `current` once computes with a
+    single, consistent rule set. An invalid file is logged and the previous
+    rules stay active.
+    """
+
+    def __init__(self, path: str = FRAME_RULES_PATH):
+        self.path = path
+        self._stamp = self._file_stamp()
+        self.current = load_rule_set(path)
+
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def reload(self) -> bool:
+        """Load the file again if it changed; returns whether the rules were replaced"""
+        stamp = self._file_stamp()
+        if stamp is None or stamp == self._stamp:
+            return False
+        self._stamp = stamp
+        try:
+            rule_set = load_rule_set(self.path)
+        except (OSError, ValueError) as e:
+            logging.error(f"Frame rules in {self.path} not loaded: {str(e)}")
+            return False
+        if rule_set.version == self.current.version:
+            logging.warning(f"Frame rules in {self.path} changed without a new version; keeping {rule_set.version}")
+            return False
+        self.current = rule_set
+        logging.info(f"Loaded frame rules {rule_set.version}")
+        return True
+
+    async def watch_forever(self, on_reloaded: Optional[Callable[[RuleSet], Awaitable]] = None,
+                            interval: float = FRAME_RULES_RELOAD_INTERVAL) -> None:
+        """Background task reloading the rules whenever the file changes"""
+        while True:
+            await asyncio.sleep(interval)
+            if await asyncio.to_thread(self.reload) and on_reloaded is not None:
+                await on_reloaded(self.current)
+
+frame_rules = FrameRuleRegistry()
@@ -1,15 +1,14 @@
 -- Window Sizer Database Initialization Script
--- This script runs automatically when PostgreSQL container starts
+-- This script runs automatically when PostgreSQL container starts.
+-- It creates the base schema; the app container then runs `alembic upgrade head`,
+-- which adds the later columns, indexes and monthly partitions.
 
--- Create enum for frame types
-CREATE TYPE frame_type_enum AS ENUM ('18mm', '18mm-flis', '25mm', '26mm');
-
--- Window calculations table
+-- Window calculations table; frame types come from frame_rules.json
 CREATE TABLE IF NOT EXISTS window_calculations (
     id SERIAL PRIMARY KEY,
     selected_width INTEGER NOT NULL,
     selected_height INTEGER NOT NULL,
-    frame_type frame_type_enum NOT NULL,
+    frame_type VARCHAR(50) NOT NULL,
     color VARCHAR(50) NOT NULL,
     calculated_width INTEGER NOT NULL,
     calculated_height INTEGER NOT NULL,
@@ -1,221 +1,679 @@
 # Importing the module
-from nicegui import ui, app
+from nicegui import ui, app, background_tasks
+from fastapi import HTTPException, Request
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 from nicegui.elements.label import Label
-from weasyprint import HTML  # type: ignore
-from jinja2 import Environment, FileSystemLoader
+import asyncio
+import dataclasses
 import datetime
-import tempfile
+import io
+import logging
 import os
-from calculations import (
-    calculate_new_width,
-    calculate_new_height,
-    calculate_wing,
-    calculate_rope,
-    calculate_net
+import weakref
+from typing import List, Optional
+from calculations import calculate_opening
+from config import HISTORY_COLUMNS, COLOR_OPTIONS
+from frame_rules import frame_rules
+from components.diff_table import DiffTable
+from services.database_service import AsyncDatabaseService, CalculationFilter, DB_UNAVAILABLE_ERRORS, db_circuit_breaker
+from services.circuit_breaker import CircuitOpenError, CircuitState
+from database.config import DB_HEALTH_PROBE_INTERVAL
+from database.migrations import upgrade_when_available
+from services.import_service import ImportService, IMPORT_MAX_BYTES
+from services.batch_service import batch_calculator, BatchBusyError, BatchTooLargeError
+from services.history_service import HistoryPager, HISTORY_PAGE_SIZE, calculation_to_row, iter_history_row_chunks
+from services.pdf_service import (
+    PdfService,
+    PdfQueueFullError,
+    PdfReportTooLargeError,
+    pdf_pool,
+    iter_row_chunks,
+    PDF_CHUNK_ROWS,
+    PDF_LARGE_REPORT_ROWS,
+    PDF_MAX_REPORT_ROWS,
+    PDF_PREWARM,
 )
-from config import TABLE_COLUMNS, FRAME_OPTIONS, COLOR_OPTIONS
-from services.database_service import DatabaseService
+from services.pdf_spool import pdf_spool
+from services.offline_journal import OfflineJournal
+from services.cutting_service import CuttingService
+from services.partition_service import partition_manager, parse_month
+from services.metrics import registry, HANDLER_SECONDS, FALLBACKS_TOTAL, monitor_event_loop_lag
+from models.database import WindowCalculation
 
-customer_name = ''
-database_available = False  # Track database connectivity
-        
-def add_to_table(selected_width: int, selected_height: int, frame: str, color: str):
-    try:
-        new_height = calculate_new_height(selected_height, frame)
-        new_width = calculate_new_width(selected_width, frame)
-        wing_size = calculate_wing(new_height, frame)
-        rope_length = calculate_rope(selected_width, selected_height)
-        net_size = calculate_net(selected_width, frame)
-        
-        # Save to database
-        calculation_data = {
-            'selected_width': selected_width,
-            'selected_height': selected_height,
-            'frame_type': frame,
-            'color': color,
-            'calculated_width': new_width,
-            'calculated_height': new_height,
-            'wing_size': wing_size,
-            'rope_length': rope_length,
-            'net_size': float(net_size),
+offline_journal = OfflineJournal()
+
+# Open browser tabs, so background jobs can refresh each of them
+sessions = weakref.WeakSet()
+
+DATABASE_STATUS = {
+    CircuitState.CLOSED: ('Baza povezana', 'green'),
+    CircuitState.HALF_OPEN: ('Baza se oporavlja', 'orange'),
+    CircuitState.OPEN: ('Baza nedostupna', 'red'),
+}
+
+SUMMARY_COLUMNS = [
+    {'name': 'frame_type', 'label': 'Ram', 'field': 'frame_type', 'align': 'left'},
+    {'name': 'color', 'label': 'Boja', 'field': 'color', 'align': 'left'},
+    {'name': 'openings', 'label': 'Otvora', 'field': 'openings', 'align': 'left'},
+    {'name': 'calculated_width', 'label': 'Izracun Sirina', 'field': 'calculated_width', 'align': 'left'},
+    {'name': 'calculated_height', 'label': 'Izracun Visina', 'field': 'calculated_height', 'align': 'left'},
+    {'name': 'wing_size', 'label': 'Krilo', 'field': 'wing_size', 'align': 'left'},
+    {'name': 'rope_length', 'label': 'Spaga', 'field': 'rope_length', 'align': 'left'},
+    {'name': 'net_size', 'label': 'Mrezica', 'field': 'net_size', 'align': 'left'},
+]
+
+def summary_for_pdf(period: str, summaries) -> dict:
+    """Material summary in the form rendered by the PDF template and the summary table"""
+    return {'period': period, 'rows': [{**dataclasses.asdict(summary), 'net_size': round(summary.net_size, 2)} for summary in summaries]}
+
+def date_range(selected):
+    """(start, end, label) of a ui.date range value; end is exclusive and both are None for no selection"""
+    if isinstance(selected, str):
+        selected = {'from': selected, 'to': selected}
+    if not selected:
+        return None, None, 'Sve'
+    start = datetime.datetime.strptime(selected['from'], '%Y-%m-%d')
+    # The range includes its last day
+    end = datetime.datetime.strptime(selected['to'], '%Y-%m-%d') + datetime.timedelta(days=1)
+    return start, end, f"{selected['from']} - {selected['to']}"
+
+def optional_int(value) -> Optional[int]:
+    return None if value is None or value == '' else int(value)
+
+class WindowSizerSession:
+    """Table, customer name and history position of one browser tab"""
+
+    def __init__(self):
+        self.customer_name = ''
+        self.include_cut_plan = False
+        self.material_summary = None  # Summary shown in the panel, added to table PDFs
+        self.history_pager = HistoryPager()
+        self.build()
+
+    @HANDLER_SECONDS.timed(handler='add_to_table')
+    async def add_to_table(self, selected_width: int, selected_height: int, frame: str, color: str, quantity: int = 1):
+        try:
+            quantity = int(quantity or 0)
+            if quantity < 1:
+                raise ValueError("Invalid quantity value")
+            result = calculate_opening(selected_width, selected_height, frame)
+            new_width = result['calculated_width']
+            new_height = result['calculated_height']
+            wing_size = result['wing']
+            rope_length = result['rope']
+            net_size = result['net']
+
+            # Save to database
+            calculation_data = {
+                'selected_width': selected_width,
+                'selected_height': selected_height,
+                'frame_type': frame,
+                'color': color,
+                'quantity': quantity,
+                'calculated_width': new_width,
+                'calculated_height': new_height,
+                'wing_size': wing_size,
+                'rope_length': rope_length,
+                'net_size': float(net_size),
+                'rule_version': result['rule_version'],
+                'customer_name': self.customer_name.strip() or None,
+            }
+
+            # Try to save to database first, otherwise journal it for replay. Only
+            # availability errors are journaled: a row the database rejects would
+            # fail on every replay and hold up everything journaled after it
+            db_saved = False
+
+            try:
+                db_record = await AsyncDatabaseService.create_calculation(calculation_data)
+                row_id = db_record.id  # Use database ID
+                db_saved = True
+            except (CircuitOpenError, *DB_UNAVAILABLE_ERRORS) as db_error:
+                row_id = offline_journal.record_insert(calculation_data)  # Negative local ID
+                FALLBACKS_TOTAL.inc(operation='create_calculation')
+                ui.notify(f"Baza nedostupna, radim u memoriji: {str(db_error)}", color='orange')
+
+            if db_saved:
+                # Newest rows are on the first page of the history
+                self.history_pager.reset()
+                await self.show_history_page(1)
+                ui.notify("Uspješno dodano u bazu!", color='green')
+            else:
+                # Add to UI table (always works)
+                self.table.add_row({
+                    'id': row_id,
+                    'customer_name': calculation_data['customer_name'],
+                    'selected_width': selected_width,
+                    'selected_height': selected_height,
+                    'frame': frame,
+                    'color': color,
+                    'quantity': quantity,
+                    'calculated_width': new_width,
+                    'calculated_height': new_height,
+                    'wing': wing_size,
+                    'rope': rope_length,
+                    'net': net_size,
+                })
+                ui.notify("Dodano u memoriju (baza nedostupna)", color='blue')
+
+        except ValueError as e:
+            ui.notify(f"Napaka: {str(e)}", color='red')
+        except Exception as e:
+            ui.notify(f"Greška pri spremanju u bazu: {str(e)}", color='red')
+
+    async def run_pdf_job(self, job):
+        """Await a PDF job behind a progress dialog
+
+        Returns None if the user cancelled the job.
+        """
+        task = asyncio.create_task(job)
+        with ui.dialog().props('persistent') as dialog, ui.card():
+            with ui.row().classes('items-center'):
+                ui.spinner(size='lg')
+                ui.label('Generiram PDF...')
+            ui.button('Odustani', on_click=task.cancel, color='red')
+        dialog.open()
+        try:
+            await asyncio.wait({task})
+        finally:
+            dialog.close()
+            dialog.delete()
+        if task.cancelled():
+            ui.notify('Generiranje PDF-a otkazano', color='blue')
+            return None
+        return task.result()
+
+    def result_row_chunks(self, chunk_size: int = PDF_CHUNK_ROWS):
+        """Every row the table pages through, in chunks, not only the visible page
+
+        That is the stored history matching the current search, or the rows
+        held in memory while the database is unavailable.
+        """
+        if db_circuit_breaker.state == CircuitState.OPEN:
+            return iter_row_chunks(list(self.table.rows), chunk_size)
+        return iter_history_row_chunks(chunk_size, self.history_pager.filters)
+
+    async def result_rows(self) -> List[dict]:
+        return [row async for chunk in self.result_row_chunks() for row in chunk]
+
+    @HANDLER_SECONDS.timed(handler='generate_pdf')
+    async def generate_pdf(self):
+        """Render the current result set to a spooled PDF and return its token
+
+        Large results are read and laid out in chunks and written straight to
+        the spool; only the cut plan needs all rows at once.
+        """
+        chunks = self.result_row_chunks()
+        rows = []
+        async for chunk in chunks:
+            rows.extend(chunk)
+            if len(rows) > PDF_LARGE_REPORT_ROWS and not self.include_cut_plan:
+                break
+            if len(rows) > PDF_MAX_REPORT_ROWS:
+                raise PdfReportTooLargeError(f"Report has more than {PDF_MAX_REPORT_ROWS} rows")
+        cut_plan = await asyncio.to_thread(CuttingService.plan, rows) if self.include_cut_plan else None
+        if len(rows) > PDF_LARGE_REPORT_ROWS:
+            # The rows read so far go first, the rest is read while the report is laid out
+            return await self.run_pdf_job(
+                PdfService.export_to_spool(iter_row_chunks(rows, rest=chunks), self.customer_name, cut_plan=cut_plan,
+                                           material_summary=self.material_summary))
+        pdf_bytes = await self.run_pdf_job(PdfService.generate_pdf_async(
+            rows, self.customer_name, cut_plan=cut_plan, material_summary=self.material_summary))
+        if pdf_bytes is None:
+            return None
+        return await asyncio.to_thread(pdf_spool.add, pdf_bytes)
+
+    async def generate_and_open_pdf(self):
+        if not self.table.rows:
+            ui.notify('Tabela je prazna, dodaj redove prije generiranja PDF-a.')
+            return
+
+        try:
+            token = await self.generate_pdf()
+            if token is None:
+                return
+
+            # Open the spooled file in a new tab through the download route
+            ui.run_javascript(f'window.open("/pdf/{token}", "_blank");')
+
+        except PdfQueueFullError:
+            ui.notify('Previše PDF-ova u obradi, pokušajte ponovo za trenutak.', color='orange')
+        except PdfReportTooLargeError:
+            ui.notify(f'PDF s planom rezanja je ograničen na {PDF_MAX_REPORT_ROWS} redova, suzite pretragu.', color='orange')
+        except Exception as e:
+            ui.notify(f'Greška pri generiranju PDF-a: {str(e)}', color='red')
+            return
+
+    async def generate_and_save_pdf(self):
+        if not self.table.rows:
+            ui.notify('Tabela je prazna, dodaj redove prije generiranja PDF-a.')
+            return
+
+        try:
+            token = await self.generate_pdf()
+            if token is not None:
+                # The browser streams the file from the spool
+                ui.download(f'/pdf/{token}', 'izracun.pdf')
+
+        except PdfQueueFullError:
+            ui.notify('Previše PDF-ova u obradi, pokušajte ponovo za trenutak.', color='orange')
+        except PdfReportTooLargeError:
+            ui.notify(f'PDF s planom rezanja je ograničen na {PDF_MAX_REPORT_ROWS} redova, suzite pretragu.', color='orange')
+        except Exception as e:
+            ui.notify(f'Greška pri generiranju PDF-a: {str(e)}', color='red')
+            return
+
+    @HANDLER_SECONDS.timed(handler='export_history_pdf')
+    async def export_history_pdf(self):
+        """Export the whole stored history, read from the database in chunks"""
+        try:
+            summary = summary_for_pdf('Sve', await AsyncDatabaseService.get_material_summary())
+            token = await self.run_pdf_job(PdfService.export_to_spool(
+                iter_history_row_chunks(PDF_CHUNK_ROWS), self.customer_name, material_summary=summary))
+            if token is not None:
+                ui.download(f'/pdf/{token}', 'izracun.pdf')
+
+        except PdfQueueFullError:
+            ui.notify('Previše PDF-ova u obradi, pokušajte ponovo za trenutak.', color='orange')
+        except Exception as e:
+            ui.notify(f'Greška pri generiranju PDF-a: {str(e)}', color='red')
+
+    @HANDLER_SECONDS.timed(handler='show_cut_plan')
+    async def show_cut_plan(self):
+        """Show the cut plan for the pieces of all rows the table pages through"""
+        if not self.table.rows:
+            ui.notify('Tabela je prazna, dodaj redove prije planiranja rezanja.')
+            return
+
+        try:
+            rows = await self.result_rows()
+        except Exception as e:
+            ui.notify(f'Greška pri ucitavanju redova: {str(e)}', color='red')
+            return
+        cut_plan = await asyncio.to_thread(CuttingService.plan, rows)
+        with ui.dialog() as dialog, ui.card().classes('w-full'):
+            ui.label('Plan rezanja').classes('text-h6')
+            for group in cut_plan.groups:
+                caption = (f'{len(group.bars)} sipki po {group.stock_length} mm, {group.piece_count} komada, '
+                           f'otpad {group.waste} mm ({group.utilization:.1%})')
+                with ui.expansion(f'{group.material} · {group.frame} · {group.color}', caption=caption).classes('w-full'):
+                    if group.oversized:
+                        ui.label(f"Duze od sipke: {', '.join(map(str, group.oversized))} mm").classes('text-red')
+                    ui.table(
+                        columns=[
+                            {'name': 'bar', 'label': 'Sipka', 'field': 'bar', 'align': 'left'},
+                            {'name': 'pieces', 'label': 'Rezovi [mm]', 'field': 'pieces', 'align': 'left'},
+                            {'name': 'waste', 'label': 'Otpad [mm]', 'field': 'waste', 'align': 'left'},
+                        ],
+                        rows=[
+                            {'bar': index, 'pieces': ' + '.join(map(str, bar)), 'waste': group.stock_length - group.used_length(bar)}
+                            for index, bar in enumerate(group.bars, start=1)
+                        ],
+                        row_key='bar',
+                    ).classes('w-full')
+            ui.button('Zatvori', on_click=dialog.close)
+        dialog.on('hide', dialog.delete)
+        dialog.open()
+
+    @HANDLER_SECONDS.timed(handler='load_material_summary')
+    async def load_material_summary(self):
+        """Show totals per frame type and color for the selected date range"""
+        start, end, period = date_range(self.summary_range.value)
+        try:
+            summaries = await AsyncDatabaseService.get_material_summary(start, end)
+        except Exception:
+            ui.notify("Baza nedostupna, sazetak nije ucitan", color='orange')
+            return
+        self.material_summary = summary_for_pdf(period, summaries)
+        self.summary_table.update_rows([{**row, 'id': index} for index, row in enumerate(self.material_summary['rows'])])
+
+    def update_database_status(self):
+        """Reflect the database circuit breaker state in the status badge"""
+        text, color = DATABASE_STATUS[db_circuit_breaker.state]
+        self.database_status.set_text(text)
+        self.database_status.props(f'color={color}')
+
+    @HANDLER_SECONDS.timed(handler='search_history')
+    async def search_history(self):
+        """Show the calculations matching the search form in the table, from the first page"""
+        start, end, _ = date_range(self.search_range.value)
+        filters = CalculationFilter(
+            customer=(self.search_customer.value or '').strip() or None,
+            start=start,
+            end=end,
+            frame_type=self.search_frame.value or None,
+            color=self.search_color.value or None,
+            min_width=optional_int(self.search_min_width.value),
+            max_width=optional_int(self.search_max_width.value),
+            min_height=optional_int(self.search_min_height.value),
+            max_height=optional_int(self.search_max_height.value),
+        )
+        self.history_pager.search(None if filters == CalculationFilter() else filters)
+        try:
+            history_page = await self.show_history_page(1)
+        except Exception:
+            ui.notify("Baza nedostupna, pretraga nije izvrsena", color='orange')
+            return
+        if self.history_pager.filters is not None and not history_page.calculations:
+            ui.notify("Nema zapisa za zadanu pretragu", color='blue')
+
+    async def clear_search(self):
+        """Reset the search form and show the whole history again"""
+        for field in (self.search_customer, self.search_range, self.search_frame, self.search_color,
+                      self.search_min_width, self.search_max_width, self.search_min_height, self.search_max_height):
+            field.set_value(None)
+        await self.search_history()
+
+    def update_customer_name(self, value):
+        self.customer_name = value
+
+    async def show_history_page(self, page: int):
+        """Replace the table contents with one page of the history in a single update"""
+        history_page = await self.history_pager.fetch(page)
+        if not history_page.calculations and history_page.page > 1:
+            history_page = await self.history_pager.fetch(history_page.page - 1)
+        self.table.pagination = {
+            **self.table.pagination,
+            'page': history_page.page,
+            'rowsNumber': self.history_pager.rows_number(history_page),
         }
-        
-        # Try to save to database first
-        row_id = len(table.rows)  # Fallback ID
-        db_saved = False
-        
+        self.table.update_rows([calculation_to_row(calc) for calc in history_page.calculations])
+        return history_page
+
+    @HANDLER_SECONDS.timed(handler='handle_table_request')
+    async def handle_table_request(self, e):
+        """Serve page changes of the history table from the database"""
+        pagination = e.args['pagination']
+        rows_per_page = pagination.get('rowsPerPage') or HISTORY_PAGE_SIZE
+        if rows_per_page != self.history_pager.page_size:
+            self.history_pager.page_size = rows_per_page
+            self.history_pager.reset()
+            self.table.pagination = {**self.table.pagination, 'rowsPerPage': rows_per_page}
         try:
-            db_record = DatabaseService.create_calculation(calculation_data)
-            row_id = db_record.id  # Use database ID
-            db_saved = True
-            global database_available
-            database_available = True
-        except Exception as db_error:
-            ui.notify(f"Baza nedostupna, radim u memoriji: {str(db_error)}", color='orange')
-            database_available = False
-        
-        # Add to UI table (always works)
-        table.add_row({
-            'id': row_id,
-            'selected_width': selected_width,
-            'selected_height': selected_height,
-            'frame': frame,
-            'color': color,
-            'calculated_width': new_width,
-            'calculated_height': new_height,
-            'wing': wing_size,
-            'rope': rope_length,
-            'net': net_size,
-        })
-        
-        if db_saved:
-            ui.notify("Uspješno dodano u bazu!", color='green')
-        else:
-            ui.notify("Dodano u memoriju (baza nedostupna)", color='blue')
-        
-    except ValueError as e:
-        ui.notify(f"Napaka: {str(e)}", color='red')
-
-def generate_pdf():
-    env = Environment(loader=FileSystemLoader('templates'))
-    template = env.get_template('pdf_template.html')
-
-    html_out = template.render(
-        columns=TABLE_COLUMNS,
-        rows=table.rows,
-        customer_name=customer_name,
-        timestamp=datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
-    )
-
-    return HTML(string=html_out).write_pdf()
-
-def generate_and_open_pdf():
-    if not table.rows:
-        ui.notify('Tabela je prazna, dodaj redove prije generiranja PDF-a.')
-        return
-    
-    try:
-        pdf_bytes = generate_pdf()
-        
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-            tmp_file.write(pdf_bytes)
-            tmp_path = tmp_file.name
-        
-        # Serve the file and open in new tab
-        pdf_url = f'/pdf/{os.path.basename(tmp_path)}'
-        app.add_static_file(local_file=tmp_path, url_path=pdf_url)
-        ui.run_javascript(f'window.open("{pdf_url}", "_blank");')
-        
-    except Exception as e:
-        ui.notify(f'Greška pri generiranju PDF-a: {str(e)}', color='red')
-        return
-    
-def generate_and_save_pdf():
-    if not table.rows:
-        ui.notify('Tabela je prazna, dodaj redove prije generiranja PDF-a.')
-        return
-    
-    try:
-        pdf_bytes = generate_pdf()
-        ui.download(pdf_bytes, 'izracun.pdf', 'application/pdf')
-
-    except Exception as e:
-        ui.notify(f'Greška pri generiranju PDF-a: {str(e)}', color='red')
-        return
-    
-def update_customer_name(value):
-    global customer_name
-    customer_name = value
-
-def load_calculations_from_database():
-    """Load existing calculations from database into the UI table"""
-    global database_available
-    try:
-        calculations = DatabaseService.get_all_calculations()
-        for calc in calculations:
-            table.add_row({
-                'id': calc.id,
-                'selected_width': calc.selected_width,
-                'selected_height': calc.selected_height,
-                'frame': calc.frame_type,
-                'color': calc.color,
-                'calculated_width': calc.calculated_width,
-                'calculated_height': calc.calculated_height,
-                'wing': calc.wing_size,
-                'rope': calc.rope_length,
-                'net': calc.net_size,
-            })
-        if calculations:
-            ui.notify(f"Učitano {len(calculations)} zapisa iz baze", color='blue')
-            database_available = True
-        else:
-            ui.notify("Baza prazna, počinje s novim izračunima", color='blue')
-            database_available = True
-    except Exception as e:
-        ui.notify(f"Baza nedostupna, radim u memoriji", color='orange')
-        database_available = False
-
-def delete_selected_rows():
-    """Delete selected rows from both UI table and database"""
-    if not table.selected:
-        return
-    
-    global database_available
-    selected_count = len(table.selected)
-    
-    # Try to delete from database if available
-    db_deleted = 0
-    if database_available:
+            await self.show_history_page(pagination.get('page', 1))
+        except Exception:
+            ui.notify("Baza nedostupna, stranica nije učitana", color='orange')
+
+    @HANDLER_SECONDS.timed(handler='load_calculations_from_database')
+    async def load_calculations_from_database(self):
+        """Load the first page of existing calculations from database into the UI table"""
+        try:
+            calculations = (await self.show_history_page(1)).calculations
+            if calculations:
+                ui.notify(f"Učitano {len(calculations)} zapisa iz baze", color='blue')
+            else:
+                ui.notify("Baza prazna, počinje s novim izračunima", color='blue')
+        except (CircuitOpenError, *DB_UNAVAILABLE_ERRORS):
+            FALLBACKS_TOTAL.inc(operation='load_calculations')
+            # Show rows journaled while offline, including those from before a restart
+            self.table.update_rows([
+                calculation_to_row(WindowCalculation(id=local_id, **data))
+                for local_id, data in reversed(offline_journal.pending_inserts())
+            ])
+            ui.notify("Baza nedostupna, radim u memoriji", color='orange')
+        except Exception as e:
+            logging.error(f"Loading calculations failed: {str(e)}")
+            ui.notify(f"Greška pri učitavanju iz baze: {str(e)}", color='red')
+
+    async def refresh_after_replay(self):
+        """Show replayed offline rows under their database ids"""
+        self.history_pager.reset()
+        await self.show_history_page(1)
+
+    def refresh_frame_options(self, rule_set):
+        """Offer the frames of reloaded rules, dropping a selection that was removed"""
+        frames = list(rule_set.frames)
+        frame = self.frame_select.value if self.frame_select.value in rule_set.rules else frames[0]
+        self.frame_select.set_options(frames, value=frame)
+        search_frame = self.search_frame.value if self.search_frame.value in rule_set.rules else None
+        self.search_frame.set_options(frames, value=search_frame)
+
+    @HANDLER_SECONDS.timed(handler='import_openings_file')
+    async def import_openings_file(self, e):
+        """Import openings from an uploaded CSV file in batched transactions"""
+        # The upload limit is enforced by the browser; check again for other clients
+        size = e.content.seek(0, io.SEEK_END)
+        e.content.seek(0)
+        if size > IMPORT_MAX_BYTES:
+            ui.notify(f"Greška pri uvozu: datoteka veća od {IMPORT_MAX_BYTES} bajtova", color='red')
+            return
+        try:
+            stream = io.TextIOWrapper(e.content, encoding='utf-8-sig', newline='')
+            result = await ImportService.import_csv(stream, customer_name=self.customer_name.strip() or None)
+        except (ValueError, UnicodeDecodeError) as error:
+            ui.notify(f"Greška pri uvozu: {str(error)}", color='red')
+            return
+
+        # Show the imported rows (newest first) in one table update
+        if result.calculations:
+            self.history_pager.reset()
+            await self.show_history_page(1)
+
+        if result.database_error:
+            ui.notify(f"Baza nedostupna, uvoz prekinut: {result.database_error}", color='orange')
+        if result.errors:
+            ui.notify(f"Preskočeno {len(result.errors)} neispravnih redova: {'; '.join(result.errors[:3])}", color='orange')
+        ui.notify(f"Uvezeno {len(result.calculations)} zapisa iz {e.name}", color='green')
+
+    @HANDLER_SECONDS.timed(handler='delete_selected_rows')
+    async def delete_selected_rows(self):
+        """Delete selected rows from both UI table and database"""
+        table = self.table
+        if not table.selected:
+            return
+
+        selected_count = len(table.selected)
+        selected_ids = [row['id'] for row in table.selected]
+        local_ids = [row_id for row_id in selected_ids if row_id < 0]
+        stored_ids = [row_id for row_id in selected_ids if row_id > 0]
+
+        # Rows added offline only exist in the journal
+        offline_journal.record_delete(local_ids)
+
+        # Try to delete from database; fails fast while the circuit is open
+        deleted_ids = []
+        db_deleted = False
         try:
-            for row in table.selected:
-                row_id = row['id']
-                if DatabaseService.delete_calculation(row_id):
-                    db_deleted += 1
-            database_available = True  # Connection working
+            deleted_ids = await AsyncDatabaseService.delete_calculations(stored_ids)
+            db_deleted = True
+        except (CircuitOpenError, *DB_UNAVAILABLE_ERRORS):
+            offline_journal.record_delete(stored_ids)
+            FALLBACKS_TOTAL.inc(operation='delete_calculations')
+            ui.notify("Baza nedostupna, brisanje će se izvršiti naknadno", color='orange')
         except Exception as e:
-            ui.notify(f"Baza nedostupna, brišem samo iz memorije", color='orange')
-            database_available = False
-    
-    # Always remove from UI table
-    table.remove_rows(table.selected)
-    
-    # Notify user of results
-    if database_available and db_deleted > 0:
-        ui.notify(f"Obrisano {db_deleted} zapisa iz baze", color='green')
-    elif database_available and db_deleted == 0:
-        ui.notify("Greška pri brisanju iz baze", color='red')
-    else:
-        ui.notify(f"Obrisano {selected_count} zapisa iz memorije", color='blue')
+            # Rejected by the database; journaling it would only fail again on replay
+            logging.error(f"Deleting calculations failed: {str(e)}")
+            ui.notify(f"Greška pri brisanju: {str(e)}", color='red')
+            return
+
+        # Remove exactly the deleted rows, or all selected rows when working in memory
+        if db_deleted:
+            deleted = set(deleted_ids) | set(local_ids)
+            table.remove_rows([row for row in table.selected if row['id'] in deleted])
+            # Refill the page from its keyset cursor; an emptied last page steps back
+            page = table.pagination.get('page', 1)
+            self.history_pager.forget_after(page)
+            try:
+                await self.show_history_page(page)
+            except Exception:
+                ui.notify("Baza nedostupna, stranica nije učitana", color='orange')
+        else:
+            table.remove_rows(table.selected)
+
+        # Notify user of results
+        if db_deleted and (deleted_ids or local_ids):
+            ui.notify(f"Obrisano {len(deleted_ids) + len(local_ids)} zapisa", color='green')
+        elif db_deleted:
+            ui.notify("Greška pri brisanju iz baze", color='red')
+        else:
+            ui.notify(f"Obrisano {selected_count} zapisa iz memorije", color='blue')
+
+    def build(self):
+        self.database_status = ui.badge('Baza povezana', color='green')
+        ui.timer(2, self.update_database_status)
+
+        with ui.row():
+            selected_width = ui.input(label='Sirina [mm]', placeholder='Unesi sirinu',
+                validation={'Unesi milimetre za sirinu': lambda value: value.isdigit() and int(value) > 0},
+            )
+
+            selected_height = ui.input(label='Visina [mm]', placeholder='Unesi visinu',
+                validation={'Unesi milimetre za visinu': lambda value: value.isdigit() and int(value) > 0},
+            )
+
+            frames = list(frame_rules.current.frames)
+            self.frame_select = ui.select(label='Ram', options=frames, value=frames[0])
+
+            selected_color = ui.select(label='Boja', options=COLOR_OPTIONS, value='Bjela')
+
+            quantity = ui.number(label='Kolicina', value=1, min=1, step=1, precision=0,
+                validation={'Unesi kolicinu': lambda value: value is not None and value >= 1},
+            )
 
+            ui.button('Dodaj', on_click=lambda: self.add_to_table(selected_width.value, selected_height.value, self.frame_select.value, selected_color.value, quantity.value))
 
-with ui.row():
-    selected_width = ui.input(label='Sirina [mm]', placeholder='Unesi sirinu',
-        validation={'Unesi milimetre za sirinu': lambda value: value.isdigit() and int(value) > 0},
-    )
+            ui.upload(label='Uvoz CSV', auto_upload=True, max_file_size=IMPORT_MAX_BYTES, on_upload=self.import_openings_file,
+                on_rejected=lambda: ui.notify(f"Greška pri uvozu: datoteka veća od {IMPORT_MAX_BYTES} bajtova", color='red'),
+            ).props('accept=.csv')
 
-    selected_height = ui.input(label='Visina [mm]', placeholder='Unesi visinu',
-        validation={'Unesi milimetre za visinu': lambda value: value.isdigit() and int(value) > 0},
-    )
 
-    selected_frame = ui.select(label='Ram', options=FRAME_OPTIONS, value='18mm')
+        # Rows are sent as diffs and only the visible ones are rendered, so large pages stay cheap
+        self.table = DiffTable(columns=HISTORY_COLUMNS, rows=[], selection='multiple',
+                               pagination={'rowsPerPage': HISTORY_PAGE_SIZE, 'page': 1, 'rowsNumber': 0})
+        # rowsNumber is only a lower bound while more pages exist (see HistoryPager.rows_number)
+        self.table.props(f':rows-per-page-options="[25, {HISTORY_PAGE_SIZE}, 100, 500]" virtual-scroll '
+                         ':pagination-label="(first, end, total) => first + \'-\' + end + \' od \' + (total > end ? \'više\' : total)" '
+                         ':virtual-scroll-item-size="48" :virtual-scroll-sticky-size-start="48"')
+        self.table.style('max-height: 70vh')
+        self.table.on('request', self.handle_table_request)
 
-    selected_color = ui.select(label='Boja', options=COLOR_OPTIONS, value='Bjela')
+        # Load this tab's history once the page has been delivered
+        ui.timer(0, self.load_calculations_from_database, once=True)
 
-    ui.button('Dodaj', on_click=lambda: add_to_table(selected_width.value, selected_height.value, selected_frame.value, selected_color.value))
+        with ui.row():
+            ui.button('Izbrisi', on_click=self.delete_selected_rows, color='red') \
+                .bind_visibility_from(self.table, 'selected', backward=lambda val: bool(val))
+        with ui.row():
+            ui.input(label='Unesite ime stranke', placeholder='', on_change=lambda e: self.update_customer_name(e.value))
+            ui.button('Plan rezanja', icon='content_cut', on_click=self.show_cut_plan)
+            ui.checkbox('Plan rezanja u PDF-u').bind_value(self, 'include_cut_plan')
+            with ui.dropdown_button('Print PDF', icon='print', split=True, on_click=self.generate_and_open_pdf):
+                ui.button('Sacuvaj PDF', icon='save', on_click=self.generate_and_save_pdf).classes('w-full')
+                ui.button('Izvezi cijelu historiju', icon='download', on_click=self.export_history_pdf).classes('w-full')
 
+        with ui.expansion('Pretraga', icon='search').classes('w-full'):
+            with ui.row():
+                self.search_range = ui.date().props('range')
+                with ui.column():
+                    self.search_customer = ui.input(label='Stranka pocinje sa')
+                    self.search_frame = ui.select(label='Ram', options=list(frame_rules.current.frames), clearable=True)
+                    self.search_color = ui.select(label='Boja', options=COLOR_OPTIONS, clearable=True)
+                with ui.column():
+                    self.search_min_width = ui.number(label='Sirina od [mm]', min=0, precision=0)
+                    self.search_max_width = ui.number(label='Sirina do [mm]', min=0, precision=0)
+                    self.search_min_height = ui.number(label='Visina od [mm]', min=0, precision=0)
+                    self.search_max_height = ui.number(label='Visina do [mm]', min=0, precision=0)
+                with ui.column():
+                    ui.button('Trazi', icon='search', on_click=self.search_history)
+                    ui.button('Ponisti', on_click=self.clear_search)
 
-table = ui.table(columns=TABLE_COLUMNS, rows=[], selection='multiple')
+        with ui.expansion('Sazetak materijala', icon='summarize').classes('w-full'):
+            with ui.row():
+                self.summary_range = ui.date().props('range')
+                with ui.column():
+                    ui.button('Prikazi', on_click=self.load_material_summary)
+                    ui.button('Sve', on_click=lambda: self.summary_range.set_value(None))
+            self.summary_table = ui.table(columns=SUMMARY_COLUMNS, rows=[]).classes('w-full')
+
+@ui.page('/')
+def index(client):
+    session = WindowSizerSession()
+    sessions.add(session)
+    # A reconnecting client keeps its page without running index again
+    client.on_disconnect(lambda: sessions.discard(session))
+    client.on_connect(lambda: sessions.add(session))
+
+async def refresh_sessions_after_replay(replayed: int):
+    """Show replayed offline rows in every open tab"""
+    for session in list(sessions):
+        try:
+            await session.refresh_after_replay()
+        except Exception:
+            pass  # The tab picks the rows up on its next page change
+
+async def refresh_sessions_after_reload(rule_set):
+    """Show the frames of reloaded rules in every open tab"""
+    for session in list(sessions):
+        try:
+            session.refresh_frame_options(rule_set)
+        except Exception:
+            pass  # The tab gets the new frames when it is opened again
+
+# Computed only when /metrics is scraped
+registry.gauge('sessions', 'Open browser tabs', callback=lambda: {(): len(sessions)})
+registry.gauge('table_rows', 'Rows shown in the tables of all open tabs',
+               callback=lambda: {(): sum(len(session.table.rows) for session in list(sessions))})
+registry.gauge('offline_journal_pending', 'Operations waiting in the offline journal', ['operation'],
+               callback=lambda: {(op,): count for op, count in offline_journal.pending_counts().items()})
+
+@app.get('/metrics')
+def serve_metrics():
+    """Prometheus text exposition of the process metrics"""
+    return PlainTextResponse(registry.render(), media_type='text/plain; version=0.0.4')
+
+@app.get('/pdf/{token}')
+def serve_spooled_pdf(token: str):
+    """Stream a spooled PDF; one route serves every generated document"""
+    path = pdf_spool.get_path(token)
+    if path is None:
+        raise HTTPException(status_code=404, detail='PDF not found or expired')
+    return FileResponse(path, media_type='application/pdf', filename='izracun.pdf',
+                        content_disposition_type='inline')
+
+@app.post('/api/calculations')
+async def calculate_openings(request: Request, persist: bool = False, customer: Optional[str] = None):
+    """Calculate a batch of openings sent as JSON or CSV and stream the results as NDJSON
+
+    With ?persist=true the results are also stored, one transaction per chunk,
+    under the customer or job given by ?customer=.
+    """
+    try:
+        content_length = request.headers.get('content-length')
+        chunks = await batch_calculator.start_request(
+            request.stream(), int(content_length) if content_length else None,
+            request.headers.get('content-type', ''), persist, customer or None)
+    except BatchTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except BatchBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={'Retry-After': '5'})
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(chunks, media_type='application/x-ndjson')
 
-# Load existing data from database
-load_calculations_from_database()
+@app.get('/archive/{month}')
+def serve_archive(month: str):
+    """Download the archived calculations of a YYYY-MM month as compressed CSV"""
+    parsed = parse_month(month)
+    if parsed is None:
+        raise HTTPException(status_code=404, detail='Unknown month')
+    path = partition_manager.archive_path(parsed)
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail='No archive for this month')
+    return FileResponse(path, media_type='application/gzip', filename=os.path.basename(path))
 
-with ui.row():
-    ui.button('Izbrisi', on_click=delete_selected_rows, color='red') \
-        .bind_visibility_from(table, 'selected', backward=lambda val: bool(val))
-with ui.row():
-    ui.input(label='Unesite ime stranke', placeholder='', on_change=lambda e: update_customer_name(e.value))
-    with ui.dropdown_button('Print PDF', icon='print', split=True, on_click=lambda: generate_and_open_pdf()):
-        ui.button('Sacuvaj PDF', icon='save', on_click=lambda: generate_and_save_pdf()).classes('w-full')
+app.on_startup(pdf_pool.start)
+app.on_startup(lambda: background_tasks.create(pdf_spool.sweep_forever(), name='pdf_spool_sweeper'))
+app.on_startup(lambda: background_tasks.create(
+    db_circuit_breaker.probe_forever(AsyncDatabaseService.ping, DB_HEALTH_PROBE_INTERVAL), name='db_health_probe'))
+app.on_startup(lambda: background_tasks.create(
+    offline_journal.replay_forever(refresh_sessions_after_replay), name='offline_journal_replay'))
+app.on_startup(lambda: background_tasks.create(monitor_event_loop_lag(), name='event_loop_lag_monitor'))
+app.on_startup(lambda: background_tasks.create(partition_manager.maintain_forever(), name='partition_maintenance'))
+app.on_startup(lambda: background_tasks.create(
+    frame_rules.watch_forever(refresh_sessions_after_reload), name='frame_rules_reload'))
+app.on_startup(lambda: background_tasks.create(upgrade_when_available(), name='schema_migration'))
+if PDF_PREWARM:
+    app.on_startup(lambda: background_tasks.create(PdfService.prewarm(), name='pdf_prewarm'))
+app.on_shutdown(pdf_pool.shutdown)
 
-ui.run(host='0.0.0.0', title='Prozori')
\ No newline at end of file
+ui.run(host='0.0.0.0', port=int(os.getenv('PORT', '8080')), title='Prozori')
@@ -0,0 +1,43 @@
+"""Composite indexes for material summaries and history paging
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00.000000
+
+The table itself is created by init.sql, so this first revision only adds
+indexes. (created_at, id) covers keyset paging and, with the summed columns
+included, lets date-range summaries run as index-only scans on PostgreSQL; it
+replaces the plain created_at index from init.sql. (frame_type, color,
+created_at) serves summaries and filters restricted to one frame and color.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_window_calculations_created_at_id', 'window_calculations', ['created_at', 'id'],
+        postgresql_include=['frame_type', 'color', 'calculated_width', 'calculated_height',
+                            'wing_size', 'rope_length', 'net_size'],
+        if_not_exists=True,
+    )
+    op.create_index(
+        'ix_window_calculations_frame_type_color_created_at', 'window_calculations',
+        ['frame_type', 'color', 'created_at'], if_not_exists=True,
+    )
+    op.drop_index('idx_window_calculations_created_at', table_name='window_calculations', if_exists=True)
+
+
+def downgrade() -> None:
+    op.create_index(
+        'idx_window_calculations_created_at', 'window_calculations', ['created_at'], if_not_exists=True,
+    )
+    op.drop_index('ix_window_calculations_frame_type_color_created_at', table_name='window_calculations', if_exists=True)
+    op.drop_index('ix_window_calculations_created_at_id', table_name='window_calculations', if_exists=True)
@@ -0,0 +1,114 @@
+"""Range-partition window_calculations by created_at month
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:00.000000
+
+PostgreSQL only; on other databases this revision does nothing. The plain
+table is renamed, an identically typed table partitioned by month of
+created_at takes its name and the rows are copied over. Monthly partitions
+cover the existing rows up to PREMAKE_MONTHS ahead; from then on the
+partition maintenance job creates them. A default partition catches rows
+outside every monthly range so inserts never fail for lack of a partition.
+
+The primary key of a partitioned table must contain the partition key, so it
+becomes (id, created_at); ids still come from the original sequence.
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PREMAKE_MONTHS = 3
+SUMMARY_INCLUDE = ['frame_type', 'color', 'calculated_width', 'calculated_height',
+                   'wing_size', 'rope_length', 'net_size']
+
+
+def _is_partitioned(connection) -> bool:
+    return connection.execute(sa.text(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = 'window_calculations' AND c.relnamespace = current_schema()::regnamespace"
+    )).first() is not None
+
+
+def _add_month(month: datetime) -> datetime:
+    return month.replace(year=month.year + month.month // 12, month=month.month % 12 + 1)
+
+
+def _create_indexes() -> None:
+    op.create_index(
+        'ix_window_calculations_created_at_id', 'window_calculations', ['created_at', 'id'],
+        postgresql_include=SUMMARY_INCLUDE,
+    )
+    op.create_index(
+        'ix_window_calculations_frame_type_color_created_at', 'window_calculations',
+        ['frame_type', 'color', 'created_at'],
+    )
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    if connection.dialect.name != 'postgresql' or _is_partitioned(connection):
+        return
+
+    sequence = connection.execute(sa.text(
+        "SELECT pg_get_serial_sequence('window_calculations', 'id')"
+    )).scalar()
+    op.execute("UPDATE window_calculations SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+    op.rename_table('window_calculations', 'window_calculations_legacy')
+    op.execute(
+        "CREATE TABLE window_calculations (LIKE window_calculations_legacy INCLUDING DEFAULTS) "
+        "PARTITION BY RANGE (created_at)"
+    )
+    op.execute("ALTER TABLE window_calculations ALTER COLUMN created_at SET NOT NULL")
+    if sequence:
+        op.execute(f"ALTER SEQUENCE {sequence} OWNED BY window_calculations.id")
+
+    oldest = connection.execute(sa.text(
+        "SELECT date_trunc('month', coalesce(min(created_at), CURRENT_TIMESTAMP)), "
+        "date_trunc('month', CURRENT_TIMESTAMP) FROM window_calculations_legacy"
+    )).one()
+    month, last = oldest[0], oldest[1]
+    for _ in range(PREMAKE_MONTHS):
+        last = _add_month(last)
+    while month <= last:
+        following = _add_month(month)
+        op.execute(
+            f"CREATE TABLE window_calculations_{month:%Y_%m} PARTITION OF window_calculations "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{following:%Y-%m-%d}')"
+        )
+        month = following
+    op.execute("CREATE TABLE window_calculations_default PARTITION OF window_calculations DEFAULT")
+
+    op.execute("INSERT INTO window_calculations SELECT * FROM window_calculations_legacy")
+    op.drop_table('window_calculations_legacy')
+    # Built after the copy, once the legacy names are free; creating them on
+    # the parent creates them on every partition
+    op.execute("ALTER TABLE window_calculations ADD PRIMARY KEY (id, created_at)")
+    _create_indexes()
+
+
+def downgrade() -> None:
+    connection = op.get_bind()
+    if connection.dialect.name != 'postgresql' or not _is_partitioned(connection):
+        return
+
+    sequence = connection.execute(sa.text(
+        "SELECT pg_get_serial_sequence('window_calculations', 'id')"
+    )).scalar()
+    op.rename_table('window_calculations', 'window_calculations_partitioned')
+    op.execute("CREATE TABLE window_calculations (LIKE window_calculations_partitioned INCLUDING DEFAULTS)")
+    if sequence:
+        op.execute(f"ALTER SEQUENCE {sequence} OWNED BY window_calculations.id")
+    op.execute("INSERT INTO window_calculations SELECT * FROM window_calculations_partitioned")
+    # Dropping the parent drops its partitions; archived months stay in the archive
+    op.drop_table('window_calculations_partitioned')
+    op.execute("ALTER TABLE window_calculations ADD PRIMARY KEY (id)")
+    _create_indexes()
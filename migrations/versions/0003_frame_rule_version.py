@@ -0,0 +1,43 @@
+"""Frame types from the rule registry and the rule-set version per calculation
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:00.000000
+
+Frames are defined by frame_rules.json now, so on PostgreSQL frame_type
+becomes VARCHAR(50) and the frame_type_enum created by earlier versions of
+init.sql is dropped; new profiles no longer need a schema change.
+rule_version records the rule set each row was calculated with and stays
+NULL for older rows.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FRAME_TYPES = ('18mm', '18mm-flis', '25mm', '26mm')
+
+
+def upgrade() -> None:
+    op.add_column('window_calculations', sa.Column('rule_version', sa.String(length=64), nullable=True))
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("ALTER TABLE window_calculations ALTER COLUMN frame_type TYPE VARCHAR(50) USING frame_type::text")
+        op.execute("DROP TYPE IF EXISTS frame_type_enum")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        # Fails if rows use frames added after the upgrade
+        values = ', '.join(f"'{frame}'" for frame in FRAME_TYPES)
+        op.execute(f"CREATE TYPE frame_type_enum AS ENUM ({values})")
+        op.execute(
+            "ALTER TABLE window_calculations ALTER COLUMN frame_type TYPE frame_type_enum "
+            "USING frame_type::frame_type_enum"
+        )
+    op.drop_column('window_calculations', 'rule_version')
@@ -0,0 +1,42 @@
+"""Quantity of identical openings per calculation
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:00.000000
+
+Identical openings of an order are stored as one row with a quantity;
+existing rows count as one opening each. The material summary weights its
+sums by quantity, so the column joins the others included in the
+(created_at, id) index.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SUMMARY_INCLUDE = ['frame_type', 'color', 'calculated_width', 'calculated_height',
+                   'wing_size', 'rope_length', 'net_size']
+
+
+def _recreate_created_at_index(include) -> None:
+    op.drop_index('ix_window_calculations_created_at_id', table_name='window_calculations', if_exists=True)
+    op.create_index(
+        'ix_window_calculations_created_at_id', 'window_calculations', ['created_at', 'id'],
+        postgresql_include=include,
+    )
+
+
+def upgrade() -> None:
+    op.add_column('window_calculations', sa.Column('quantity', sa.Integer(), nullable=False, server_default='1'))
+    _recreate_created_at_index(SUMMARY_INCLUDE[:2] + ['quantity'] + SUMMARY_INCLUDE[2:])
+
+
+def downgrade() -> None:
+    _recreate_created_at_index(SUMMARY_INCLUDE)
+    op.drop_column('window_calculations', 'quantity')
@@ -0,0 +1,41 @@
+"""Customer per calculation and indexes for the history search
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:00.000000
+
+The search filters on a customer name prefix, a created_at range, frame and
+color, and width/height ranges. Prefix matching is case-insensitive, so on
+PostgreSQL it is served by an expression index on lower(customer_name) with
+text_pattern_ops, which supports LIKE 'prefix%' under any collation; the
+(frame_type, color, created_at) index from 0001 covers the frame and color
+filters, and the new (selected_width, selected_height) index the sizes.
+Older rows have no customer.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('window_calculations', sa.Column('customer_name', sa.String(length=200), nullable=True))
+    op.create_index('ix_window_calculations_size', 'window_calculations', ['selected_width', 'selected_height'])
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(
+            "CREATE INDEX ix_window_calculations_customer_prefix ON window_calculations "
+            "(lower(customer_name) text_pattern_ops, created_at)"
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_window_calculations_customer_prefix', table_name='window_calculations')
+    op.drop_index('ix_window_calculations_size', table_name='window_calculations')
+    op.drop_column('window_calculations', 'customer_name')
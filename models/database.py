@@ -1,18 +1,52 @@
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Index, String
+from sqlalchemy.dialects.postgresql.asyncpg import AsyncpgString
+from sqlalchemy.types import TypeDecorator
 from datetime import datetime
 from typing import Optional
 
+# Columns summed by the material summary; included in the created_at index so
+# date-range summaries are answered from the index alone on PostgreSQL
+SUMMARY_COLUMNS = ['frame_type', 'color', 'quantity', 'calculated_width', 'calculated_height', 'wing_size', 'rope_length', 'net_size']
+
+class _UncastAsyncpgString(AsyncpgString):
+    render_bind_cast = False
+
+class FrameTypeString(TypeDecorator):
+    """VARCHAR frame type bound without asyncpg's ::VARCHAR cast
+
+    PostgreSQL then takes the parameter type from the column, so inserts and
+    filters work both on the VARCHAR column and on the frame_type_enum
+    column of databases not yet upgraded past migration 0003.
+    """
+    impl = String
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.driver == 'asyncpg':
+            return _UncastAsyncpgString(self.impl.length)
+        return dialect.type_descriptor(self.impl)
+
 class WindowCalculation(SQLModel, table=True):
     __tablename__ = "window_calculations"
+    __table_args__ = (
+        Index("ix_window_calculations_created_at_id", "created_at", "id", postgresql_include=SUMMARY_COLUMNS),
+        Index("ix_window_calculations_frame_type_color_created_at", "frame_type", "color", "created_at"),
+        Index("ix_window_calculations_size", "selected_width", "selected_height"),
+        # The lower(customer_name) prefix index is PostgreSQL only and created by migration 0005
+    )
     
     id: Optional[int] = Field(default=None, primary_key=True)
     selected_width: int
     selected_height: int
-    frame_type: str  # Use string directly to match database enum
+    frame_type: str = Field(sa_type=FrameTypeString(50))  # A frame of the rule set named by rule_version
     color: str = Field(max_length=50)
+    quantity: int = Field(default=1)  # Identical openings stored as one row
     calculated_width: int
     calculated_height: int
     wing_size: int
     rope_length: int
     net_size: float
-    created_at: datetime = Field(default_factory=datetime.utcnow)
\ No newline at end of file
+    rule_version: Optional[str] = Field(default=None, max_length=64)  # Frame rule set used; None before rules were versioned
+    customer_name: Optional[str] = Field(default=None, max_length=200)  # Customer or job the opening was sized for
+    created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,167 @@
+from typing import AsyncIterable, AsyncIterator, Iterator, List, Optional, Tuple
+import asyncio
+import io
+import json
+import os
+from services.database_service import AsyncDatabaseService
+from services.import_service import IMPORT_BATCH_SIZE, iter_calculation_batches, iter_record_batches
+from services.metrics import registry
+
+BATCH_MAX_BYTES = int(os.getenv("BATCH_MAX_BYTES", str(5 * 1024 * 1024)))
+BATCH_MAX_OPENINGS = int(os.getenv("BATCH_MAX_OPENINGS", "50000"))
+BATCH_MAX_CONCURRENT = int(os.getenv("BATCH_MAX_CONCURRENT", "2"))
+
+BATCH_OPENINGS_TOTAL = registry.counter(
+    'batch_openings_total', 'Openings calculated through the batch API', ['persisted'])
+
+Batches = Iterator[Tuple[List[dict], List[str]]]
+
+class BatchTooLargeError(Exception):
+    """Raised when a batch request exceeds the body size or opening count limit"""
+
+class BatchBusyError(Exception):
+    """Raised when the maximum number of batch requests is already running"""
+
+async def read_body(chunks: AsyncIterable[bytes], content_length: Optional[int] = None,
+                    max_bytes: int = BATCH_MAX_BYTES) -> bytes:
+    """Read a request body, giving up as soon as it exceeds `max_bytes`"""
+    if content_length is not None and content_length > max_bytes:
+        raise BatchTooLargeError(f"Request body larger than {max_bytes} bytes")
+    body = bytearray()
+    async for chunk in chunks:
+        body.extend(chunk)
+        if len(body) > max_bytes:
+            raise BatchTooLargeError(f"Request body larger than {max_bytes} bytes")
+    return bytes(body)
+
+def parse_openings(body: bytes, content_type: str, max_openings: int = BATCH_MAX_OPENINGS,
+                   batch_size: int = IMPORT_BATCH_SIZE) -> Batches:
+    """Turn a JSON or CSV request body into calculation batches
+
+    JSON is a list of opening objects or {"openings": [...]}; CSV has the
+    same columns as the import file. Raises ValueError for malformed bodies
+    and BatchTooLargeError for more than `max_openings` openings.
+    """
+    media_type = content_type.split(';')[0].strip().lower()
+    if media_type == 'application/json':
+        try:
+            data = json.loads(body)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON: {str(e)}") from None
+        openings = data.get('openings') if isinstance(data, dict) else data
+        if not isinstance(openings, list):
+            raise ValueError("Expected a list of openings")
+        if len(openings) > max_openings:
+            raise BatchTooLargeError(f"More than {max_openings} openings")
+        return iter_record_batches(openings, batch_size)
+    if media_type in ('text/csv', 'text/plain'):
+        text = body.decode('utf-8-sig')
+        # Upper bound: quoted fields could span lines, blank lines are skipped by the parser
+        if text.count('\n') - 1 > max_openings:
+            raise BatchTooLargeError(f"More than {max_openings} openings")
+        return iter_calculation_batches(io.StringIO(text, newline=''), batch_size)
+    raise ValueError(f"Unsupported content type: {content_type or 'none'}")
+
+def _ndjson(lines: List[dict]) -> str:
+    return ''.join(json.dumps(line) + '\n' for line in lines)
+
+class BatchCalculator:
+    """Runs batch calculations for the HTTP API as NDJSON streams
+
+    At most `max_concurrent` batches run at once; further requests are
+    rejected rather than queued. Validating, merging and calculating the
+    openings runs in a worker thread, so a large order does not hold up the
+    interactive UI on the event loop.
+    """
+
+    def __init__(self, max_concurrent: int = BATCH_MAX_CONCURRENT):
+        self.max_concurrent = max_concurrent
+        self.running = 0
+
+    def reserve(self) -> None:
+        """Take a slot for one batch, raising BatchBusyError if none is free"""
+        if self.running >= self.max_concurrent:
+            raise BatchBusyError(f"{self.running} batches already running")
+        self.running += 1
+
+    def release(self) -> None:
+        self.running -= 1
+
+    async def stream(self, batches: Batches, persist: bool = False,
+                     customer_name: Optional[str] = None) -> AsyncIterator[str]:
+        """Yield NDJSON chunks: one line per calculated opening or rejected row, then a summary
+
+        Runs in a slot taken with reserve() and releases it when it ends.
+        With `persist` each chunk is saved in one transaction before it is
+        sent and its lines carry the stored `id`; the first database failure
+        ends the stream, so everything sent before it is stored. A
+        `customer_name` is added to every opening.
+        """
+        try:
+            summary = {'calculated': 0, 'saved': 0, 'errors': 0}
+            batches = iter(batches)
+            # Batches that close a merge window also read and merge its rows
+            while (batch := await asyncio.to_thread(next, batches, None)) is not None:
+                calculations_data, errors = batch
+                if customer_name is not None:
+                    for data in calculations_data:
+                        data['customer_name'] = customer_name
+                lines = [{'error': error} for error in errors]
+                summary['errors'] += len(errors)
+                if persist and calculations_data:
+                    try:
+                        calculations = await AsyncDatabaseService.create_calculations(calculations_data)
+                    except Exception as db_error:
+                        summary['database_error'] = str(db_error)
+                        yield _ndjson(lines)
+                        break
+                    lines.extend({'id': calculation.id, **data} for calculation, data in zip(calculations, calculations_data))
+                    summary['saved'] += len(calculations)
+                else:
+                    lines.extend(calculations_data)
+                summary['calculated'] += len(calculations_data)
+                BATCH_OPENINGS_TOTAL.inc(len(calculations_data), persisted=str(persist).lower())
+                yield _ndjson(lines)
+            yield _ndjson([{'summary': summary}])
+        finally:
+            self.release()
+
+    async def _first_chunk_ready(self, chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+        first = await anext(chunks)
+
+        async def resume():
+            yield first
+            async for chunk in chunks:
+                yield chunk
+
+        return resume()
+
+    async def start(self, batches: Batches, persist: bool = False,
+                    customer_name: Optional[str] = None) -> AsyncIterator[str]:
+        """Begin a stream and return it once its first chunk is ready
+
+        BatchBusyError and errors in the input headers are raised here,
+        while the caller can still answer with an error status.
+        """
+        self.reserve()
+        return await self._first_chunk_ready(self.stream(batches, persist, customer_name))
+
+    async def start_request(self, body_chunks: AsyncIterable[bytes], content_length: Optional[int],
+                            content_type: str, persist: bool = False,
+                            customer_name: Optional[str] = None) -> AsyncIterator[str]:
+        """Read and parse a batch request body, then begin its stream like start()
+
+        The slot is taken before the body is read, so a request arriving while
+        all slots are in use is rejected without buffering or parsing it.
+        """
+        self.reserve()
+        try:
+            body = await read_body(body_chunks, content_length)
+            # JSON decoding of a large body would block the event loop
+            batches = await asyncio.to_thread(parse_openings, body, content_type)
+        except BaseException:
+            self.release()
+            raise
+        return await self._first_chunk_ready(self.stream(batches, persist, customer_name))
+
+batch_calculator = BatchCalculator()
@@ -0,0 +1,76 @@
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, List
+import asyncio
+import time
+from models.database import WindowCalculation
+
+class _LoadAbandoned(Exception):
+    """Set on a shared load when the session running it was cancelled"""
+
+class CalculationPageCache:
+    """Bounded read-through cache of history pages shared by all client sessions
+
+    Entries expire after `ttl` seconds and the least recently used entries are
+    evicted beyond `max_entries`. Concurrent misses for the same page share one
+    database query; if the session running that query goes away, one of the
+    waiting sessions runs it again. Writers call `invalidate` so sessions never
+    see stale pages from this process.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._generation = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def invalidate(self) -> None:
+        """Drop every cached page; queries already in flight are not stored"""
+        self._entries.clear()
+        self._generation += 1
+
+    async def get(self, key: Hashable, load: Callable[[], Awaitable[List[WindowCalculation]]]) -> List[WindowCalculation]:
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.hits += 1
+            try:
+                return await asyncio.shield(inflight)
+            except _LoadAbandoned:
+                return await self.get(key, load)
+
+        self.misses += 1
+        generation = self._generation
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            calculations = await load()
+        except asyncio.CancelledError:
+            # Cancelling the shared future would cancel every waiting session
+            future.set_exception(_LoadAbandoned())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when no other session is waiting
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        future.set_result(calculations)
+
+        if generation == self._generation:
+            self._entries[key] = (time.monotonic(), calculations)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return calculations
@@ -0,0 +1,112 @@
+from collections import Counter
+from enum import Enum
+from typing import Awaitable, Callable, Tuple, Type
+import asyncio
+import functools
+import logging
+import time
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency while its circuit is open"""
+
+class CircuitBreaker:
+    """Closed/open/half-open circuit breaker for async calls
+
+    After `failure_threshold` consecutive failures the circuit opens and calls
+    fail immediately with CircuitOpenError. Once `reset_timeout` seconds have
+    passed a single trial call is let through (half-open); its outcome closes
+    or re-opens the circuit. A background probe can close it earlier.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 1, reset_timeout: float = 30,
+                 failure_exceptions: Tuple[Type[BaseException], ...] = (Exception,)):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failure_exceptions = failure_exceptions
+        self.state = CircuitState.CLOSED
+        self.consecutive_failures = 0
+        self.transitions: Counter = Counter()
+        self.rejected_calls = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    def _transition(self, state: CircuitState) -> None:
+        if state == self.state:
+            return
+        logging.warning(f"Circuit '{self.name}' {self.state.value} -> {state.value}")
+        self.transitions[f"{self.state.value}->{state.value}"] += 1
+        self.state = state
+        if state == CircuitState.OPEN:
+            self._opened_at = time.monotonic()
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError if the call must not reach the dependency"""
+        if self.state == CircuitState.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._transition(CircuitState.HALF_OPEN)
+        if self.state == CircuitState.CLOSED:
+            return
+        if self.state == CircuitState.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return
+        self.rejected_calls += 1
+        raise CircuitOpenError(f"Circuit '{self.name}' is open")
+
+    def record_success(self) -> None:
+        self._trial_in_flight = False
+        self.consecutive_failures = 0
+        self._transition(CircuitState.CLOSED)
+
+    def record_failure(self) -> None:
+        self._trial_in_flight = False
+        self.consecutive_failures += 1
+        if self.state == CircuitState.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self._transition(CircuitState.OPEN)
+
+    def guard(self, func: Callable[..., Awaitable]):
+        """Decorator routing an async function through the breaker"""
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            self.before_call()
+            try:
+                result = await func(*args, **kwargs)
+            except self.failure_exceptions:
+                self.record_failure()
+                raise
+            except BaseException:
+                # Errors unrelated to availability neither open nor close the circuit
+                self._trial_in_flight = False
+                raise
+            self.record_success()
+            return result
+        return wrapper
+
+    async def probe_forever(self, probe: Callable[[], Awaitable], interval: float) -> None:
+        """Background task that closes the circuit as soon as `probe` succeeds again"""
+        while True:
+            await asyncio.sleep(interval)
+            if self.state == CircuitState.CLOSED:
+                continue
+            try:
+                await probe()
+            except Exception as e:
+                logging.info(f"Circuit '{self.name}' probe failed: {str(e)}")
+                if self.state == CircuitState.HALF_OPEN:
+                    self._transition(CircuitState.OPEN)
+                continue
+            self.record_success()
+
+    def snapshot(self) -> dict:
+        """Current state and counters for the UI and metrics"""
+        return {
+            'name': self.name,
+            'state': self.state.value,
+            'consecutive_failures': self.consecutive_failures,
+            'rejected_calls': self.rejected_calls,
+            'transitions': dict(self.transitions),
+        }
@@ -0,0 +1,178 @@
+from bisect import bisect_left, insort
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+import math
+import random
+import time
+from config import CUT_PIECES, CUT_STOCK
+
+CUT_IMPROVE_BUDGET = 0.2  # Seconds the improvement pass may spend per plan
+
+@dataclass
+class CutGroup:
+    """Cut plan for one material in one frame type and color
+
+    `bars` lists the piece lengths cut from each stock bar; pieces longer
+    than the stock cannot be cut and are listed in `oversized`.
+    """
+    material: str
+    frame: str
+    color: str
+    stock_length: int
+    kerf: int
+    bars: List[List[int]] = field(default_factory=list)
+    oversized: List[int] = field(default_factory=list)
+
+    def used_length(self, bar: List[int]) -> int:
+        """Length consumed by a bar's pieces and the cuts between them"""
+        return sum(bar) + self.kerf * max(len(bar) - 1, 0)
+
+    @property
+    def piece_count(self) -> int:
+        return sum(len(bar) for bar in self.bars)
+
+    @property
+    def waste(self) -> int:
+        return sum(self.stock_length - self.used_length(bar) for bar in self.bars)
+
+    @property
+    def utilization(self) -> float:
+        total = self.stock_length * len(self.bars)
+        return sum(sum(bar) for bar in self.bars) / total if total else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'material': self.material,
+            'frame': self.frame,
+            'color': self.color,
+            'stock_length': self.stock_length,
+            'kerf': self.kerf,
+            'bars': [
+                {'pieces': bar, 'waste': self.stock_length - self.used_length(bar)}
+                for bar in self.bars
+            ],
+            'oversized': self.oversized,
+            'bar_count': len(self.bars),
+            'piece_count': self.piece_count,
+            'waste': self.waste,
+            'utilization': round(self.utilization, 4),
+        }
+
+@dataclass
+class CutPlan:
+    groups: List[CutGroup] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {'groups': [group.to_dict() for group in self.groups]}
+
+def collect_pieces(rows: List[dict]) -> Dict[Tuple[str, str, str], List[int]]:
+    """Piece lengths per (material, frame, color) for table rows
+
+    Lengths are rounded up to whole millimetres so every piece fits its cut;
+    a row stands for `quantity` identical openings.
+    """
+    pieces = defaultdict(list)
+    for row in rows:
+        quantity = int(row.get('quantity', 1))
+        for material, columns in CUT_PIECES.items():
+            key = (material, row['frame'], row['color'])
+            for column, count in columns:
+                length = math.ceil(float(row[column]))
+                if length > 0:
+                    pieces[key].extend([length] * (count * quantity))
+    return pieces
+
+def _best_fit(bars: List[List[int]], pieces: List[int], capacity: int, kerf: int) -> None:
+    """Place pieces in the given order into the bar they fill most tightly, opening bars as needed
+
+    Bars are kept sorted by remaining length, so each placement is a binary search.
+    """
+    remaining = sorted((capacity - sum(bar) - kerf * len(bar), index) for index, bar in enumerate(bars))
+    for piece in pieces:
+        size = piece + kerf
+        position = bisect_left(remaining, (size, -1))
+        if position < len(remaining):
+            space, index = remaining.pop(position)
+        else:
+            space, index = capacity, len(bars)
+            bars.append([])
+        bars[index].append(piece)
+        if space - size > 0:
+            insort(remaining, (space - size, index))
+
+def pack_pieces(pieces: List[int], stock_length: int, kerf: int) -> Tuple[List[List[int]], List[int]]:
+    """Best fit decreasing packing of pieces into stock bars
+
+    A piece costs its length plus one kerf and a bar holds its length plus
+    one kerf, since the last piece needs no cut after it.
+    """
+    capacity = stock_length + kerf
+    oversized = [piece for piece in pieces if piece > stock_length]
+    bars: List[List[int]] = []
+    _best_fit(bars, sorted((piece for piece in pieces if piece <= stock_length), reverse=True), capacity, kerf)
+    return bars, oversized
+
+def _plan_cost(bars: List[List[int]], kerf: int) -> Tuple[int, int]:
+    # Fewer bars first, then waste concentrated in as few bars as possible,
+    # which leaves longer reusable offcuts
+    return len(bars), -sum((sum(bar) + kerf * len(bar)) ** 2 for bar in bars)
+
+def improve_bars(bars: List[List[int]], stock_length: int, kerf: int, deadline: float,
+                 seed: int = 0) -> List[List[int]]:
+    """Iterated greedy improvement of a packing until the deadline
+
+    Each round empties the two least filled bars and a few random others and
+    packs their pieces again with best fit, in an order that is only roughly
+    longest first; the result is kept unless it is worse. Stops early once
+    the bar count reaches the lower bound given by the total piece length.
+    """
+    rng = random.Random(seed)
+    capacity = stock_length + kerf
+    lower_bound = math.ceil(sum(piece + kerf for bar in bars for piece in bar) / capacity)
+    best = [list(bar) for bar in bars]
+    best_cost = _plan_cost(best, kerf)
+    while len(best) > max(lower_bound, 1) and time.perf_counter() < deadline:
+        order = sorted(range(len(best)), key=lambda index: sum(best[index]) + kerf * len(best[index]))
+        emptied = set(order[:2])
+        emptied.update(rng.sample(order[2:], min(len(order) - 2, rng.randint(1, 3))))
+        candidate = [list(bar) for index, bar in enumerate(best) if index not in emptied]
+        pieces = [piece for index in emptied for piece in best[index]]
+        pieces.sort(key=lambda piece: piece * rng.uniform(0.7, 1.0), reverse=True)
+        _best_fit(candidate, pieces, capacity, kerf)
+        cost = _plan_cost(candidate, kerf)
+        if cost <= best_cost:
+            best, best_cost = candidate, cost
+    return best
+
+class CuttingService:
+
+    @staticmethod
+    def plan(rows: List[dict], time_budget: float = CUT_IMPROVE_BUDGET,
+             stock: Optional[Dict[str, dict]] = None) -> CutPlan:
+        """Build a waste-minimizing cut plan for the pieces of the given table rows
+
+        Every group is packed with best fit decreasing, then the time budget
+        is shared by an improvement pass over the groups. A budget of 0 skips
+        the improvement pass.
+        """
+        stock = stock or CUT_STOCK
+        deadline = time.perf_counter() + time_budget
+        plan = CutPlan()
+        for (material, frame, color), pieces in sorted(collect_pieces(rows).items()):
+            stock_length, kerf = stock[material]['length'], stock[material]['kerf']
+            bars, oversized = pack_pieces(pieces, stock_length, kerf)
+            plan.groups.append(CutGroup(material, frame, color, stock_length, kerf, bars, oversized))
+        for position, group in enumerate(plan.groups):
+            # Each group gets an equal share of the time the earlier groups left over
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            group_deadline = now + (deadline - now) / (len(plan.groups) - position)
+            group.bars = improve_bars(group.bars, group.stock_length, group.kerf, group_deadline)
+        for group in plan.groups:
+            # Fullest bars first, longest pieces first within a bar
+            for bar in group.bars:
+                bar.sort(reverse=True)
+            group.bars.sort(key=group.used_length, reverse=True)
+        return plan
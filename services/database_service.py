@@ -1,36 +1,248 @@
 from sqlmodel import Session, select
-from sqlalchemy.exc import OperationalError, DisconnectionError
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import delete, func, insert, text, tuple_
+from sqlalchemy.exc import OperationalError, DisconnectionError, InterfaceError, TimeoutError as PoolTimeoutError
 from models.database import WindowCalculation
-from database.config import engine
-from typing import List
+from database.config import (
+    engine,
+    async_engine,
+    DB_CIRCUIT_FAILURE_THRESHOLD,
+    DB_CIRCUIT_RESET_TIMEOUT,
+    DB_HEALTH_PROBE_TIMEOUT,
+    CALCULATION_CACHE_SIZE,
+    CALCULATION_CACHE_TTL,
+)
+from services.circuit_breaker import CircuitBreaker, CircuitState
+from services.calculation_cache import CalculationPageCache
+from services.metrics import registry
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from datetime import datetime
+import asyncio
+import functools
 import time
 import logging
 
+DB_OPERATION_SECONDS = registry.histogram(
+    'db_operation_seconds', 'Duration of database service calls including retries', ['operation', 'outcome'])
+DB_RETRIES_TOTAL = registry.counter(
+    'db_retries_total', 'Database calls retried after a connection error', ['operation'])
+
 def retry_db_operation(max_retries=3, delay=1, backoff=2):
     """Decorator to retry database operations with exponential backoff"""
     def decorator(func):
         def wrapper(*args, **kwargs):
             retries = 0
+            start = time.perf_counter()
             while retries < max_retries:
                 try:
-                    return func(*args, **kwargs)
+                    result = func(*args, **kwargs)
+                    DB_OPERATION_SECONDS.observe(time.perf_counter() - start, operation=func.__name__, outcome='success')
+                    return result
                 except (OperationalError, DisconnectionError) as e:
                     retries += 1
                     if retries >= max_retries:
                         logging.error(f"Database operation failed after {max_retries} retries: {str(e)}")
+                        DB_OPERATION_SECONDS.observe(time.perf_counter() - start, operation=func.__name__, outcome='error')
                         raise
                     
                     wait_time = delay * (backoff ** (retries - 1))
                     logging.warning(f"Database connection failed, retrying in {wait_time}s... (attempt {retries}/{max_retries})")
+                    DB_RETRIES_TOTAL.inc(operation=func.__name__)
                     time.sleep(wait_time)
                 except Exception as e:
                     # Don't retry non-connection errors
                     logging.error(f"Non-connection database error: {str(e)}")
+                    DB_OPERATION_SECONDS.observe(time.perf_counter() - start, operation=func.__name__, outcome='error')
+                    raise
+            return None
+        return wrapper
+    return decorator
+
+def async_retry_db_operation(max_retries=3, delay=1, backoff=2):
+    """Decorator to retry async database operations with exponential backoff
+
+    Waits with asyncio.sleep, so other handlers keep running during the backoff.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            retries = 0
+            start = time.perf_counter()
+            while retries < max_retries:
+                try:
+                    result = await func(*args, **kwargs)
+                    DB_OPERATION_SECONDS.observe(time.perf_counter() - start, operation=func.__name__, outcome='success')
+                    return result
+                except (OperationalError, DisconnectionError, OSError) as e:
+                    # asyncpg raises connection refusals as plain OSError
+                    retries += 1
+                    if retries >= max_retries:
+                        logging.error(f"Database operation failed after {max_retries} retries: {str(e)}")
+                        DB_OPERATION_SECONDS.observe(time.perf_counter() - start, operation=func.__name__, outcome='error')
+                        raise
+                    
+                    wait_time = delay * (backoff ** (retries - 1))
+                    logging.warning(f"Database connection failed, retrying in {wait_time}s... (attempt {retries}/{max_retries})")
+                    DB_RETRIES_TOTAL.inc(operation=func.__name__)
+                    await asyncio.sleep(wait_time)
+                except Exception as e:
+                    # Don't retry non-connection errors
+                    logging.error(f"Non-connection database error: {str(e)}")
+                    DB_OPERATION_SECONDS.observe(time.perf_counter() - start, operation=func.__name__, outcome='error')
                     raise
             return None
         return wrapper
     return decorator
 
+# Errors meaning the database could not be reached, as opposed to a statement it rejected
+DB_UNAVAILABLE_ERRORS = (OperationalError, DisconnectionError, InterfaceError, PoolTimeoutError, OSError, asyncio.TimeoutError)
+
+# Shared by every AsyncDatabaseService call; only availability errors trip it
+db_circuit_breaker = CircuitBreaker(
+    "database",
+    failure_threshold=DB_CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=DB_CIRCUIT_RESET_TIMEOUT,
+    failure_exceptions=DB_UNAVAILABLE_ERRORS,
+)
+
+# Recent history pages shared by every client session of this process
+calculation_page_cache = CalculationPageCache(CALCULATION_CACHE_SIZE, CALCULATION_CACHE_TTL)
+
+# Read from the breaker and the cache when scraped
+registry.gauge('db_circuit_state', 'Database circuit breaker state (1 for the current state)', ['state'],
+               callback=lambda: {(state.value,): int(db_circuit_breaker.state == state) for state in CircuitState})
+registry.counter('db_circuit_rejected_calls_total', 'Database calls rejected while the circuit was open',
+                 callback=lambda: {(): db_circuit_breaker.rejected_calls})
+registry.counter('db_circuit_transitions_total', 'Database circuit breaker state changes', ['transition'],
+                 callback=lambda: {(transition,): count for transition, count in db_circuit_breaker.transitions.items()})
+registry.counter('calculation_cache_requests_total', 'History page cache lookups', ['result'],
+                 callback=lambda: {('hit',): calculation_page_cache.hits, ('miss',): calculation_page_cache.misses})
+
+def _bulk_insert_rows(calculations_data: List[dict]) -> List[dict]:
+    return [WindowCalculation(**data).model_dump(exclude={'id'}) for data in calculations_data]
+
+def _bulk_insert_statement():
+    return insert(WindowCalculation).returning(WindowCalculation, sort_by_parameter_order=True)
+
+@dataclass(frozen=True)
+class CalculationFilter:
+    """Criteria of a history search; None leaves a criterion out
+
+    `customer` matches a case-insensitive prefix of the customer name,
+    `start` is inclusive and `end` exclusive, the size bounds apply to the
+    selected width and height and are inclusive. Frozen so it can be part of
+    a page cache key.
+    """
+    customer: Optional[str] = None
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    frame_type: Optional[str] = None
+    color: Optional[str] = None
+    min_width: Optional[int] = None
+    max_width: Optional[int] = None
+    min_height: Optional[int] = None
+    max_height: Optional[int] = None
+
+def _filter_statement(statement, filters: Optional[CalculationFilter]):
+    """Add the WHERE clauses of a search
+
+    Each criterion maps onto an index: lower(customer_name) prefix,
+    (frame_type, color, created_at), (selected_width, selected_height) and
+    the created_at partitions.
+    """
+    if filters is None:
+        return statement
+    if filters.customer:
+        statement = statement.where(
+            func.lower(WindowCalculation.customer_name).startswith(filters.customer.lower(), autoescape=True))
+    if filters.start is not None:
+        statement = statement.where(WindowCalculation.created_at >= filters.start)
+    if filters.end is not None:
+        statement = statement.where(WindowCalculation.created_at < filters.end)
+    if filters.frame_type is not None:
+        statement = statement.where(WindowCalculation.frame_type == filters.frame_type)
+    if filters.color is not None:
+        statement = statement.where(WindowCalculation.color == filters.color)
+    if filters.min_width is not None:
+        statement = statement.where(WindowCalculation.selected_width >= filters.min_width)
+    if filters.max_width is not None:
+        statement = statement.where(WindowCalculation.selected_width <= filters.max_width)
+    if filters.min_height is not None:
+        statement = statement.where(WindowCalculation.selected_height >= filters.min_height)
+    if filters.max_height is not None:
+        statement = statement.where(WindowCalculation.selected_height <= filters.max_height)
+    return statement
+
+def _page_statement(limit: int, after: Optional[Tuple[datetime, int]], filters: Optional[CalculationFilter] = None):
+    statement = _filter_statement(select(WindowCalculation), filters).order_by(
+        WindowCalculation.created_at.desc(), WindowCalculation.id.desc()
+    )
+    if after is not None:
+        # The plain created_at bound is implied by the row comparison, but only
+        # it lets PostgreSQL skip the partitions of newer months
+        statement = statement.where(
+            tuple_(WindowCalculation.created_at, WindowCalculation.id) < tuple_(*after),
+            WindowCalculation.created_at <= after[0],
+        )
+    return statement.limit(limit)
+
+def _bulk_delete_statement(calculation_ids: List[int]):
+    return (
+        delete(WindowCalculation)
+        .where(WindowCalculation.id.in_(calculation_ids))
+        .returning(WindowCalculation.id)
+    )
+
+@dataclass
+class MaterialSummary:
+    """Totals of the calculated lengths for one frame type and color"""
+    frame_type: str
+    color: str
+    openings: int
+    calculated_width: int
+    calculated_height: int
+    wing_size: int
+    rope_length: int
+    net_size: float
+
+    @classmethod
+    def from_row(cls, row) -> "MaterialSummary":
+        # PostgreSQL returns SUM of integers as bigint and of DECIMAL as Decimal
+        return cls(
+            frame_type=row.frame_type,
+            color=row.color,
+            openings=int(row.openings),
+            calculated_width=int(row.calculated_width),
+            calculated_height=int(row.calculated_height),
+            wing_size=int(row.wing_size),
+            rope_length=int(row.rope_length),
+            net_size=float(row.net_size),
+        )
+
+def _summary_statement(start: Optional[datetime], end: Optional[datetime]):
+    """Totals per frame type and color for rows created in [start, end), weighted by quantity"""
+    quantity = WindowCalculation.quantity
+    statement = select(
+        WindowCalculation.frame_type,
+        WindowCalculation.color,
+        func.sum(quantity).label('openings'),
+        func.sum(WindowCalculation.calculated_width * quantity).label('calculated_width'),
+        func.sum(WindowCalculation.calculated_height * quantity).label('calculated_height'),
+        func.sum(WindowCalculation.wing_size * quantity).label('wing_size'),
+        func.sum(WindowCalculation.rope_length * quantity).label('rope_length'),
+        func.sum(WindowCalculation.net_size * quantity).label('net_size'),
+    )
+    if start is not None:
+        statement = statement.where(WindowCalculation.created_at >= start)
+    if end is not None:
+        statement = statement.where(WindowCalculation.created_at < end)
+    return (
+        statement
+        .group_by(WindowCalculation.frame_type, WindowCalculation.color)
+        .order_by(WindowCalculation.frame_type, WindowCalculation.color)
+    )
+
 class DatabaseService:
     
     @staticmethod
@@ -45,6 +257,20 @@ class DatabaseService:
             db_session.refresh(calculation)
             return calculation
     
+    @staticmethod
+    @retry_db_operation(max_retries=3, delay=1, backoff=2)
+    def create_calculations(calculations_data: List[dict]) -> List[WindowCalculation]:
+        """Create many window calculation records in a single transaction"""
+        if not calculations_data:
+            return []
+        
+        with Session(engine, expire_on_commit=False) as db_session:
+            statement = _bulk_insert_statement()
+            result = db_session.exec(statement, params=_bulk_insert_rows(calculations_data))
+            calculations = list(result.scalars().all())
+            db_session.commit()
+            return calculations
+    
     @staticmethod
     @retry_db_operation(max_retries=3, delay=1, backoff=2)
     def get_all_calculations() -> List[WindowCalculation]:
@@ -53,6 +279,34 @@ class DatabaseService:
             statement = select(WindowCalculation)
             return list(session.exec(statement).all())
     
+    @staticmethod
+    @retry_db_operation(max_retries=3, delay=1, backoff=2)
+    def get_calculations_page(limit: int, after: Optional[Tuple[datetime, int]] = None) -> List[WindowCalculation]:
+        """Get one page of calculations, newest first, using keyset pagination
+
+        `after` is the (created_at, id) key of the last row of the previous page.
+        """
+        with Session(engine) as session:
+            return list(session.exec(_page_statement(limit, after)).all())
+    
+    @staticmethod
+    @retry_db_operation(max_retries=3, delay=1, backoff=2)
+    def search_calculations(filters: CalculationFilter, limit: int,
+                            after: Optional[Tuple[datetime, int]] = None) -> List[WindowCalculation]:
+        """Get one page of the calculations matching `filters`, newest first, using keyset pagination"""
+        with Session(engine) as session:
+            return list(session.exec(_page_statement(limit, after, filters)).all())
+    
+    @staticmethod
+    @retry_db_operation(max_retries=3, delay=1, backoff=2)
+    def get_material_summary(start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[MaterialSummary]:
+        """Totals per frame type and color, aggregated in the database
+
+        `start` is inclusive and `end` exclusive; either may be None for an open range.
+        """
+        with Session(engine) as session:
+            return [MaterialSummary.from_row(row) for row in session.exec(_summary_statement(start, end)).all()]
+    
     @staticmethod
     @retry_db_operation(max_retries=3, delay=1, backoff=2)
     def delete_calculation(calculation_id: int) -> bool:
@@ -63,4 +317,142 @@ class DatabaseService:
                 session.delete(calculation)
                 session.commit()
                 return True
-            return False
\ No newline at end of file
+            return False
+    
+    @staticmethod
+    @retry_db_operation(max_retries=3, delay=1, backoff=2)
+    def delete_calculations(calculation_ids: List[int]) -> List[int]:
+        """Delete many calculations in one statement and return the ids actually removed"""
+        if not calculation_ids:
+            return []
+        
+        with Session(engine) as session:
+            deleted_ids = list(session.exec(_bulk_delete_statement(calculation_ids)).scalars().all())
+            session.commit()
+            return deleted_ids
+
+class AsyncDatabaseService:
+    """Async counterpart of DatabaseService for use from event-loop handlers
+
+    Every call goes through db_circuit_breaker, so while the database is down
+    calls fail immediately with CircuitOpenError instead of retrying.
+    """
+    
+    @staticmethod
+    async def ping() -> None:
+        """Health probe: one round trip without retries or the circuit breaker
+
+        Gives up after DB_HEALTH_PROBE_TIMEOUT so a host that drops packets
+        does not stall the probe loop.
+        """
+        async with asyncio.timeout(DB_HEALTH_PROBE_TIMEOUT):
+            async with async_engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+    
+    @staticmethod
+    @db_circuit_breaker.guard
+    @async_retry_db_operation(max_retries=3, delay=1, backoff=2)
+    async def create_calculation(calculation_data: dict) -> WindowCalculation:
+        """Create a new window calculation record"""
+        calculation = WindowCalculation(**calculation_data)
+        
+        async with AsyncSession(async_engine, expire_on_commit=False) as db_session:
+            db_session.add(calculation)
+            await db_session.commit()
+            await db_session.refresh(calculation)
+            calculation_page_cache.invalidate()
+            return calculation
+    
+    @staticmethod
+    @db_circuit_breaker.guard
+    @async_retry_db_operation(max_retries=3, delay=1, backoff=2)
+    async def create_calculations(calculations_data: List[dict]) -> List[WindowCalculation]:
+        """Create many window calculation records in a single transaction"""
+        if not calculations_data:
+            return []
+        
+        async with AsyncSession(async_engine, expire_on_commit=False) as db_session:
+            result = await db_session.exec(_bulk_insert_statement(), params=_bulk_insert_rows(calculations_data))
+            calculations = list(result.scalars().all())
+            await db_session.commit()
+            calculation_page_cache.invalidate()
+            return calculations
+    
+    @staticmethod
+    @db_circuit_breaker.guard
+    @async_retry_db_operation(max_retries=3, delay=1, backoff=2)
+    async def get_all_calculations() -> List[WindowCalculation]:
+        """Get all calculations ordered by creation date"""
+        async with AsyncSession(async_engine) as session:
+            result = await session.exec(select(WindowCalculation))
+            return list(result.all())
+    
+    @staticmethod
+    @db_circuit_breaker.guard
+    @async_retry_db_operation(max_retries=3, delay=1, backoff=2)
+    async def get_calculations_page(limit: int, after: Optional[Tuple[datetime, int]] = None) -> List[WindowCalculation]:
+        """Get one page of calculations, newest first, using keyset pagination"""
+        async with AsyncSession(async_engine) as session:
+            result = await session.exec(_page_statement(limit, after))
+            return list(result.all())
+    
+    @staticmethod
+    @db_circuit_breaker.guard
+    @async_retry_db_operation(max_retries=3, delay=1, backoff=2)
+    async def search_calculations(filters: CalculationFilter, limit: int,
+                                  after: Optional[Tuple[datetime, int]] = None) -> List[WindowCalculation]:
+        """Get one page of the calculations matching `filters`, newest first, using keyset pagination"""
+        async with AsyncSession(async_engine) as session:
+            result = await session.exec(_page_statement(limit, after, filters))
+            return list(result.all())
+    
+    @staticmethod
+    @db_circuit_breaker.guard
+    @async_retry_db_operation(max_retries=3, delay=1, backoff=2)
+    async def get_material_summary(start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[MaterialSummary]:
+        """Totals per frame type and color, aggregated in the database"""
+        async with AsyncSession(async_engine) as session:
+            result = await session.exec(_summary_statement(start, end))
+            return [MaterialSummary.from_row(row) for row in result.all()]
+    
+    @staticmethod
+    async def get_cached_calculations_page(limit: int, after: Optional[Tuple[datetime, int]] = None,
+                                           filters: Optional[CalculationFilter] = None) -> List[WindowCalculation]:
+        """Read-through variant of get_calculations_page, or of search_calculations with `filters`,
+        backed by calculation_page_cache"""
+        if filters is None:
+            return await calculation_page_cache.get(
+                (limit, after), lambda: AsyncDatabaseService.get_calculations_page(limit, after)
+            )
+        return await calculation_page_cache.get(
+            (limit, after, filters), lambda: AsyncDatabaseService.search_calculations(filters, limit, after)
+        )
+    
+    @staticmethod
+    @db_circuit_breaker.guard
+    @async_retry_db_operation(max_retries=3, delay=1, backoff=2)
+    async def delete_calculation(calculation_id: int) -> bool:
+        """Delete a calculation"""
+        async with AsyncSession(async_engine) as session:
+            calculation = await session.get(WindowCalculation, calculation_id)
+            if calculation:
+                await session.delete(calculation)
+                await session.commit()
+                calculation_page_cache.invalidate()
+                return True
+            return False
+    
+    @staticmethod
+    @db_circuit_breaker.guard
+    @async_retry_db_operation(max_retries=3, delay=1, backoff=2)
+    async def delete_calculations(calculation_ids: List[int]) -> List[int]:
+        """Delete many calculations in one statement and return the ids actually removed"""
+        if not calculation_ids:
+            return []
+        
+        async with AsyncSession(async_engine) as session:
+            result = await session.exec(_bulk_delete_statement(calculation_ids))
+            deleted_ids = list(result.scalars().all())
+            await session.commit()
+            calculation_page_cache.invalidate()
+            return deleted_ids
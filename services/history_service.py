@@ -0,0 +1,108 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+from models.database import WindowCalculation
+from services.database_service import AsyncDatabaseService, CalculationFilter
+
+HISTORY_PAGE_SIZE = 50
+
+def calculation_to_row(calc: WindowCalculation) -> dict:
+    """Convert a stored calculation into a UI table row"""
+    return {
+        'id': calc.id,
+        'customer_name': calc.customer_name,
+        'selected_width': calc.selected_width,
+        'selected_height': calc.selected_height,
+        'frame': calc.frame_type,
+        'color': calc.color,
+        'quantity': calc.quantity,
+        'calculated_width': calc.calculated_width,
+        'calculated_height': calc.calculated_height,
+        'wing': calc.wing_size,
+        'rope': calc.rope_length,
+        'net': calc.net_size,
+    }
+
+async def iter_history_row_chunks(chunk_size: int, filters: Optional[CalculationFilter] = None) -> AsyncIterator[List[dict]]:
+    """Yield the whole history, or the calculations matching `filters`, as table rows,
+    newest first, one keyset page at a time
+
+    Bypasses the shared page cache so long exports do not evict the pages
+    interactive sessions are looking at.
+    """
+    after = None
+    while True:
+        if filters is None:
+            calculations = await AsyncDatabaseService.get_calculations_page(chunk_size, after=after)
+        else:
+            calculations = await AsyncDatabaseService.search_calculations(filters, chunk_size, after=after)
+        if calculations:
+            yield [calculation_to_row(calc) for calc in calculations]
+        if len(calculations) < chunk_size:
+            return
+        last = calculations[-1]
+        after = (last.created_at, last.id)
+
+@dataclass
+class HistoryPage:
+    page: int
+    calculations: List[WindowCalculation]
+    has_more: bool
+
+class HistoryPager:
+    """Keyset pager over the calculation history, newest first
+
+    Remembers the (created_at, id) key that ends each page it has seen, so
+    every page is fetched with one indexed range query regardless of how
+    deep it is or how large the table has grown. With `filters` set it pages
+    through the matching calculations only.
+    """
+
+    def __init__(self, page_size: int = HISTORY_PAGE_SIZE):
+        self.page_size = page_size
+        self.filters: Optional[CalculationFilter] = None
+        self._cursors: List[Optional[Tuple[datetime, int]]] = [None]
+
+    def reset(self) -> None:
+        """Forget page boundaries after rows were inserted or deleted"""
+        self._cursors = [None]
+
+    def forget_after(self, page: int) -> None:
+        """Forget the boundaries of the pages after `page` once rows on it were deleted"""
+        del self._cursors[max(page, 1):]
+
+    def search(self, filters: Optional[CalculationFilter]) -> None:
+        """Page through the calculations matching `filters` from now on; None shows everything"""
+        self.filters = filters
+        self.reset()
+
+    async def fetch(self, page: int) -> HistoryPage:
+        """Fetch a page, walking forward from the last known page if needed"""
+        page = max(page, 1)
+        current = min(page, len(self._cursors))
+        while True:
+            calculations = await AsyncDatabaseService.get_cached_calculations_page(
+                self.page_size + 1, after=self._cursors[current - 1], filters=self.filters
+            )
+            has_more = len(calculations) > self.page_size
+            calculations = calculations[:self.page_size]
+            if has_more:
+                last = calculations[-1]
+                cursor = (last.created_at, last.id)
+                if current < len(self._cursors):
+                    self._cursors[current] = cursor
+                else:
+                    self._cursors.append(cursor)
+            if current >= page or not has_more:
+                return HistoryPage(current, calculations, has_more)
+            current += 1
+
+    def rows_number(self, history_page: HistoryPage) -> int:
+        """Row count to report to the table: the rows seen so far plus one if more exist
+
+        Only a lower bound while more rows exist, but enough for the table to
+        offer the next page; the history table's pagination label shows it as
+        "more" rather than as a total.
+        """
+        seen = (history_page.page - 1) * self.page_size + len(history_page.calculations)
+        return seen + (1 if history_page.has_more else 0)
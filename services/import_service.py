@@ -0,0 +1,197 @@
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+import asyncio
+import csv
+import functools
+import itertools
+import os
+from calculations import calculate_batch
+from config import COLOR_OPTIONS
+from frame_rules import RuleSet, frame_rules
+from models.database import WindowCalculation
+from services.database_service import AsyncDatabaseService
+
+IMPORT_BATCH_SIZE = 500
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", str(5 * 1024 * 1024)))
+# Distinct openings held while merging identical ones before they are calculated
+IMPORT_MERGE_WINDOW = int(os.getenv("IMPORT_MERGE_WINDOW", "5000"))
+
+# Accepted header names for each input column (English keys and UI labels)
+HEADER_ALIASES = {
+    'width': ('width', 'sirina', 'selected_width'),
+    'height': ('height', 'visina', 'selected_height'),
+    'frame': ('frame', 'ram', 'frame_type'),
+    'color': ('color', 'boja'),
+    'quantity': ('quantity', 'kolicina', 'qty'),
+}
+# Columns that may be left out; a missing quantity counts as 1
+OPTIONAL_COLUMNS = ('quantity',)
+
+Opening = Tuple[int, int, str, str]
+
+@dataclass
+class ImportResult:
+    calculations: List[WindowCalculation] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+    database_error: Optional[str] = None
+
+def _resolve_headers(fieldnames: List[str]) -> dict:
+    """Map each input column to the header used in the file"""
+    normalized = {name.strip().lower(): name for name in fieldnames if name}
+    headers = {}
+    for column, aliases in HEADER_ALIASES.items():
+        match = next((normalized[alias] for alias in aliases if alias in normalized), None)
+        if match is None:
+            if column in OPTIONAL_COLUMNS:
+                continue
+            raise ValueError(f"Missing column: {column}")
+        headers[column] = match
+    return headers
+
+@functools.lru_cache(maxsize=64)
+def _resolve_record_headers(keys: Tuple[str, ...]) -> dict:
+    return _resolve_headers(list(keys))
+
+def _validate_row(row: dict, headers: dict, rules: RuleSet) -> Tuple[Opening, int]:
+    width = (row.get(headers['width']) or '').strip()
+    height = (row.get(headers['height']) or '').strip()
+    frame = (row.get(headers['frame']) or '').strip()
+    color = (row.get(headers['color']) or '').strip()
+    quantity = (row.get(headers['quantity']) or '1').strip() if 'quantity' in headers else '1'
+    if not width.isdigit() or int(width) <= 0:
+        raise ValueError(f"Invalid width: {width!r}")
+    if not height.isdigit() or int(height) <= 0:
+        raise ValueError(f"Invalid height: {height!r}")
+    if frame not in rules.rules:
+        raise ValueError("Invalid frame value")
+    if color not in COLOR_OPTIONS:
+        raise ValueError(f"Invalid color: {color!r}")
+    if not quantity.isdigit() or int(quantity) <= 0:
+        raise ValueError(f"Invalid quantity: {quantity!r}")
+    return (int(width), int(height), frame, color), int(quantity)
+
+def iter_calculation_batches(stream: TextIO, batch_size: int = IMPORT_BATCH_SIZE,
+                             merge_window: int = IMPORT_MERGE_WINDOW) -> Iterator[Tuple[List[dict], List[str]]]:
+    """Parse a CSV stream of openings and yield computed calculation data in batches
+
+    Each batch is a tuple of (calculation_data, errors) where errors describe
+    lines rejected since the previous batch (see _iter_batches). The whole
+    file is calculated with the rule set current when parsing starts.
+    """
+    sample = stream.read(4096)
+    stream.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.DictReader(stream, dialect=dialect)
+    headers = _resolve_headers(reader.fieldnames or [])
+    yield from _iter_batches(((f"Line {reader.line_num}", row) for row in reader), headers, batch_size, merge_window)
+
+def iter_record_batches(records: Iterable[dict], batch_size: int = IMPORT_BATCH_SIZE,
+                        merge_window: int = IMPORT_MERGE_WINDOW) -> Iterator[Tuple[List[dict], List[str]]]:
+    """Like iter_calculation_batches for openings given as objects, e.g. parsed JSON
+
+    Keys are matched like CSV headers, separately for every object since
+    optional keys such as quantity may be left out of some; an object missing
+    a required key is rejected. Values may be numbers or strings. Errors name
+    the 1-based item position.
+    """
+    records = iter(records)
+    first = next(records, None)
+    if first is None:
+        return
+    if not isinstance(first, dict):
+        raise ValueError("Openings must be objects")
+    rows = (
+        (f"Item {position}", {key: str(value) for key, value in record.items() if value is not None}
+         if isinstance(record, dict) else {})
+        for position, record in enumerate(itertools.chain([first], records), start=1)
+    )
+    yield from _iter_batches(rows, None, batch_size, merge_window)
+
+def _iter_batches(rows: Iterator[Tuple[str, dict]], headers: Optional[dict], batch_size: int,
+                  merge_window: int) -> Iterator[Tuple[List[dict], List[str]]]:
+    """Merge identical openings within a window of rows, then calculate them in batches
+
+    Rows with the same width, height, frame and color become one opening
+    whose quantity is their sum, in order of first appearance. Once
+    `merge_window` distinct openings are held, a new opening first sends the
+    window out in batches, so memory stays bounded and results flow before
+    the whole input is read; an opening repeated in a later window gets a row
+    of its own there. Rejected rows are reported with the first batch of
+    their window. Without `headers` they are resolved from the keys of each
+    row.
+    """
+    rules = frame_rules.current
+    quantities: Dict[Opening, int] = {}
+    errors = []
+    for location, row in rows:
+        try:
+            opening, quantity = _validate_row(row, headers or _resolve_record_headers(tuple(row)), rules)
+        except ValueError as e:
+            errors.append(f"{location}: {str(e)}")
+            continue
+        if opening not in quantities and len(quantities) >= merge_window:
+            yield from _window_batches(quantities, errors, rules, batch_size)
+            quantities, errors = {}, []
+        quantities[opening] = quantities.get(opening, 0) + quantity
+    yield from _window_batches(quantities, errors, rules, batch_size)
+
+def _window_batches(quantities: Dict[Opening, int], errors: List[str], rules: RuleSet,
+                    batch_size: int) -> Iterator[Tuple[List[dict], List[str]]]:
+    openings = list(quantities.items())
+    for start in range(0, len(openings), batch_size):
+        yield _compute_batch(openings[start:start + batch_size], rules), errors if start == 0 else []
+    if not openings and errors:
+        yield [], errors
+
+def _compute_batch(openings: List[Tuple[Opening, int]], rules: RuleSet) -> List[dict]:
+    if not openings:
+        return []
+    keys, quantities = zip(*openings)
+    widths, heights, frames, colors = zip(*keys)
+    results = {name: column.tolist() for name, column in calculate_batch(widths, heights, frames, rules).items()}
+    return [
+        {
+            'selected_width': widths[i],
+            'selected_height': heights[i],
+            'frame_type': frames[i],
+            'color': colors[i],
+            'quantity': quantities[i],
+            'calculated_width': results['calculated_width'][i],
+            'calculated_height': results['calculated_height'][i],
+            'wing_size': results['wing'][i],
+            'rope_length': results['rope'][i],
+            'net_size': float(results['net'][i]),
+            'rule_version': rules.version,
+        }
+        for i in range(len(openings))
+    ]
+
+class ImportService:
+
+    @staticmethod
+    async def import_csv(stream: TextIO, batch_size: int = IMPORT_BATCH_SIZE,
+                         customer_name: Optional[str] = None) -> ImportResult:
+        """Import openings from a CSV stream, saving each batch in one transaction
+
+        Every opening is stored for `customer_name`. Stops at the first
+        database failure; batches saved before it are kept in the result and
+        the failure is reported in database_error. Reading, validating and
+        calculating the openings runs in a worker thread, so a large file does
+        not hold up other sessions on the event loop.
+        """
+        result = ImportResult()
+        batches = iter_calculation_batches(stream, batch_size)
+        while (batch := await asyncio.to_thread(next, batches, None)) is not None:
+            calculations_data, errors = batch
+            result.errors.extend(errors)
+            for data in calculations_data:
+                data['customer_name'] = customer_name
+            try:
+                result.calculations.extend(await AsyncDatabaseService.create_calculations(calculations_data))
+            except Exception as db_error:
+                result.database_error = str(db_error)
+                break
+        return result
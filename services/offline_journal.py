@@ -0,0 +1,133 @@
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+from services.circuit_breaker import CircuitState
+from services.database_service import AsyncDatabaseService, db_circuit_breaker
+
+OFFLINE_JOURNAL_PATH = os.getenv("OFFLINE_JOURNAL_PATH", "offline_journal.db")
+OFFLINE_REPLAY_INTERVAL = float(os.getenv("OFFLINE_REPLAY_INTERVAL", "5"))
+OFFLINE_REPLAY_BATCH_SIZE = int(os.getenv("OFFLINE_REPLAY_BATCH_SIZE", "500"))
+
+class OfflineJournal:
+    """Append-only SQLite journal of writes made while the database is down
+
+    Rows inserted offline get negative ids (minus the journal sequence number),
+    so they can never collide with the positive SERIAL ids of the database.
+    Deleting such a row before it was replayed simply drops its insert entry;
+    deleting a database row appends a delete entry.
+    """
+
+    def __init__(self, path: str = OFFLINE_JOURNAL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS journal (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                op TEXT NOT NULL CHECK (op IN ('insert', 'delete')),
+                calculation_id INTEGER,
+                payload TEXT
+            )
+        """)
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM journal").fetchone()[0]
+
+    def record_insert(self, calculation_data: dict) -> int:
+        """Journal an insert and return the local (negative) id of the row"""
+        payload = dict(calculation_data)
+        payload.setdefault('created_at', datetime.utcnow())
+        payload['created_at'] = payload['created_at'].isoformat()
+        with self._lock:
+            cursor = self._connection.execute(
+                "INSERT INTO journal (op, payload) VALUES ('insert', ?)", (json.dumps(payload),)
+            )
+            return -cursor.lastrowid
+
+    def record_delete(self, calculation_ids: List[int]) -> None:
+        """Journal deletes; rows that only exist in the journal are dropped from it"""
+        local = [(-calculation_id,) for calculation_id in calculation_ids if calculation_id < 0]
+        stored = [(calculation_id,) for calculation_id in calculation_ids if calculation_id > 0]
+        # The connection commits on success and rolls back on an error
+        with self._lock, self._connection:
+            self._connection.execute("BEGIN")
+            self._connection.executemany("DELETE FROM journal WHERE seq = ? AND op = 'insert'", local)
+            self._connection.executemany(
+                "INSERT INTO journal (op, calculation_id) VALUES ('delete', ?)", stored
+            )
+
+    def pending_inserts(self, limit: Optional[int] = None) -> List[Tuple[int, dict]]:
+        """Journaled inserts as (local id, calculation data), oldest first"""
+        query = "SELECT seq, payload FROM journal WHERE op = 'insert' ORDER BY seq"
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        with self._lock:
+            rows = self._connection.execute(query).fetchall()
+        entries = []
+        for seq, payload in rows:
+            data = json.loads(payload)
+            data['created_at'] = datetime.fromisoformat(data['created_at'])
+            entries.append((-seq, data))
+        return entries
+
+    def pending_deletes(self, limit: Optional[int] = None) -> List[Tuple[int, int]]:
+        """Journaled deletes as (journal seq, database id), oldest first"""
+        query = "SELECT seq, calculation_id FROM journal WHERE op = 'delete' ORDER BY seq"
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        with self._lock:
+            return self._connection.execute(query).fetchall()
+
+    def pending_counts(self) -> Dict[str, int]:
+        """Number of journaled operations by type"""
+        with self._lock:
+            rows = self._connection.execute("SELECT op, COUNT(*) FROM journal GROUP BY op").fetchall()
+        return {'insert': 0, 'delete': 0, **dict(rows)}
+
+    def _forget(self, seqs: List[int]) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("BEGIN")
+            self._connection.executemany("DELETE FROM journal WHERE seq = ?", [(seq,) for seq in seqs])
+
+    async def replay(self, batch_size: int = OFFLINE_REPLAY_BATCH_SIZE) -> int:
+        """Write journaled changes to the database, one transaction per batch
+
+        Each batch is removed from the journal once its transaction committed.
+        Returns the number of journal entries replayed.
+        """
+        replayed = 0
+        while inserts := self.pending_inserts(batch_size):
+            await AsyncDatabaseService.create_calculations([data for _, data in inserts])
+            self._forget([-local_id for local_id, _ in inserts])
+            replayed += len(inserts)
+        while deletes := self.pending_deletes(batch_size):
+            await AsyncDatabaseService.delete_calculations([calculation_id for _, calculation_id in deletes])
+            self._forget([seq for seq, _ in deletes])
+            replayed += len(deletes)
+        return replayed
+
+    async def replay_forever(self, on_replayed: Optional[Callable[[int], Awaitable]] = None,
+                             interval: float = OFFLINE_REPLAY_INTERVAL) -> None:
+        """Background task replaying the journal whenever the database circuit is closed"""
+        while True:
+            await asyncio.sleep(interval)
+            if db_circuit_breaker.state != CircuitState.CLOSED or not len(self):
+                continue
+            try:
+                replayed = await self.replay()
+            except Exception as e:
+                logging.warning(f"Offline journal replay interrupted: {str(e)}")
+                continue
+            logging.info(f"Replayed {replayed} offline journal entries")
+            if on_replayed is not None:
+                await on_replayed(replayed)
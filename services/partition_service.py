@@ -0,0 +1,199 @@
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+import asyncio
+import csv
+import gzip
+import logging
+import os
+import re
+import tempfile
+from sqlalchemy import text
+from database.config import (
+    engine,
+    PARTITION_PREMAKE_MONTHS,
+    PARTITION_RETENTION_MONTHS,
+    PARTITION_ARCHIVE_DIR,
+    PARTITION_MAINTENANCE_INTERVAL,
+)
+from models.database import WindowCalculation
+import services.database_service as database_service
+
+TABLE = WindowCalculation.__tablename__
+ARCHIVE_COLUMNS = list(WindowCalculation.model_fields)
+ARCHIVE_BATCH_SIZE = 1000
+
+_PARTITION_PATTERN = re.compile(rf'^{TABLE}_(\d{{4}})_(\d{{2}})$')
+_MONTH_PATTERN = re.compile(r'^(\d{4})-(\d{2})$')
+
+def month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def add_months(month: datetime, count: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+def partition_name(month: datetime) -> str:
+    return f'{TABLE}_{month:%Y_%m}'
+
+def partition_month(name: str) -> Optional[datetime]:
+    """Month a partition table covers, or None for other tables"""
+    match = _PARTITION_PATTERN.match(name)
+    return datetime(int(match[1]), int(match[2]), 1) if match else None
+
+def parse_month(value: str) -> Optional[datetime]:
+    """Parse a YYYY-MM month, returning None if it is malformed"""
+    match = _MONTH_PATTERN.match(value)
+    if not match or not 1 <= int(match[2]) <= 12:
+        return None
+    return datetime(int(match[1]), int(match[2]), 1)
+
+def export_table(connection, table_name: str, path: str) -> int:
+    """Stream a table into a gzip-compressed CSV file and return the row count
+
+    The file is written under a temporary name and renamed when complete, so
+    an archive file on disk is never partial.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, part_path = tempfile.mkstemp(dir=directory, suffix='.part')
+    os.close(fd)
+    count = 0
+    try:
+        result = connection.execution_options(stream_results=True, yield_per=ARCHIVE_BATCH_SIZE).execute(
+            text(f"SELECT {', '.join(ARCHIVE_COLUMNS)} FROM {table_name} ORDER BY created_at, id"))
+        with gzip.open(part_path, 'wt', newline='') as archive_file:
+            writer = csv.writer(archive_file)
+            writer.writerow(ARCHIVE_COLUMNS)
+            for row in result:
+                writer.writerow(row)
+                count += 1
+            archive_file.flush()
+            os.fsync(archive_file.fileno())
+        os.replace(part_path, path)
+    except BaseException:
+        os.remove(part_path)
+        raise
+    return count
+
+class PartitionManager:
+    """Creates monthly partitions ahead of time and archives expired ones
+
+    Only acts on PostgreSQL once migration 0002 has partitioned the table;
+    elsewhere every operation is a no-op. An expired partition is detached
+    first, so queries stop seeing it at once, then exported to
+    `<archive_dir>/window_calculations_YYYY_MM.csv.gz` and dropped. A
+    partition left detached by a failed export is picked up again by the
+    next run.
+    """
+
+    def __init__(self, db_engine=engine, archive_dir: str = PARTITION_ARCHIVE_DIR,
+                 retention_months: int = PARTITION_RETENTION_MONTHS, premake_months: int = PARTITION_PREMAKE_MONTHS):
+        self.engine = db_engine
+        self.archive_dir = archive_dir
+        self.retention_months = retention_months
+        self.premake_months = premake_months
+
+    def archive_path(self, month: datetime) -> str:
+        return os.path.join(self.archive_dir, f'{partition_name(month)}.csv.gz')
+
+    def _is_partitioned(self, connection) -> bool:
+        if connection.dialect.name != 'postgresql':
+            return False
+        return connection.execute(text(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = :table AND c.relnamespace = current_schema()::regnamespace"
+        ), {'table': TABLE}).first() is not None
+
+    def _monthly_tables(self, connection) -> List[Tuple[datetime, str, bool]]:
+        """(month, table name, attached) for every monthly partition table, oldest first"""
+        attached = set(connection.execute(text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:table AS regclass)"
+        ), {'table': TABLE}).scalars())
+        names = connection.execute(text(
+            "SELECT tablename FROM pg_tables WHERE schemaname = current_schema()"
+        )).scalars()
+        tables = [(partition_month(name), name, name in attached) for name in names]
+        return sorted(table for table in tables if table[0] is not None)
+
+    def ensure_partitions(self, now: Optional[datetime] = None) -> List[str]:
+        """Create the partitions for this month and the next `premake_months`; returns the new ones"""
+        current = month_start(now or datetime.utcnow())
+        with self.engine.connect() as connection:
+            if not self._is_partitioned(connection):
+                return []
+            existing = {name for _, name, _ in self._monthly_tables(connection)}
+        created = []
+        for offset in range(self.premake_months + 1):
+            month = add_months(current, offset)
+            name = partition_name(month)
+            if name in existing:
+                continue
+            try:
+                with self.engine.begin() as connection:
+                    connection.execute(text(
+                        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {TABLE} "
+                        f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+                    ))
+                created.append(name)
+            except Exception as e:
+                # Fails when the default partition already holds rows of that month
+                logging.error(f"Creating partition {name} failed: {str(e)}")
+        return created
+
+    def archive_expired(self, now: Optional[datetime] = None) -> List[str]:
+        """Detach, export and drop partitions older than the retention period; returns the archived tables"""
+        if self.retention_months <= 0:
+            return []
+        cutoff = add_months(month_start(now or datetime.utcnow()), -self.retention_months)
+        with self.engine.connect() as connection:
+            if not self._is_partitioned(connection):
+                return []
+            expired = [table for table in self._monthly_tables(connection) if table[0] < cutoff]
+        archived = []
+        for month, name, attached in expired:
+            if attached:
+                with self.engine.begin() as connection:
+                    connection.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}"))
+                database_service.calculation_page_cache.invalidate()
+            with self.engine.begin() as connection:
+                rows = export_table(connection, name, self.archive_path(month))
+                connection.execute(text(f"DROP TABLE {name}"))
+            logging.info(f"Archived {rows} rows of {name} to {self.archive_path(month)}")
+            archived.append(name)
+        return archived
+
+    def maintain(self, now: Optional[datetime] = None) -> None:
+        self.ensure_partitions(now)
+        self.archive_expired(now)
+
+    async def maintain_forever(self, interval: float = PARTITION_MAINTENANCE_INTERVAL) -> None:
+        """Background task keeping partitions ahead of time and archiving expired ones"""
+        while True:
+            try:
+                await asyncio.to_thread(self.maintain)
+            except Exception as e:
+                logging.error(f"Partition maintenance failed: {str(e)}")
+            await asyncio.sleep(interval)
+
+    def list_archives(self) -> List[datetime]:
+        """Months with an archive file, oldest first"""
+        try:
+            names = os.listdir(self.archive_dir)
+        except FileNotFoundError:
+            return []
+        months = [partition_month(name[:-len('.csv.gz')]) for name in names if name.endswith('.csv.gz')]
+        return sorted(month for month in months if month is not None)
+
+    def read_archive(self, month: datetime) -> Iterator[WindowCalculation]:
+        """Read the calculations of an archived month back, oldest first
+
+        The rows are returned as detached WindowCalculation objects and are not
+        written back to the database. Raises FileNotFoundError if the month
+        has no archive.
+        """
+        with gzip.open(self.archive_path(month), 'rt', newline='') as archive_file:
+            for row in csv.DictReader(archive_file):
+                yield WindowCalculation.model_validate({key: value or None for key, value in row.items()})
+
+partition_manager = PartitionManager()
@@ -0,0 +1,58 @@
+from collections import OrderedDict
+from typing import List, Optional
+import hashlib
+import json
+import threading
+
+def pdf_cache_key(rows: List[dict], columns: List[dict], customer_name: str, **sections) -> str:
+    """Content hash of everything that ends up in the rendered PDF
+
+    `sections` holds the data of optional report sections, such as the cut plan.
+    """
+    payload = json.dumps(
+        {'rows': rows, 'columns': columns, 'customer_name': customer_name, **sections},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class PdfCache:
+    """Thread-safe LRU cache of rendered PDFs bounded by total size in bytes"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            pdf_bytes = self._entries.get(key)
+            if pdf_bytes is not None:
+                self._entries.move_to_end(key)
+            return pdf_bytes
+
+    def put(self, key: str, pdf_bytes: bytes) -> None:
+        if len(pdf_bytes) > self.max_bytes:
+            return  # Never evict everything for a single oversized document
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = pdf_bytes
+            self._size += len(pdf_bytes)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
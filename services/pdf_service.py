@@ -0,0 +1,388 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterable, Iterable, List, Optional
+import asyncio
+import datetime
+import gc
+import logging
+import multiprocessing
+import os
+import time
+from config import TABLE_COLUMNS
+from services.pdf_cache import PdfCache, pdf_cache_key
+from services.pdf_spool import pdf_spool
+from services.cutting_service import CutPlan
+from services.metrics import registry, SIZE_BUCKETS
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates')
+PDF_TEMPLATE = 'pdf_template.html'
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "2"))
+PDF_MAX_PENDING = int(os.getenv("PDF_MAX_PENDING", "8"))
+# Reports above PDF_LARGE_REPORT_ROWS are laid out PDF_CHUNK_ROWS rows at a time
+PDF_CHUNK_ROWS = int(os.getenv("PDF_CHUNK_ROWS", "500"))
+PDF_LARGE_REPORT_ROWS = int(os.getenv("PDF_LARGE_REPORT_ROWS", "1000"))
+# The cut plan needs every row in memory at once, so reports with one are capped
+PDF_MAX_REPORT_ROWS = int(os.getenv("PDF_MAX_REPORT_ROWS", "50000"))
+# Load Jinja2, the template and WeasyPrint in the background after startup
+PDF_PREWARM = os.getenv("PDF_PREWARM", "1") == "1"
+
+# WeasyPrint (pango, cairo), pypdf and Jinja2 are imported on first use so
+# they do not delay the server binding its port.
+_template_env = None
+pdf_cache = PdfCache(PDF_CACHE_MAX_BYTES)
+
+PDF_RENDER_SECONDS = registry.histogram(
+    'pdf_render_seconds', 'Time to render a PDF, including waiting for a worker', ['mode'])
+PDF_SIZE_BYTES = registry.histogram(
+    'pdf_size_bytes', 'Size of rendered PDFs', ['mode'], buckets=SIZE_BUCKETS)
+PDF_CACHE_REQUESTS_TOTAL = registry.counter(
+    'pdf_cache_requests_total', 'PDF document cache lookups', ['result'])
+
+class PdfQueueFullError(Exception):
+    """Raised when the render pool already has the maximum number of jobs queued"""
+
+class PdfReportTooLargeError(Exception):
+    """Raised when a report with a cut plan has more rows than PDF_MAX_REPORT_ROWS"""
+
+def get_template_env():
+    """The Jinja2 environment, created on first use
+
+    One environment for the life of the process; with auto_reload Jinja2 keeps
+    the compiled template and only recompiles it when the file's mtime changes.
+    """
+    global _template_env
+    if _template_env is None:
+        from jinja2 import Environment, FileSystemLoader
+        _template_env = Environment(loader=FileSystemLoader(TEMPLATES_DIR), auto_reload=True)
+    return _template_env
+
+def load_weasyprint() -> None:
+    """Import WeasyPrint so the first layout does not pay for it (executed in a worker process)"""
+    import weasyprint  # type: ignore  # noqa: F401
+
+def write_pdf(html_out: str) -> bytes:
+    """Lay out HTML and return PDF bytes (executed in a worker process)"""
+    from weasyprint import HTML  # type: ignore
+    return HTML(string=html_out).write_pdf()
+
+def write_pdf_file(html_out: str, path: str) -> None:
+    """Lay out HTML and write the PDF straight to a file (executed in a worker process)"""
+    from weasyprint import HTML  # type: ignore
+    HTML(string=html_out).write_pdf(path)
+
+def merge_pdf_files(part_paths: List[str], path: str) -> None:
+    """Concatenate PDF files into one (executed in a worker process)
+
+    The parts are copied one at a time: the objects used by a part's pages
+    are renumbered and written straight to `path`, and only their offsets and
+    the page references are kept, so memory depends on the largest part
+    rather than on the whole report. The result has one flat page tree;
+    document-level entries of the parts such as outlines are dropped.
+    """
+    from pypdf import PdfReader
+    from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject, NullObject, NumberObject
+
+    pages_ref = IndirectObject(1, 0, None)
+    catalog_ref = IndirectObject(2, 0, None)
+    offsets = {}
+    page_refs = ArrayObject()
+    next_number = 3
+
+    def write_object(pdf_file, number: int, obj) -> None:
+        offsets[number] = pdf_file.tell()
+        pdf_file.write(f"{number} 0 obj\n".encode())
+        obj.write_to_stream(pdf_file)
+        pdf_file.write(b"\nendobj\n")
+
+    with open(path, 'wb') as pdf_file:
+        pdf_file.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+        for part_path in part_paths:
+            reader = PdfReader(part_path)
+            numbers = {}
+            pending = []
+
+            def renumber(obj):
+                # References of the part become references to the merged file's numbers
+                nonlocal next_number
+                if isinstance(obj, IndirectObject):
+                    key = (obj.idnum, obj.generation)
+                    if key not in numbers:
+                        numbers[key] = next_number
+                        next_number += 1
+                        pending.append(key)
+                    return IndirectObject(numbers[key], 0, None)
+                if isinstance(obj, DictionaryObject):
+                    for name, value in list(obj.items()):
+                        obj[name] = renumber(value)
+                elif isinstance(obj, ArrayObject):
+                    for index, value in enumerate(obj):
+                        obj[index] = renumber(value)
+                return obj
+
+            # Pages carry the attributes they inherited from the part's page tree
+            pages = {}
+            for page in reader.pages:
+                reference = page.indirect_reference
+                pages[(reference.idnum, reference.generation)] = page
+                page_refs.append(renumber(reference))
+            while pending:
+                key = pending.pop()
+                obj = pages.get(key)
+                if obj is None:
+                    obj = reader.get_object(IndirectObject(key[0], key[1], reader))
+                    obj = NullObject() if obj is None else renumber(obj)
+                else:
+                    # Leave the part's page tree behind and hang the page under the merged one
+                    del obj[NameObject('/Parent')]
+                    obj = renumber(obj)
+                    obj[NameObject('/Parent')] = pages_ref
+                write_object(pdf_file, numbers[key], obj)
+            # The reader and its pages refer to each other; free the part before the next
+            del reader, pages
+            gc.collect()
+
+        write_object(pdf_file, 1, DictionaryObject({
+            NameObject('/Type'): NameObject('/Pages'),
+            NameObject('/Kids'): page_refs,
+            NameObject('/Count'): NumberObject(len(page_refs)),
+        }))
+        write_object(pdf_file, 2, DictionaryObject({
+            NameObject('/Type'): NameObject('/Catalog'),
+            NameObject('/Pages'): pages_ref,
+        }))
+
+        xref_offset = pdf_file.tell()
+        pdf_file.write(f"xref\n0 {next_number}\n0000000000 65535 f \n".encode())
+        for number in range(1, next_number):
+            pdf_file.write(f"{offsets[number]:010d} 00000 n \n".encode())
+        trailer = DictionaryObject({NameObject('/Size'): NumberObject(next_number), NameObject('/Root'): catalog_ref})
+        pdf_file.write(b"trailer\n")
+        trailer.write_to_stream(pdf_file)
+        pdf_file.write(f"\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+
+async def iter_row_chunks(rows: Iterable[dict], chunk_size: int = PDF_CHUNK_ROWS,
+                          rest: Optional[AsyncIterable[List[dict]]] = None):
+    """Split in-memory rows into the chunks expected by export_to_spool, followed by the chunks of `rest`"""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+    if rest is not None:
+        async for chunk in rest:
+            yield chunk
+
+class PdfRenderPool:
+    """Process pool that runs WeasyPrint layouts off the event loop
+
+    At most `max_pending` jobs may be queued or running at once; further
+    requests are rejected instead of piling up behind large reports. Workers
+    are spawned rather than forked, since the server process runs threads
+    whose locks a fork would copy in an arbitrary state. When a worker dies,
+    e.g. killed for running out of memory, its jobs fail and the pool is
+    replaced so later jobs run again.
+    """
+
+    def __init__(self, workers: int = PDF_WORKERS, max_pending: int = PDF_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def start(self) -> None:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, fn, *args):
+        """Run a PDF job in a worker process
+
+        Cancelling the awaiting task drops a job that has not started yet;
+        a job already running finishes in its worker and its result is
+        discarded. Its slot is only released when the job has ended, so
+        cancelled jobs still count against `max_pending` while they run.
+        """
+        if self.pending >= self.max_pending:
+            raise PdfQueueFullError(f"{self.pending} PDF jobs already queued")
+        self.start()
+        executor = self._executor
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._replace_broken(executor)
+            raise
+        self.pending += 1
+        loop = asyncio.get_running_loop()
+        future.add_done_callback(lambda _: self._release(loop))
+        try:
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            self._replace_broken(executor)
+            raise
+
+    def _replace_broken(self, executor: ProcessPoolExecutor) -> None:
+        # Every job of a broken pool fails; only the first one to notice replaces it
+        if self._executor is executor:
+            logging.error("PDF worker process died; restarting the render pool")
+            self.shutdown()
+            self.start()
+
+    def _release(self, loop: asyncio.AbstractEventLoop) -> None:
+        # Runs in the executor's result thread, or on the loop for a job cancelled before it started
+        try:
+            loop.call_soon_threadsafe(self._decrement_pending)
+        except RuntimeError:
+            pass  # Event loop closed at shutdown
+
+    def _decrement_pending(self) -> None:
+        self.pending -= 1
+
+    async def render(self, html_out: str) -> bytes:
+        """Render HTML to PDF bytes in a worker process"""
+        return await self.run(write_pdf, html_out)
+
+pdf_pool = PdfRenderPool()
+
+class PdfService:
+
+    @staticmethod
+    async def prewarm() -> None:
+        """Compile the template and import WeasyPrint in the render workers
+
+        Started in the background after startup so the first PDF a user asks
+        for is not slowed down by imports. Failures are only logged; the
+        same error surfaces again when a PDF is requested.
+        """
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(lambda: get_template_env().get_template(PDF_TEMPLATE))
+            await asyncio.gather(*(pdf_pool.run(load_weasyprint) for _ in range(pdf_pool.workers)))
+        except Exception as e:
+            logging.warning(f"PDF pre-warm failed: {str(e)}")
+            return
+        logging.info(f"PDF rendering pre-warmed in {time.perf_counter() - start:.2f}s")
+
+    @staticmethod
+    def render_html(rows: List[dict], customer_name: str, columns: List[dict] = TABLE_COLUMNS,
+                    show_header: bool = True, show_footer: bool = True, timestamp: Optional[str] = None,
+                    cut_plan: Optional[dict] = None, material_summary: Optional[dict] = None) -> str:
+        """Render the PDF template to an HTML string
+
+        `cut_plan` is a CutPlan.to_dict() rendered as a section after the table;
+        `material_summary` holds a `period` label and summary `rows` rendered
+        as a table above the footer.
+        """
+        template = get_template_env().get_template(PDF_TEMPLATE)
+        return template.render(
+            columns=columns,
+            rows=rows,
+            customer_name=customer_name,
+            show_header=show_header,
+            show_footer=show_footer,
+            cut_plan=cut_plan,
+            material_summary=material_summary,
+            timestamp=timestamp or datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+        )
+
+    @staticmethod
+    def generate_pdf(rows: List[dict], customer_name: str, columns: List[dict] = TABLE_COLUMNS,
+                     cut_plan: Optional[CutPlan] = None, material_summary: Optional[dict] = None) -> bytes:
+        """Render rows to PDF, reusing a cached document when the content is unchanged
+
+        A cached document keeps the timestamp of its first render.
+        """
+        plan = cut_plan.to_dict() if cut_plan is not None else None
+        key = pdf_cache_key(rows, columns, customer_name, cut_plan=plan, material_summary=material_summary)
+        pdf_bytes = pdf_cache.get(key)
+        if pdf_bytes is None:
+            PDF_CACHE_REQUESTS_TOTAL.inc(result='miss')
+            with PDF_RENDER_SECONDS.time(mode='single'):
+                html_out = PdfService.render_html(rows, customer_name, columns, cut_plan=plan,
+                                                  material_summary=material_summary)
+                pdf_bytes = write_pdf(html_out)
+            PDF_SIZE_BYTES.observe(len(pdf_bytes), mode='single')
+            pdf_cache.put(key, pdf_bytes)
+        else:
+            PDF_CACHE_REQUESTS_TOTAL.inc(result='hit')
+        return pdf_bytes
+
+    @staticmethod
+    async def generate_pdf_async(rows: List[dict], customer_name: str, columns: List[dict] = TABLE_COLUMNS,
+                                 cut_plan: Optional[CutPlan] = None, material_summary: Optional[dict] = None) -> bytes:
+        """Like generate_pdf, but lays out the document on the worker process pool"""
+        plan = cut_plan.to_dict() if cut_plan is not None else None
+        key = pdf_cache_key(rows, columns, customer_name, cut_plan=plan, material_summary=material_summary)
+        pdf_bytes = pdf_cache.get(key)
+        if pdf_bytes is None:
+            PDF_CACHE_REQUESTS_TOTAL.inc(result='miss')
+            with PDF_RENDER_SECONDS.time(mode='single'):
+                html_out = PdfService.render_html(rows, customer_name, columns, cut_plan=plan,
+                                                  material_summary=material_summary)
+                pdf_bytes = await pdf_pool.render(html_out)
+            PDF_SIZE_BYTES.observe(len(pdf_bytes), mode='single')
+            pdf_cache.put(key, pdf_bytes)
+        else:
+            PDF_CACHE_REQUESTS_TOTAL.inc(result='hit')
+        return pdf_bytes
+
+    @staticmethod
+    async def export_to_spool(row_chunks: AsyncIterable[List[dict]], customer_name: str,
+                              columns: List[dict] = TABLE_COLUMNS, cut_plan: Optional[CutPlan] = None,
+                              material_summary: Optional[dict] = None) -> str:
+        """Render a large report chunk by chunk into the spool and return its token
+
+        Each chunk is laid out as its own document and written to a part file,
+        then the parts are concatenated one at a time (see merge_pdf_files),
+        so peak memory depends on the chunk size rather than on the number of
+        rows. The header is rendered with the first chunk; the cut plan,
+        summary and footer with the last one.
+        """
+        plan = cut_plan.to_dict() if cut_plan is not None else None
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+        start = time.perf_counter()
+        part_paths = []
+        try:
+            previous = None
+            async for chunk in row_chunks:
+                if previous is not None:
+                    part_paths.append(await PdfService._write_part(
+                        previous, customer_name, columns, timestamp, show_header=not part_paths, show_footer=False))
+                previous = chunk
+            part_paths.append(await PdfService._write_part(
+                previous or [], customer_name, columns, timestamp, show_header=not part_paths, show_footer=True,
+                cut_plan=plan, material_summary=material_summary))
+
+            pdf_path = await asyncio.to_thread(pdf_spool.new_part)
+            part_paths.append(pdf_path)
+            await pdf_pool.run(merge_pdf_files, part_paths[:-1], pdf_path)
+            PDF_SIZE_BYTES.observe(os.path.getsize(pdf_path), mode='chunked')
+            token = await asyncio.to_thread(pdf_spool.publish, pdf_path)
+            part_paths.pop()
+            PDF_RENDER_SECONDS.observe(time.perf_counter() - start, mode='chunked')
+            return token
+        finally:
+            for part_path in part_paths:
+                try:
+                    os.remove(part_path)
+                except FileNotFoundError:
+                    pass
+
+    @staticmethod
+    async def _write_part(rows: List[dict], customer_name: str, columns: List[dict], timestamp: str, **sections) -> str:
+        html_out = PdfService.render_html(rows, customer_name, columns, timestamp=timestamp, **sections)
+        part_path = await asyncio.to_thread(pdf_spool.new_part)
+        try:
+            await pdf_pool.run(write_pdf_file, html_out, part_path)
+        except BaseException:
+            os.remove(part_path)
+            raise
+        return part_path
@@ -0,0 +1,118 @@
+from typing import List, Optional, Tuple
+import asyncio
+import logging
+import os
+import re
+import tempfile
+import time
+import uuid
+
+PDF_SPOOL_DIR = os.getenv("PDF_SPOOL_DIR", os.path.join(tempfile.gettempdir(), 'window-sizer-pdf'))
+PDF_SPOOL_MAX_BYTES = int(os.getenv("PDF_SPOOL_MAX_BYTES", str(256 * 1024 * 1024)))
+PDF_SPOOL_TTL = int(os.getenv("PDF_SPOOL_TTL", "3600"))
+PDF_SPOOL_SWEEP_INTERVAL = int(os.getenv("PDF_SPOOL_SWEEP_INTERVAL", "60"))
+
+_TOKEN_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+class PdfSpool:
+    """Directory of generated PDFs bounded by total size and age
+
+    Files are addressed by random tokens so they can be served from a single
+    parameterized route; `sweep` removes expired files and, when the spool is
+    over its size limit, the oldest ones.
+    """
+
+    def __init__(self, directory: str = PDF_SPOOL_DIR, max_bytes: int = PDF_SPOOL_MAX_BYTES, ttl: int = PDF_SPOOL_TTL):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+    def _path(self, token: str) -> str:
+        return os.path.join(self.directory, f'{token}.pdf')
+
+    def new_part(self) -> str:
+        """Create an empty file to write a PDF into before it is published
+
+        Part files count towards the spool size and expire like PDFs, so the
+        sweeper also removes ones left behind by failed exports.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=self.directory, suffix='.part')
+        os.close(fd)
+        return path
+
+    def publish(self, part_path: str) -> str:
+        """Move a completed part file into the spool and return its token"""
+        token = uuid.uuid4().hex
+        os.replace(part_path, self._path(token))
+        return token
+
+    def add(self, pdf_bytes: bytes) -> str:
+        """Store a PDF and return the token it is served under"""
+        # Write under a temporary name so readers never see a partial file
+        part_path = self.new_part()
+        with open(part_path, 'wb') as part_file:
+            part_file.write(pdf_bytes)
+        return self.publish(part_path)
+
+    def get_path(self, token: str) -> Optional[str]:
+        """Return the file for a token, or None if it is unknown or expired"""
+        if not _TOKEN_PATTERN.match(token):
+            return None
+        path = self._path(token)
+        try:
+            modified = os.path.getmtime(path)
+        except OSError:
+            return None
+        if time.time() - modified > self.ttl:
+            return None
+        return path
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        entries = []
+        try:
+            with os.scandir(self.directory) as scan:
+                for entry in scan:
+                    if entry.is_file() and entry.name.endswith(('.pdf', '.part')):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except FileNotFoundError:
+            pass
+        return sorted(entries)
+
+    def sweep(self) -> int:
+        """Remove expired files and the oldest files beyond the size limit
+
+        Part files count towards the size but are only removed once expired,
+        since a fresh one may belong to an export still being written.
+        """
+        now = time.time()
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for modified, size, path in entries:
+            if now - modified <= self.ttl:
+                if total <= self.max_bytes:
+                    break
+                if path.endswith('.part'):
+                    continue
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        return removed
+
+    async def sweep_forever(self, interval: int = PDF_SPOOL_SWEEP_INTERVAL) -> None:
+        """Background task that sweeps the spool periodically"""
+        while True:
+            try:
+                removed = await asyncio.to_thread(self.sweep)
+                if removed:
+                    logging.info(f"Removed {removed} files from PDF spool")
+            except Exception as e:
+                logging.error(f"PDF spool sweep failed: {str(e)}")
+            await asyncio.sleep(interval)
+
+pdf_spool = PdfSpool()
@@ -0,0 +1,43 @@
+import asyncio
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, create_engine
+import services.database_service as database_service
+from services.calculation_cache import CalculationPageCache
+from services.circuit_breaker import CircuitState
+
+
+@pytest.fixture
+def sqlite_engine(monkeypatch):
+    """In-memory SQLite engine swapped in for the PostgreSQL engine"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(database_service, "engine", engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def async_sqlite_engine(monkeypatch):
+    """In-memory aiosqlite engine swapped in for the async PostgreSQL engine"""
+    engine = create_async_engine(
+        "sqlite+aiosqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    
+    async def create_tables():
+        async with engine.begin() as connection:
+            await connection.run_sync(SQLModel.metadata.create_all)
+    
+    asyncio.run(create_tables())
+    monkeypatch.setattr(database_service, "async_engine", engine)
+    monkeypatch.setattr(database_service.db_circuit_breaker, "state", CircuitState.CLOSED)
+    monkeypatch.setattr(database_service, "calculation_page_cache", CalculationPageCache(max_entries=64, ttl=30))
+    yield engine
+    asyncio.run(engine.dispose())
@@ -0,0 +1,125 @@
+import asyncio
+import json
+import pytest
+import services.batch_service as batch_service
+from services.batch_service import (
+    BatchBusyError,
+    BatchCalculator,
+    BatchTooLargeError,
+    parse_openings,
+    read_body,
+)
+from services.database_service import AsyncDatabaseService
+
+
+OPENINGS = [
+    {'width': 800, 'height': 1200, 'frame': '18mm', 'color': 'Bjela'},
+    {'width': 600, 'height': 800, 'frame': '30mm', 'color': 'Siva'},
+    {'width': '100', 'height': '150', 'frame': '26mm', 'color': 'Smedja'},
+]
+
+
+async def collect(calculator, batches, persist=False):
+    chunks = await calculator.start(batches, persist)
+    return [json.loads(line) for chunk in [chunk async for chunk in chunks] for line in chunk.splitlines()]
+
+
+async def chunks_of(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+class TestParseOpenings:
+    """Test cases for reading and parsing batch request bodies"""
+    
+    def test_json_and_csv(self):
+        batches = list(parse_openings(json.dumps({'openings': OPENINGS}).encode(), 'application/json'))
+        rows = [row for batch, _ in batches for row in batch]
+        assert [row['calculated_width'] for row in rows] == [770, 60]
+        assert batches[0][1] == ['Item 2: Invalid frame value']
+        
+        csv_body = b'width,height,frame,color\r\n800,1200,18mm,Bjela\r\n'
+        rows = [row for batch, _ in parse_openings(csv_body, 'text/csv; charset=utf-8') for row in batch]
+        assert rows[0]['wing_size'] == 1143
+    
+    def test_json_keys_are_resolved_per_object(self):
+        openings = [
+            {'width': 800, 'height': 1200, 'frame': '18mm', 'color': 'Bjela'},
+            {'width': 800, 'height': 1200, 'frame': '18mm', 'color': 'Bjela', 'quantity': 40},
+            {'Sirina': 600, 'Visina': 800, 'Ram': '25mm', 'Boja': 'Siva', 'kolicina': '2'},
+            {'width': 600, 'frame': '25mm', 'color': 'Siva'},
+        ]
+        (rows, errors), = parse_openings(json.dumps(openings).encode(), 'application/json')
+        assert [(row['selected_width'], row['quantity']) for row in rows] == [(800, 41), (600, 2)]
+        assert errors == ['Item 4: Missing column: height']
+    
+    def test_rejects_malformed_and_oversized_bodies(self):
+        with pytest.raises(ValueError, match="Invalid JSON"):
+            parse_openings(b'{', 'application/json')
+        with pytest.raises(ValueError, match="Unsupported content type"):
+            parse_openings(b'', 'application/xml')
+        with pytest.raises(BatchTooLargeError):
+            parse_openings(json.dumps(OPENINGS).encode(), 'application/json', max_openings=2)
+        with pytest.raises(BatchTooLargeError):
+            asyncio.run(read_body(chunks_of(b'x' * 6, b'x' * 6), max_bytes=10))
+        with pytest.raises(BatchTooLargeError):
+            asyncio.run(read_body(chunks_of(), content_length=11, max_bytes=10))
+        assert asyncio.run(read_body(chunks_of(b'ab', b'c'), max_bytes=10)) == b'abc'
+
+
+class TestBatchCalculator:
+    """Test cases for streaming batch results"""
+    
+    def test_streams_results_errors_and_summary(self):
+        lines = asyncio.run(collect(BatchCalculator(), parse_openings(json.dumps(OPENINGS).encode(), 'application/json', batch_size=1)))
+        
+        assert lines[0] == {'error': 'Item 2: Invalid frame value'}
+        assert [line['selected_width'] for line in lines[1:-1]] == [800, 100]
+        assert lines[-1] == {'summary': {'calculated': 2, 'saved': 0, 'errors': 1}}
+    
+    def test_persist(self, async_sqlite_engine):
+        lines = asyncio.run(collect(BatchCalculator(), parse_openings(json.dumps(OPENINGS).encode(), 'application/json'), persist=True))
+        
+        stored = asyncio.run(AsyncDatabaseService.get_all_calculations())
+        assert sorted(line['id'] for line in lines if 'id' in line) == sorted(calc.id for calc in stored)
+        assert lines[-1]['summary']['saved'] == 2
+    
+    def test_rejects_when_busy(self):
+        calculator = BatchCalculator(max_concurrent=1)
+        
+        async def scenario():
+            chunks = await calculator.start(parse_openings(json.dumps(OPENINGS).encode(), 'application/json'))
+            with pytest.raises(BatchBusyError):
+                await calculator.start(parse_openings(json.dumps(OPENINGS).encode(), 'application/json'))
+            assert calculator.running == 1
+            async for _ in chunks:
+                pass
+            assert calculator.running == 0
+        
+        asyncio.run(scenario())
+    
+    def test_busy_request_is_rejected_before_reading_body(self, monkeypatch):
+        calculator = BatchCalculator(max_concurrent=1)
+        body = json.dumps(OPENINGS).encode()
+        reads = []
+        
+        async def counting_read_body(chunks, content_length=None):
+            reads.append(content_length)
+            return await read_body(chunks, content_length)
+        
+        monkeypatch.setattr(batch_service, 'read_body', counting_read_body)
+        
+        async def scenario():
+            chunks = await calculator.start_request(chunks_of(body), len(body), 'application/json')
+            with pytest.raises(BatchBusyError):
+                await calculator.start_request(chunks_of(body), len(body), 'application/json')
+            assert len(reads) == 1
+            async for _ in chunks:
+                pass
+            assert calculator.running == 0
+            # A rejected body gives its slot back
+            with pytest.raises(ValueError):
+                await calculator.start_request(chunks_of(b'{'), 1, 'application/json')
+            assert calculator.running == 0
+        
+        asyncio.run(scenario())
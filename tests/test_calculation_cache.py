@@ -0,0 +1,117 @@
+import asyncio
+import pytest
+from services.calculation_cache import CalculationPageCache
+
+
+def make_loader(result):
+    calls = []
+    
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return result
+    
+    return load, calls
+
+
+class TestCalculationPageCache:
+    """Test cases for the shared read-through history page cache"""
+    
+    def test_hit_after_miss(self):
+        cache = CalculationPageCache(max_entries=4, ttl=60)
+        load, calls = make_loader(['page'])
+        
+        async def scenario():
+            assert await cache.get('a', load) == ['page']
+            assert await cache.get('a', load) == ['page']
+        
+        asyncio.run(scenario())
+        assert len(calls) == 1
+        assert (cache.hits, cache.misses) == (1, 1)
+    
+    def test_expired_entry_is_reloaded(self):
+        cache = CalculationPageCache(max_entries=4, ttl=0)
+        load, calls = make_loader(['page'])
+        
+        async def scenario():
+            await cache.get('a', load)
+            await cache.get('a', load)
+        
+        asyncio.run(scenario())
+        assert len(calls) == 2
+    
+    def test_evicts_least_recently_used(self):
+        cache = CalculationPageCache(max_entries=2, ttl=60)
+        load, calls = make_loader(['page'])
+        
+        async def scenario():
+            await cache.get('a', load)
+            await cache.get('b', load)
+            await cache.get('a', load)
+            await cache.get('c', load)
+            await cache.get('a', load)
+            await cache.get('b', load)
+        
+        asyncio.run(scenario())
+        assert len(calls) == 4
+        assert len(cache) == 2
+    
+    def test_invalidate_drops_entries(self):
+        cache = CalculationPageCache(max_entries=4, ttl=60)
+        load, calls = make_loader(['page'])
+        
+        async def scenario():
+            await cache.get('a', load)
+            cache.invalidate()
+            await cache.get('a', load)
+        
+        asyncio.run(scenario())
+        assert len(calls) == 2
+    
+    def test_concurrent_misses_share_one_query(self):
+        cache = CalculationPageCache(max_entries=4, ttl=60)
+        load, calls = make_loader(['page'])
+        
+        async def scenario():
+            return await asyncio.gather(*(cache.get('a', load) for _ in range(5)))
+        
+        assert asyncio.run(scenario()) == [['page']] * 5
+        assert len(calls) == 1
+    
+    def test_result_loaded_before_invalidate_is_not_stored(self):
+        cache = CalculationPageCache(max_entries=4, ttl=60)
+        
+        async def stale_load():
+            cache.invalidate()  # A write commits while the query runs
+            return ['stale']
+        
+        asyncio.run(cache.get('a', stale_load))
+        assert len(cache) == 0
+    
+    def test_failed_load_is_not_cached(self):
+        cache = CalculationPageCache(max_entries=4, ttl=60)
+        
+        async def failing_load():
+            raise ValueError("down")
+        
+        with pytest.raises(ValueError):
+            asyncio.run(cache.get('a', failing_load))
+        assert len(cache) == 0
+    
+    def test_waiter_reloads_when_loading_session_is_cancelled(self):
+        cache = CalculationPageCache(max_entries=4, ttl=60)
+        load, calls = make_loader(['page'])
+        
+        async def hanging_load():
+            await asyncio.Event().wait()
+        
+        async def scenario():
+            owner = asyncio.create_task(cache.get('a', hanging_load))
+            await asyncio.sleep(0)
+            waiters = [asyncio.create_task(cache.get('a', load)) for _ in range(2)]
+            await asyncio.sleep(0)
+            owner.cancel()
+            return await asyncio.gather(*waiters), owner.cancelled()
+        
+        assert asyncio.run(scenario()) == ([['page'], ['page']], True)
+        assert len(calls) == 1
@@ -4,7 +4,8 @@ from calculations import (
     calculate_new_height,
     calculate_wing,
     calculate_rope,
-    calculate_net
+    calculate_net,
+    calculate_batch
 )
 
 
@@ -202,5 +203,42 @@ class TestIntegrationScenarios:
         assert net == pytest.approx(33.333333333333336)
 
 
+class TestCalculateBatch:
+    """Test cases for the vectorized calculate_batch function"""
+    
+    def test_matches_scalar_functions(self):
+        widths = [100, 500, 50, 70, 800, 600, 101, 1234]
+        heights = [200, 600, 80, 100, 1200, 800, 150, 987]
+        frames = ['18mm', '25mm', '26mm', '18mm-flis', '18mm', '25mm', '26mm', '18mm-flis']
+        
+        result = calculate_batch(widths, heights, frames)
+        
+        for i, (width, height, frame) in enumerate(zip(widths, heights, frames)):
+            new_height = calculate_new_height(height, frame)
+            assert result['calculated_width'][i] == calculate_new_width(width, frame)
+            assert result['calculated_height'][i] == new_height
+            assert result['wing'][i] == calculate_wing(new_height, frame)
+            assert result['rope'][i] == calculate_rope(width, height)
+            assert result['net'][i] == calculate_net(width, frame)
+    
+    def test_string_input(self):
+        result = calculate_batch(['800', '600'], ['1200', '800'], ['18mm', '25mm'])
+        assert list(result['calculated_width']) == [770, 576]
+        assert list(result['wing']) == [1143, 738]
+        assert list(result['net']) == [400.0, 200.0]
+    
+    def test_empty_input(self):
+        result = calculate_batch([], [], [])
+        assert all(len(column) == 0 for column in result.values())
+    
+    def test_invalid_frame(self):
+        with pytest.raises(ValueError, match="Invalid frame value"):
+            calculate_batch([100, 200], [200, 300], ['18mm', '30mm'])
+    
+    def test_length_mismatch(self):
+        with pytest.raises(ValueError):
+            calculate_batch([100, 200], [200], ['18mm', '18mm'])
+
+
 if __name__ == '__main__':
     pytest.main([__file__])
\ No newline at end of file
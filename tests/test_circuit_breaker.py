@@ -0,0 +1,85 @@
+import asyncio
+import pytest
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+
+
+class Outage(Exception):
+    pass
+
+
+def make_breaker(**kwargs):
+    breaker = CircuitBreaker("test", failure_exceptions=(Outage,), **kwargs)
+    calls = []
+    
+    @breaker.guard
+    async def call(fail=False):
+        calls.append(fail)
+        if fail:
+            raise Outage()
+        return "ok"
+    
+    return breaker, call, calls
+
+
+class TestCircuitBreaker:
+    """Test cases for circuit breaker state transitions"""
+    
+    def test_opens_after_threshold_and_fails_fast(self):
+        breaker, call, calls = make_breaker(failure_threshold=2, reset_timeout=60)
+        
+        async def scenario():
+            for _ in range(2):
+                with pytest.raises(Outage):
+                    await call(fail=True)
+            with pytest.raises(CircuitOpenError):
+                await call()
+        
+        asyncio.run(scenario())
+        assert breaker.state == CircuitState.OPEN
+        assert len(calls) == 2
+        assert breaker.rejected_calls == 1
+        assert breaker.snapshot()['transitions'] == {'closed->open': 1}
+    
+    def test_half_open_trial_closes_or_reopens(self):
+        breaker, call, calls = make_breaker(failure_threshold=1, reset_timeout=0)
+        
+        async def scenario():
+            with pytest.raises(Outage):
+                await call(fail=True)
+            with pytest.raises(Outage):
+                await call(fail=True)  # half-open trial fails
+            assert breaker.state == CircuitState.OPEN
+            assert await call() == "ok"  # next trial succeeds
+        
+        asyncio.run(scenario())
+        assert breaker.state == CircuitState.CLOSED
+        assert breaker.transitions['half_open->open'] == 1
+        assert breaker.transitions['half_open->closed'] == 1
+    
+    def test_unrelated_errors_do_not_open(self):
+        breaker, _, _ = make_breaker(failure_threshold=1)
+        
+        @breaker.guard
+        async def invalid():
+            raise ValueError("bad input")
+        
+        with pytest.raises(ValueError):
+            asyncio.run(invalid())
+        assert breaker.state == CircuitState.CLOSED
+    
+    def test_probe_closes_circuit(self):
+        breaker, call, _ = make_breaker(failure_threshold=1, reset_timeout=60)
+        
+        async def probe():
+            pass
+        
+        async def scenario():
+            with pytest.raises(Outage):
+                await call(fail=True)
+            task = asyncio.create_task(breaker.probe_forever(probe, interval=0))
+            await asyncio.sleep(0.01)
+            task.cancel()
+        
+        asyncio.run(scenario())
+        assert breaker.state == CircuitState.CLOSED
+        assert breaker.transitions['open->closed'] == 1
@@ -0,0 +1,90 @@
+import time
+from services.cutting_service import CuttingService, collect_pieces, improve_bars, pack_pieces
+
+
+def make_row(width, height, frame='18mm', color='Bjela'):
+    return {
+        'frame': frame,
+        'color': color,
+        'calculated_width': width,
+        'calculated_height': height,
+        'wing': height - 7,
+        'rope': (width + height) * 2,
+        'net': width / 3,
+    }
+
+
+class TestCollectPieces:
+    """Test cases for turning table rows into pieces"""
+    
+    def test_groups_by_material_frame_and_color(self):
+        pieces = collect_pieces([make_row(770, 1150), make_row(500, 600, color='Siva')])
+        
+        assert sorted(pieces[('Ram', '18mm', 'Bjela')]) == [770, 770, 1150, 1150]
+        assert pieces[('Krilo', '18mm', 'Siva')] == [593, 593]
+        assert pieces[('Mrezica', '18mm', 'Bjela')] == [257]  # Rounded up
+    
+    def test_quantity_multiplies_pieces(self):
+        pieces = collect_pieces([{**make_row(770, 1150), 'quantity': 3}])
+        
+        assert sorted(pieces[('Ram', '18mm', 'Bjela')]) == [770] * 6 + [1150] * 6
+        assert pieces[('Spaga', '18mm', 'Bjela')] == [3840] * 3
+
+
+class TestPackPieces:
+    """Test cases for best fit decreasing packing"""
+    
+    def test_kerf_is_charged_between_pieces(self):
+        bars, oversized = pack_pieces([500, 500], stock_length=1000, kerf=3)
+        assert len(bars) == 2
+        
+        bars, oversized = pack_pieces([500, 497], stock_length=1000, kerf=3)
+        assert bars == [[500, 497]]
+    
+    def test_oversized_pieces_are_reported(self):
+        bars, oversized = pack_pieces([1200, 400], stock_length=1000, kerf=0)
+        assert bars == [[400]]
+        assert oversized == [1200]
+    
+    def test_every_bar_fits_its_stock(self):
+        pieces = [(i * 37) % 900 + 100 for i in range(2000)]
+        bars, _ = pack_pieces(pieces, stock_length=6000, kerf=3)
+        
+        assert sorted(piece for bar in bars for piece in bar) == sorted(pieces)
+        assert all(sum(bar) + 3 * (len(bar) - 1) <= 6000 for bar in bars)
+
+
+class TestImproveBars:
+    """Test cases for the time-budgeted improvement pass"""
+    
+    def test_finds_fewer_bars_than_best_fit(self):
+        # Best fit decreasing needs three bars here, two are enough
+        pieces = [56, 45, 28, 24, 23, 17]
+        bars, _ = pack_pieces(pieces, stock_length=100, kerf=0)
+        assert len(bars) == 3
+        
+        improved = improve_bars(bars, stock_length=100, kerf=0, deadline=time.perf_counter() + 1)
+        assert len(improved) == 2
+        assert sorted(piece for bar in improved for piece in bar) == sorted(pieces)
+
+
+class TestCuttingService:
+    """Test cases for building cut plans"""
+    
+    def test_plan_for_thousands_of_pieces_is_fast(self):
+        rows = [make_row(400 + (i * 53) % 1500, 400 + (i * 71) % 1800) for i in range(1000)]
+        
+        start = time.perf_counter()
+        plan = CuttingService.plan(rows, time_budget=0.1)
+        assert time.perf_counter() - start < 1
+        
+        assert sum(group.piece_count for group in plan.groups) == 1000 * 8
+        for group in plan.groups:
+            assert all(group.used_length(bar) <= group.stock_length for bar in group.bars)
+    
+    def test_to_dict_reports_waste(self):
+        plan = CuttingService.plan([make_row(770, 1150)], time_budget=0)
+        frame = next(group for group in plan.to_dict()['groups'] if group['material'] == 'Ram')
+        
+        assert frame['bar_count'] == 1
+        assert frame['waste'] == 6000 - (770 * 2 + 1150 * 2 + 3 * 3)
@@ -0,0 +1,199 @@
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy.dialects.postgresql import asyncpg
+from sqlalchemy.exc import OperationalError
+from services.database_service import (
+    AsyncDatabaseService, CalculationFilter, DatabaseService, _bulk_insert_statement, async_retry_db_operation,
+)
+
+
+def make_calculations(count):
+    start = datetime(2025, 1, 1)
+    return [
+        {
+            'selected_width': 100 + i,
+            'selected_height': 200,
+            'frame_type': '18mm',
+            'color': 'Bjela',
+            'calculated_width': 70 + i,
+            'calculated_height': 150,
+            'wing_size': 143,
+            'rope_length': 600 + 2 * i,
+            'net_size': (100 + i) / 2,
+            # Two rows per timestamp to exercise the id tie-breaker
+            'created_at': start + timedelta(minutes=i // 2),
+        }
+        for i in range(count)
+    ]
+
+
+class TestCreateCalculations:
+    """Test cases for bulk inserts"""
+    
+    def test_returns_rows_in_input_order(self, sqlite_engine):
+        created = DatabaseService.create_calculations(make_calculations(5))
+        assert [calc.selected_width for calc in created] == [100, 101, 102, 103, 104]
+        assert len({calc.id for calc in created}) == 5
+    
+    def test_empty_input(self, sqlite_engine):
+        assert DatabaseService.create_calculations([]) == []
+    
+    def test_asyncpg_binds_frame_type_without_cast(self):
+        # A ::VARCHAR cast cannot be assigned to the frame_type_enum column of older databases
+        sql = str(_bulk_insert_statement().compile(dialect=asyncpg.dialect()))
+        columns = sql[sql.index('(') + 1:sql.index(')')].split(', ')
+        values = sql[sql.index('VALUES (') + 8:].split(', ')
+        assert values[columns.index('frame_type')] == f"${columns.index('frame_type') + 1}"
+
+
+class TestGetCalculationsPage:
+    """Test cases for keyset pagination of the calculation history"""
+    
+    def test_pages_cover_all_rows_newest_first(self, sqlite_engine):
+        DatabaseService.create_calculations(make_calculations(11))
+        
+        seen = []
+        after = None
+        while True:
+            page = DatabaseService.get_calculations_page(4, after=after)
+            if not page:
+                break
+            seen.extend(page)
+            after = (page[-1].created_at, page[-1].id)
+        
+        keys = [(calc.created_at, calc.id) for calc in seen]
+        assert len(seen) == 11
+        assert keys == sorted(keys, reverse=True)
+
+
+class TestSearchCalculations:
+    """Test cases for the filtered history search"""
+    
+    def make_customers(self):
+        calculations = make_calculations(8)
+        for i, data in enumerate(calculations):
+            data['customer_name'] = ['Marko Markovic', 'marina_doo', 'Ana', None][i % 4]
+            data['color'] = 'Siva' if i >= 6 else 'Bjela'
+        return DatabaseService.create_calculations(calculations)
+    
+    def search(self, limit=100, **criteria):
+        return [calc.selected_width for calc in DatabaseService.search_calculations(CalculationFilter(**criteria), limit)]
+    
+    def test_customer_prefix_is_case_insensitive(self, sqlite_engine):
+        self.make_customers()
+        assert self.search(customer='MAR') == [105, 104, 101, 100]
+        assert self.search(customer='marina_') == [105, 101]
+        # LIKE wildcards in the prefix are matched literally
+        assert self.search(customer='mar%') == []
+    
+    def test_combined_filters(self, sqlite_engine):
+        self.make_customers()
+        assert self.search(start=datetime(2025, 1, 1, 0, 1), end=datetime(2025, 1, 1, 0, 3)) == [105, 104, 103, 102]
+        assert self.search(color='Siva') == [107, 106]
+        assert self.search(frame_type='25mm') == []
+        assert self.search(min_width=102, max_width=104, customer='ana') == [102]
+        assert self.search(min_height=201) == []
+        assert self.search(max_height=200, color='Bjela') == [105, 104, 103, 102, 101, 100]
+    
+    def test_pages_through_matches(self, sqlite_engine):
+        self.make_customers()
+        filters = CalculationFilter(customer='mar')
+        first = DatabaseService.search_calculations(filters, 3)
+        second = DatabaseService.search_calculations(filters, 3, after=(first[-1].created_at, first[-1].id))
+        assert [calc.selected_width for calc in first + second] == [105, 104, 101, 100]
+
+
+class TestBatchDelete:
+    """Test cases for set-based deletion of calculations"""
+    
+    def test_returns_only_removed_ids(self, sqlite_engine):
+        created = DatabaseService.create_calculations(make_calculations(5))
+        ids = [calc.id for calc in created]
+        
+        deleted = DatabaseService.delete_calculations(ids[:3] + [9999])
+        
+        assert sorted(deleted) == sorted(ids[:3])
+        assert [calc.id for calc in DatabaseService.get_all_calculations()] == ids[3:]
+    
+    def test_empty_ids(self, sqlite_engine):
+        assert DatabaseService.delete_calculations([]) == []
+
+
+class TestMaterialSummary:
+    """Test cases for aggregates computed in the database"""
+    
+    def test_groups_by_frame_and_color(self, sqlite_engine):
+        calculations = make_calculations(6)
+        for data in calculations[4:]:
+            data['color'] = 'Siva'
+        DatabaseService.create_calculations(calculations)
+        
+        bjela, siva = DatabaseService.get_material_summary()
+        assert (bjela.frame_type, bjela.color, bjela.openings) == ('18mm', 'Bjela', 4)
+        assert bjela.rope_length == 600 + 602 + 604 + 606
+        assert bjela.net_size == sum((100 + i) / 2 for i in range(4))
+        assert (siva.color, siva.openings, siva.calculated_width) == ('Siva', 2, 74 + 75)
+    
+    def test_weighted_by_quantity(self, sqlite_engine):
+        calculations = make_calculations(2)
+        calculations[0]['quantity'] = 40
+        DatabaseService.create_calculations(calculations)
+        
+        summary, = DatabaseService.get_material_summary()
+        assert summary.openings == 41
+        assert summary.rope_length == 600 * 40 + 602
+        assert summary.net_size == 50 * 40 + 50.5
+    
+    def test_date_range_is_half_open(self, sqlite_engine):
+        DatabaseService.create_calculations(make_calculations(6))
+        
+        # Rows are created two per minute from 2025-01-01 00:00
+        summary = DatabaseService.get_material_summary(datetime(2025, 1, 1, 0, 1), datetime(2025, 1, 1, 0, 2))
+        assert [row.openings for row in summary] == [2]
+        assert DatabaseService.get_material_summary(start=datetime(2025, 2, 1)) == []
+
+
+class TestAsyncDatabaseService:
+    """Test cases for the async service against an aiosqlite stand-in"""
+    
+    def test_create_page_and_delete(self, async_sqlite_engine):
+        async def scenario():
+            created = await AsyncDatabaseService.create_calculations(make_calculations(6))
+            single = await AsyncDatabaseService.create_calculation(make_calculations(1)[0])
+            first = await AsyncDatabaseService.get_calculations_page(4)
+            second = await AsyncDatabaseService.get_calculations_page(4, after=(first[-1].created_at, first[-1].id))
+            deleted = await AsyncDatabaseService.delete_calculations([calc.id for calc in created[:2]])
+            removed_single = await AsyncDatabaseService.delete_calculation(single.id)
+            remaining = await AsyncDatabaseService.get_all_calculations()
+            return created, first, second, deleted, removed_single, remaining
+        
+        created, first, second, deleted, removed_single, remaining = asyncio.run(scenario())
+        
+        assert len(first) == 4 and len(second) == 3
+        assert {calc.id for calc in first}.isdisjoint(calc.id for calc in second)
+        assert sorted(deleted) == [created[0].id, created[1].id]
+        assert removed_single
+        assert len(remaining) == 4
+
+
+class TestAsyncRetry:
+    """Test cases for the async retry decorator"""
+    
+    def test_retries_connection_errors_with_asyncio_sleep(self, monkeypatch):
+        sleeps = []
+        
+        async def fake_sleep(seconds):
+            sleeps.append(seconds)
+        monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+        
+        attempts = []
+        
+        @async_retry_db_operation(max_retries=3, delay=1, backoff=2)
+        async def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise OperationalError("SELECT 1", {}, Exception("connection refused"))
+            return "ok"
+        
+        assert asyncio.run(flaky()) == "ok"
+        assert sleeps == [1, 2]
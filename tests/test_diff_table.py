@@ -0,0 +1,42 @@
+from components.diff_table import RowDiff
+
+
+def row(key, **fields):
+    return {'id': key, 'net': 1.0, **fields}
+
+
+class TestRowDiff:
+    """Test cases for folding row changes into one client message"""
+
+    def test_empty_diff_sends_nothing(self):
+        assert RowDiff('id').take() is None
+
+    def test_changes_are_folded_per_key(self):
+        diff = RowDiff('id')
+        diff.upsert([row(1), row(2)])
+        diff.patch([{'id': 2, 'net': 2.0}, {'id': 3, 'net': 3.0}])
+        diff.patch([{'id': 3, 'color': 'Siva'}])
+        diff.remove([1, 4])
+
+        assert diff.take() == {
+            'remove': [1, 4],
+            'patch': [{'id': 3, 'net': 3.0, 'color': 'Siva'}],
+            'upsert': [row(2, net=2.0)],
+        }
+        assert diff.take() is None
+
+    def test_removed_row_added_again_is_removed_first(self):
+        diff = RowDiff('id')
+        diff.remove([1])
+        diff.patch([{'id': 1, 'net': 5.0}])
+        diff.upsert([row(1)])
+        assert diff.take() == {'remove': [1], 'upsert': [row(1)]}
+
+    def test_replace_sends_rows_as_of_flush(self):
+        rows = [row(1)]
+        diff = RowDiff('id')
+        diff.upsert([row(9)])
+        diff.replace(rows)
+        rows.append(row(2))
+        diff.remove([1])
+        assert diff.take() == {'replace': [row(1), row(2)]}
@@ -0,0 +1,92 @@
+import asyncio
+import json
+import pytest
+from calculations import calculate_batch, calculate_new_width, calculate_opening
+from frame_rules import FrameRuleRegistry, parse_rule_set
+
+
+RULES = {
+    'version': 'test.1',
+    'frames': {
+        '18mm': {'width_offset': 30, 'height_offset': 50, 'wing_offset': 7, 'net_divisor': 2},
+        '30mm': {'width_offset': 45, 'height_offset': 80, 'wing_offset': 9, 'net_divisor': 4},
+    },
+}
+
+
+def write_rules(path, rules):
+    path.write_text(json.dumps(rules))
+    return str(path)
+
+
+class TestRuleSet:
+    """Test cases for parsing and compiling frame rules"""
+    
+    def test_compiled_lookups(self):
+        rules = parse_rule_set(RULES)
+        assert rules.frames == ('18mm', '30mm')
+        assert rules.rule('30mm').height_offset == 80
+        assert list(rules.width_offsets) == [30, 45]
+        with pytest.raises(ValueError, match="Invalid frame value"):
+            rules.rule('40mm')
+    
+    def test_rejects_invalid_files(self):
+        with pytest.raises(ValueError, match="version"):
+            parse_rule_set({'frames': RULES['frames']})
+        with pytest.raises(ValueError, match="exactly"):
+            parse_rule_set({'version': 'x', 'frames': {'18mm': {'width_offset': 30}}})
+        with pytest.raises(ValueError, match="net_divisor"):
+            parse_rule_set({'version': 'x', 'frames': {'18mm': {**RULES['frames']['18mm'], 'net_divisor': 0}}})
+    
+    def test_calculations_use_given_rules(self):
+        rules = parse_rule_set(RULES)
+        assert calculate_new_width(1000, '30mm', rules) == 955
+        result = calculate_opening(1000, 1200, '30mm', rules)
+        assert result == {'calculated_width': 955, 'calculated_height': 1120, 'wing': 1111,
+                          'rope': 4400, 'net': 250.0, 'rule_version': 'test.1'}
+        batch = calculate_batch([1000], [1200], ['30mm'], rules)
+        assert batch['wing'][0] == result['wing']
+        assert batch['net'][0] == result['net']
+
+
+class TestFrameRuleRegistry:
+    """Test cases for hot reloading the rules file"""
+    
+    def test_reload_swaps_rule_set(self, tmp_path):
+        path = write_rules(tmp_path / 'rules.json', RULES)
+        registry = FrameRuleRegistry(path)
+        before = registry.current
+        
+        write_rules(tmp_path / 'rules.json', {'version': 'test.2', 'frames': {'18mm': RULES['frames']['30mm']}})
+        assert registry.reload()
+        assert registry.current.version == 'test.2'
+        assert registry.current.frames == ('18mm',)
+        # A snapshot taken before the reload is unchanged
+        assert before.version == 'test.1' and before.rule('18mm').width_offset == 30
+        assert not registry.reload()
+    
+    def test_invalid_or_unversioned_change_keeps_rules(self, tmp_path):
+        path = write_rules(tmp_path / 'rules.json', RULES)
+        registry = FrameRuleRegistry(path)
+        
+        (tmp_path / 'rules.json').write_text('{"version": "test.2", "frames": {')
+        assert not registry.reload()
+        changed = {**RULES, 'frames': {'18mm': RULES['frames']['30mm']}}
+        write_rules(tmp_path / 'rules.json', changed)
+        assert not registry.reload()
+        assert registry.current.version == 'test.1'
+        assert registry.current.rule('18mm').width_offset == 30
+    
+    def test_watcher_reports_reloaded_rules(self, tmp_path):
+        path = write_rules(tmp_path / 'rules.json', RULES)
+        registry = FrameRuleRegistry(path)
+        reloaded = []
+        
+        async def on_reloaded(rule_set):
+            reloaded.append(rule_set)
+            raise asyncio.CancelledError
+        
+        write_rules(tmp_path / 'rules.json', {'version': 'test.2', 'frames': {'24mm': RULES['frames']['30mm']}})
+        with pytest.raises(asyncio.CancelledError):
+            asyncio.run(registry.watch_forever(on_reloaded, interval=0))
+        assert [rule_set.frames for rule_set in reloaded] == [('24mm',)]
@@ -0,0 +1,89 @@
+import asyncio
+from services.database_service import AsyncDatabaseService, CalculationFilter
+from services.history_service import HistoryPager, iter_history_row_chunks
+from tests.test_database_service import make_calculations
+
+
+class TestHistoryPager:
+    """Test cases for the keyset history pager"""
+    
+    def test_pager_walks_forward_to_requested_page(self, async_sqlite_engine):
+        asyncio.run(AsyncDatabaseService.create_calculations(make_calculations(11)))
+        pager = HistoryPager(page_size=4)
+        
+        third = asyncio.run(pager.fetch(3))
+        assert third.page == 3
+        assert len(third.calculations) == 3
+        assert not third.has_more
+        assert pager.rows_number(third) == 11
+        
+        first = asyncio.run(pager.fetch(1))
+        assert first.has_more
+        assert pager.rows_number(first) == 5
+        assert first.calculations[0].selected_width == 110
+    
+    def test_page_is_refilled_after_delete(self, async_sqlite_engine):
+        asyncio.run(AsyncDatabaseService.create_calculations(make_calculations(11)))
+        pager = HistoryPager(page_size=4)
+        asyncio.run(pager.fetch(3))
+        
+        second = asyncio.run(pager.fetch(2))
+        asyncio.run(AsyncDatabaseService.delete_calculations([calc.id for calc in second.calculations[:2]]))
+        pager.forget_after(2)
+        
+        second = asyncio.run(pager.fetch(2))
+        assert [calc.selected_width for calc in second.calculations] == [104, 103, 102, 101]
+        third = asyncio.run(pager.fetch(3))
+        assert [calc.selected_width for calc in third.calculations] == [100]
+    
+    def test_pager_stops_at_last_page(self, async_sqlite_engine):
+        asyncio.run(AsyncDatabaseService.create_calculations(make_calculations(3)))
+        pager = HistoryPager(page_size=4)
+        
+        page = asyncio.run(pager.fetch(5))
+        assert page.page == 1
+        assert len(page.calculations) == 3
+    
+    def test_pager_pages_through_search_results(self, async_sqlite_engine):
+        asyncio.run(AsyncDatabaseService.create_calculations(make_calculations(11)))
+        pager = HistoryPager(page_size=2)
+        asyncio.run(pager.fetch(2))
+        
+        pager.search(CalculationFilter(min_width=105, max_width=107))
+        second = asyncio.run(pager.fetch(2))
+        assert [calc.selected_width for calc in second.calculations] == [105]
+        assert pager.rows_number(second) == 3
+        
+        pager.search(None)
+        assert asyncio.run(pager.fetch(1)).calculations[0].selected_width == 110
+
+
+class TestIterHistoryRowChunks:
+    """Test cases for reading the whole history in chunks"""
+    
+    def test_yields_every_row_newest_first(self, async_sqlite_engine):
+        asyncio.run(AsyncDatabaseService.create_calculations(make_calculations(7)))
+        
+        async def collect():
+            return [chunk async for chunk in iter_history_row_chunks(3)]
+        
+        chunks = asyncio.run(collect())
+        assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+        widths = [row['selected_width'] for chunk in chunks for row in chunk]
+        assert widths == [106, 105, 104, 103, 102, 101, 100]
+        assert chunks[0][0]['frame'] == '18mm'
+    
+    def test_empty_history_yields_nothing(self, async_sqlite_engine):
+        async def collect():
+            return [chunk async for chunk in iter_history_row_chunks(3)]
+        
+        assert asyncio.run(collect()) == []
+    
+    def test_filtered_history(self, async_sqlite_engine):
+        asyncio.run(AsyncDatabaseService.create_calculations(make_calculations(7)))
+        
+        async def collect():
+            return [chunk async for chunk in iter_history_row_chunks(2, CalculationFilter(min_width=102))]
+        
+        widths = [row['selected_width'] for chunk in asyncio.run(collect()) for row in chunk]
+        assert widths == [106, 105, 104, 103, 102]
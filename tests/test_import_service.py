@@ -0,0 +1,78 @@
+import asyncio
+import io
+import pytest
+from services.database_service import AsyncDatabaseService
+from frame_rules import frame_rules
+from services.import_service import ImportService, iter_calculation_batches
+
+
+CSV_DATA = """sirina,visina,ram,boja
+800,1200,18mm,Bjela
+600,800,25mm,Siva
+abc,800,25mm,Siva
+100,150,26mm,Smedja
+100,150,30mm,Smedja
+"""
+
+
+class TestIterCalculationBatches:
+    """Test cases for CSV parsing and batch computation"""
+    
+    def test_batches_and_errors(self):
+        batches = list(iter_calculation_batches(io.StringIO(CSV_DATA), batch_size=2))
+        rows = [row for batch, _ in batches for row in batch]
+        errors = [error for _, batch_errors in batches for error in batch_errors]
+        
+        assert len(batches) == 2
+        assert [row['calculated_width'] for row in rows] == [770, 576, 60]
+        assert rows[0]['wing_size'] == 1143
+        assert rows[2]['net_size'] == pytest.approx(33.333333333333336)
+        assert {row['rule_version'] for row in rows} == {frame_rules.current.version}
+        assert len(errors) == 2
+        assert errors[0].startswith("Line 4")
+    
+    def test_semicolon_delimiter_and_english_headers(self):
+        data = "width;height;frame;color\n800;1200;18mm-flis;Antracit\n"
+        [(rows, errors)] = list(iter_calculation_batches(io.StringIO(data)))
+        assert errors == []
+        assert rows[0]['frame_type'] == '18mm-flis'
+        assert rows[0]['calculated_width'] == 738
+    
+    def test_merges_identical_openings(self):
+        csv_data = "width,height,frame,color,kolicina\n800,1200,18mm,Bjela,3\n600,800,25mm,Siva,\n800,1200,18mm,Bjela,2\n800,1200,18mm,Siva,1\n"
+        rows = [row for batch, _ in iter_calculation_batches(io.StringIO(csv_data)) for row in batch]
+        
+        assert [(row['selected_width'], row['color'], row['quantity']) for row in rows] == [
+            (800, 'Bjela', 5), (600, 'Siva', 1), (800, 'Siva', 1)]
+        assert rows[0]['calculated_width'] == 770
+    
+    def test_merge_window_bounds_openings_held(self):
+        csv_data = ("width,height,frame,color\n800,1200,18mm,Bjela\n600,800,25mm,Siva\nx,1,18mm,Bjela\n"
+                    "800,1200,18mm,Bjela\n700,900,18mm,Bjela\n800,1200,18mm,Bjela\n")
+        batches = list(iter_calculation_batches(io.StringIO(csv_data), batch_size=10, merge_window=2))
+        
+        assert [[(row['selected_width'], row['quantity']) for row in rows] for rows, _ in batches] == [
+            [(800, 2), (600, 1)], [(700, 1), (800, 1)]]
+        assert [errors for _, errors in batches] == [["Line 4: Invalid width: 'x'"], []]
+    
+    def test_invalid_quantity(self):
+        csv_data = "width,height,frame,color,quantity\n800,1200,18mm,Bjela,0\n"
+        batches = list(iter_calculation_batches(io.StringIO(csv_data)))
+        assert batches == [([], ["Line 2: Invalid quantity: '0'"])]
+    
+    def test_missing_column(self):
+        with pytest.raises(ValueError, match="Missing column: color"):
+            list(iter_calculation_batches(io.StringIO("width,height,frame\n100,200,18mm\n")))
+
+
+class TestImportService:
+    """Test cases for importing into the database"""
+    
+    def test_import_csv(self, async_sqlite_engine):
+        result = asyncio.run(ImportService.import_csv(io.StringIO(CSV_DATA), batch_size=2))
+        
+        assert result.database_error is None
+        assert len(result.errors) == 2
+        assert [calc.selected_width for calc in result.calculations] == [800, 600, 100]
+        assert all(calc.id is not None for calc in result.calculations)
+        assert len(asyncio.run(AsyncDatabaseService.get_all_calculations())) == 3
@@ -0,0 +1,55 @@
+import asyncio
+import pytest
+from services.metrics import MetricsRegistry
+
+
+class TestMetrics:
+    """Test cases for the metrics registry and Prometheus text rendering"""
+    
+    def test_counter_renders_labels(self):
+        registry = MetricsRegistry()
+        counter = registry.counter('retries_total', 'Retries', ['operation'])
+        counter.inc(operation='create')
+        counter.inc(2, operation='create')
+        
+        text = registry.render()
+        assert '# TYPE window_sizer_retries_total counter' in text
+        assert 'window_sizer_retries_total{operation="create"} 3' in text
+    
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1))
+        for value in (0.05, 0.1, 0.5, 5):
+            histogram.observe(value)
+        
+        text = registry.render()
+        assert 'window_sizer_latency_seconds_bucket{le="0.1"} 2' in text
+        assert 'window_sizer_latency_seconds_bucket{le="1.0"} 3' in text
+        assert 'window_sizer_latency_seconds_bucket{le="+Inf"} 4' in text
+        assert 'window_sizer_latency_seconds_count 4' in text
+    
+    def test_timed_decorator_observes_calls(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram('handler_seconds', 'Handlers', ['handler'])
+        
+        @histogram.timed(handler='load')
+        async def load():
+            return 'ok'
+        
+        assert asyncio.run(load()) == 'ok'
+        assert histogram.count(handler='load') == 1
+    
+    def test_callback_runs_only_when_rendered(self):
+        registry = MetricsRegistry()
+        calls = []
+        registry.gauge('rows', 'Rows', callback=lambda: calls.append(1) or {(): 7})
+        
+        assert calls == []
+        assert 'window_sizer_rows 7' in registry.render()
+        assert calls == [1]
+    
+    def test_rejects_wrong_labels(self):
+        registry = MetricsRegistry()
+        counter = registry.counter('errors_total', 'Errors', ['operation'])
+        with pytest.raises(ValueError):
+            counter.inc(handler='x')
@@ -0,0 +1,63 @@
+import asyncio
+from alembic import command
+from sqlalchemy import create_engine, inspect, text
+import database.migrations as migrations
+from database.migrations import alembic_config, upgrade_when_available
+
+
+def create_init_sql_schema(url):
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        # Schema as created by init.sql
+        connection.execute(text(
+            "CREATE TABLE window_calculations (id INTEGER PRIMARY KEY, selected_width INTEGER, "
+            "selected_height INTEGER, frame_type VARCHAR, color VARCHAR(50), calculated_width INTEGER, "
+            "calculated_height INTEGER, wing_size INTEGER, rope_length INTEGER, net_size NUMERIC(10, 2), "
+            "created_at TIMESTAMP)"
+        ))
+        connection.execute(text(
+            "CREATE INDEX idx_window_calculations_created_at ON window_calculations(created_at)"
+        ))
+    return engine
+
+
+class TestMigrations:
+    """Test cases for the Alembic migrations"""
+    
+    def test_upgrade_replaces_created_at_index(self, tmp_path):
+        url = f"sqlite:///{tmp_path / 'migrations.db'}"
+        engine = create_init_sql_schema(url)
+        
+        command.upgrade(alembic_config(url), 'head')
+        indexes = {index['name'] for index in inspect(engine).get_indexes('window_calculations')}
+        assert indexes == {
+            'ix_window_calculations_created_at_id',
+            'ix_window_calculations_frame_type_color_created_at',
+            'ix_window_calculations_size',
+        }
+        columns = {column['name'] for column in inspect(engine).get_columns('window_calculations')}
+        assert {'quantity', 'rule_version', 'customer_name'} <= columns
+        
+        command.downgrade(alembic_config(url), 'base')
+        indexes = {index['name'] for index in inspect(engine).get_indexes('window_calculations')}
+        assert indexes == {'idx_window_calculations_created_at'}
+        engine.dispose()
+    
+    def test_upgrade_retries_until_database_is_reachable(self, tmp_path, monkeypatch):
+        url = f"sqlite:///{tmp_path / 'migrations.db'}"
+        engine = create_init_sql_schema(url)
+        upgrade_schema = migrations.upgrade_schema
+        attempts = []
+        
+        def flaky_upgrade(url):
+            attempts.append(url)
+            if len(attempts) < 3:
+                raise ConnectionRefusedError('database is down')
+            upgrade_schema(url)
+        
+        monkeypatch.setattr(migrations, 'upgrade_schema', flaky_upgrade)
+        asyncio.run(upgrade_when_available(url, interval=0))
+        assert len(attempts) == 3
+        columns = {column['name'] for column in inspect(engine).get_columns('window_calculations')}
+        assert {'quantity', 'rule_version', 'customer_name'} <= columns
+        engine.dispose()
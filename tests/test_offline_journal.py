@@ -0,0 +1,68 @@
+import asyncio
+import sqlite3
+import pytest
+from services.database_service import AsyncDatabaseService
+from services.offline_journal import OfflineJournal
+from tests.test_database_service import make_calculations
+
+
+def calculation_data(count):
+    return [{key: value for key, value in data.items() if key != 'created_at'} for data in make_calculations(count)]
+
+
+class TestOfflineJournal:
+    """Test cases for the offline write-behind journal"""
+    
+    def test_local_ids_are_negative_and_unique(self, tmp_path):
+        journal = OfflineJournal(str(tmp_path / 'journal.db'))
+        ids = [journal.record_insert(data) for data in calculation_data(3)]
+        
+        assert all(local_id < 0 for local_id in ids)
+        assert len(set(ids)) == 3
+        assert [local_id for local_id, _ in journal.pending_inserts()] == ids
+    
+    def test_survives_reopen(self, tmp_path):
+        path = str(tmp_path / 'journal.db')
+        journal = OfflineJournal(path)
+        journal.record_insert(calculation_data(1)[0])
+        journal.close()
+        
+        assert len(OfflineJournal(path)) == 1
+    
+    def test_deleting_local_row_cancels_insert(self, tmp_path):
+        journal = OfflineJournal(str(tmp_path / 'journal.db'))
+        local_ids = [journal.record_insert(data) for data in calculation_data(2)]
+        journal.record_delete([local_ids[0], 42])
+        
+        assert [local_id for local_id, _ in journal.pending_inserts()] == [local_ids[1]]
+        assert [calculation_id for _, calculation_id in journal.pending_deletes()] == [42]
+    
+    def test_failed_write_is_rolled_back(self, tmp_path):
+        journal = OfflineJournal(str(tmp_path / 'journal.db'))
+        local_ids = [journal.record_insert(data) for data in calculation_data(2)]
+        
+        with pytest.raises(sqlite3.Error):
+            journal._forget([-local_ids[0], object()])
+        
+        assert not journal._connection.in_transaction
+        assert [local_id for local_id, _ in journal.pending_inserts()] == local_ids
+        journal.record_delete([local_ids[0]])
+        assert len(journal) == 1
+    
+    def test_replay_in_batches(self, tmp_path, async_sqlite_engine):
+        journal = OfflineJournal(str(tmp_path / 'journal.db'))
+        
+        async def scenario():
+            stored = await AsyncDatabaseService.create_calculations(make_calculations(2))
+            for data in calculation_data(5):
+                journal.record_insert(data)
+            journal.record_delete([stored[0].id])
+            replayed = await journal.replay(batch_size=2)
+            return replayed, await AsyncDatabaseService.get_all_calculations()
+        
+        replayed, remaining = asyncio.run(scenario())
+        
+        assert replayed == 6
+        assert len(journal) == 0
+        assert len(remaining) == 6
+        assert all(calc.id > 0 for calc in remaining)
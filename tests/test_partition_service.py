@@ -0,0 +1,63 @@
+import gzip
+from datetime import datetime
+from services.database_service import DatabaseService
+from services.partition_service import (
+    PartitionManager,
+    add_months,
+    export_table,
+    month_start,
+    parse_month,
+    partition_month,
+    partition_name,
+)
+from tests.test_database_service import make_calculations
+
+
+class TestMonths:
+    """Test cases for the month arithmetic behind partition names"""
+    
+    def test_month_start_and_add_months(self):
+        month = month_start(datetime(2025, 11, 17, 13, 5))
+        assert month == datetime(2025, 11, 1)
+        assert add_months(month, 2) == datetime(2026, 1, 1)
+        assert add_months(month, -11) == datetime(2024, 12, 1)
+    
+    def test_partition_names(self):
+        assert partition_name(datetime(2025, 3, 1)) == 'window_calculations_2025_03'
+        assert partition_month('window_calculations_2025_03') == datetime(2025, 3, 1)
+        assert partition_month('window_calculations_default') is None
+    
+    def test_parse_month(self):
+        assert parse_month('2025-03') == datetime(2025, 3, 1)
+        assert parse_month('2025-13') is None
+        assert parse_month('../2025-03') is None
+
+
+class TestArchive:
+    """Test cases for exporting and reading back archived months"""
+    
+    def test_export_and_read_back(self, sqlite_engine, tmp_path):
+        DatabaseService.create_calculations(make_calculations(5))
+        manager = PartitionManager(sqlite_engine, str(tmp_path), retention_months=12)
+        month = datetime(2025, 1, 1)
+        
+        with sqlite_engine.connect() as connection:
+            assert export_table(connection, 'window_calculations', manager.archive_path(month)) == 5
+        with gzip.open(manager.archive_path(month), 'rt') as archive_file:
+            assert archive_file.readline().startswith('id,selected_width')
+        
+        calculations = list(manager.read_archive(month))
+        assert [calc.selected_width for calc in calculations] == [100, 101, 102, 103, 104]
+        assert calculations[0].created_at == datetime(2025, 1, 1)
+        assert calculations[1].net_size == 50.5
+        assert manager.list_archives() == [month]
+        assert not list(tmp_path.glob('*.part'))
+    
+    def test_unpartitioned_database_is_left_alone(self, sqlite_engine, tmp_path):
+        DatabaseService.create_calculations(make_calculations(2))
+        manager = PartitionManager(sqlite_engine, str(tmp_path), retention_months=1)
+        
+        assert manager.ensure_partitions() == []
+        assert manager.archive_expired(datetime(2030, 1, 1)) == []
+        assert len(DatabaseService.get_all_calculations()) == 2
+        assert manager.list_archives() == []
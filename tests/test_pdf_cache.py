@@ -0,0 +1,53 @@
+from config import TABLE_COLUMNS
+from services.pdf_cache import PdfCache, pdf_cache_key
+
+
+ROWS = [{'id': 1, 'selected_width': 800, 'selected_height': 1200, 'frame': '18mm', 'net': 400.0}]
+
+
+class TestPdfCacheKey:
+    """Test cases for content-addressed cache keys"""
+    
+    def test_same_content_same_key(self):
+        assert pdf_cache_key(ROWS, TABLE_COLUMNS, 'Marko') == pdf_cache_key([dict(ROWS[0])], TABLE_COLUMNS, 'Marko')
+    
+    def test_customer_and_rows_change_key(self):
+        key = pdf_cache_key(ROWS, TABLE_COLUMNS, 'Marko')
+        assert key != pdf_cache_key(ROWS, TABLE_COLUMNS, 'Ana')
+        assert key != pdf_cache_key([{**ROWS[0], 'net': 401.0}], TABLE_COLUMNS, 'Marko')
+
+
+class TestPdfCache:
+    """Test cases for the byte-bounded LRU cache"""
+    
+    def test_hit_and_miss(self):
+        cache = PdfCache(max_bytes=100)
+        cache.put('a', b'x' * 10)
+        assert cache.get('a') == b'x' * 10
+        assert cache.get('b') is None
+    
+    def test_evicts_least_recently_used(self):
+        cache = PdfCache(max_bytes=30)
+        cache.put('a', b'a' * 10)
+        cache.put('b', b'b' * 10)
+        cache.put('c', b'c' * 10)
+        cache.get('a')
+        cache.put('d', b'd' * 10)
+        
+        assert cache.get('b') is None
+        assert cache.get('a') is not None
+        assert cache.size == 30
+    
+    def test_replacing_entry_updates_size(self):
+        cache = PdfCache(max_bytes=100)
+        cache.put('a', b'a' * 10)
+        cache.put('a', b'a' * 20)
+        assert cache.size == 20
+        assert len(cache) == 1
+    
+    def test_oversized_document_not_cached(self):
+        cache = PdfCache(max_bytes=10)
+        cache.put('a', b'a' * 5)
+        cache.put('big', b'b' * 11)
+        assert cache.get('big') is None
+        assert cache.get('a') is not None
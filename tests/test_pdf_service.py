@@ -0,0 +1,171 @@
+import asyncio
+import os
+import pytest
+import subprocess
+import time
+import sys
+import tracemalloc
+from concurrent.futures.process import BrokenProcessPool
+from services.cutting_service import CuttingService
+from services.pdf_spool import PdfSpool
+import services.pdf_service as pdf_service
+from services.pdf_service import PdfRenderPool, PdfService, iter_row_chunks, merge_pdf_files
+
+
+ROWS = [{'id': 1, 'selected_width': 800, 'selected_height': 1200, 'frame': '18mm', 'color': 'Bjela',
+         'calculated_width': 770, 'calculated_height': 1170, 'wing': 1150, 'rope': 2400.0, 'net': 400.0}]
+
+
+def write_blank_pdf(path, pages=1, label='', padding=0):
+    """Write blank pages whose content streams hold `label` and the page number plus `padding` bytes"""
+    from pypdf import PdfWriter
+    from pypdf.generic import DecodedStreamObject, NameObject
+    writer = PdfWriter()
+    for number in range(pages):
+        page = writer.add_blank_page(width=100, height=100)
+        content = DecodedStreamObject()
+        content.set_data(f'% {label} {number}\n'.encode() + b' ' * padding)
+        page[NameObject('/Contents')] = writer._add_object(content)
+    with open(path, 'wb') as pdf_file:
+        writer.write(pdf_file)
+
+
+def page_count(path):
+    from pypdf import PdfReader
+    return len(PdfReader(path).pages)
+
+
+def page_labels(path):
+    from pypdf import PdfReader
+    return [page.get_contents().get_data().split(b'\n')[0].decode() for page in PdfReader(path, strict=True).pages]
+
+
+class InlinePool:
+    """Runs PDF jobs in the test process instead of a worker"""
+    
+    async def run(self, fn, *args):
+        return fn(*args)
+
+
+class TestPdfService:
+    """Test cases for rendering and lazy loading of the PDF dependencies"""
+    
+    def test_import_does_not_load_pdf_libraries(self):
+        code = ('import sys, services.pdf_service; '
+                'print([name for name in ("weasyprint", "pypdf", "jinja2") if name in sys.modules])')
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        assert result.stdout.strip() == '[]'
+    
+    def test_render_html(self):
+        html_out = PdfService.render_html(ROWS, 'Marko', timestamp='2026-01-01 10:00',
+                                          cut_plan=CuttingService.plan(ROWS, time_budget=0).to_dict())
+        assert 'Marko' in html_out
+        assert '2026-01-01 10:00' in html_out
+        assert '1170' in html_out
+    
+    def test_row_chunks_continue_with_rest(self):
+        async def rest():
+            yield [{'id': 5}]
+        
+        async def collect():
+            return [chunk async for chunk in iter_row_chunks([{'id': i} for i in range(4)], 3, rest=rest())]
+        
+        assert [[row['id'] for row in chunk] for chunk in asyncio.run(collect())] == [[0, 1, 2], [3], [5]]
+    
+    def test_cancelled_running_job_keeps_its_slot(self):
+        pool = PdfRenderPool(workers=1, max_pending=1)
+        
+        async def scenario():
+            await pool.run(time.sleep, 0)  # Start the worker process
+            task = asyncio.create_task(pool.run(time.sleep, 0.5))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            await asyncio.sleep(0)
+            held = pool.pending
+            while pool.pending:
+                await asyncio.sleep(0.05)
+            return held
+        
+        try:
+            assert asyncio.run(scenario()) == 1
+        finally:
+            pool.shutdown()
+    
+    def test_pool_is_replaced_after_a_worker_dies(self):
+        pool = PdfRenderPool(workers=1, max_pending=2)
+        
+        async def scenario():
+            with pytest.raises(BrokenProcessPool):
+                await pool.run(os._exit, 1)
+            return await pool.run(abs, -3)
+        
+        try:
+            assert asyncio.run(scenario()) == 3
+        finally:
+            pool.shutdown()
+
+
+class TestExportToSpool:
+    """Test cases for the chunked export of large reports, with layout stubbed out"""
+    
+    @pytest.fixture
+    def spool(self, tmp_path, monkeypatch):
+        spool = PdfSpool(str(tmp_path), max_bytes=10 ** 6, ttl=60)
+        laid_out = []
+        
+        def write_pdf_file(html_out, path):
+            laid_out.append(html_out)
+            # One page per row of the chunk
+            write_blank_pdf(path, pages=html_out.count('<tr') - 1)
+        
+        monkeypatch.setattr(pdf_service, 'pdf_spool', spool)
+        monkeypatch.setattr(pdf_service, 'pdf_pool', InlinePool())
+        monkeypatch.setattr(pdf_service, 'write_pdf_file', write_pdf_file)
+        spool.laid_out = laid_out
+        return spool
+    
+    def test_merges_chunks_and_removes_parts(self, spool, tmp_path):
+        rows = ROWS * 5
+        token = asyncio.run(PdfService.export_to_spool(iter_row_chunks(rows, 2), 'Marko'))
+        
+        assert len(spool.laid_out) == 3
+        assert ['Domaci prozori' in html for html in spool.laid_out] == [True, False, False]
+        assert ['Stranka: Marko' in html for html in spool.laid_out] == [False, False, True]
+        assert page_count(spool.get_path(token)) == 5
+        assert os.listdir(tmp_path) == [f'{token}.pdf']
+    
+    def test_failed_export_removes_parts(self, spool, tmp_path):
+        async def failing_chunks():
+            yield ROWS
+            yield ROWS
+            raise ConnectionError('database went away')
+        
+        with pytest.raises(ConnectionError):
+            asyncio.run(PdfService.export_to_spool(failing_chunks(), 'Marko'))
+        
+        assert len(spool.laid_out) == 1
+        assert os.listdir(tmp_path) == []
+    
+    def test_merge_pdf_files_concatenates_parts(self, tmp_path):
+        parts = [str(tmp_path / f'{pages}.pdf') for pages in (1, 2)]
+        for pages, part in zip((1, 2), parts):
+            write_blank_pdf(part, pages, label=f'part{pages}')
+        merge_pdf_files(parts, str(tmp_path / 'merged.pdf'))
+        
+        assert page_labels(str(tmp_path / 'merged.pdf')) == ['% part1 0', '% part2 0', '% part2 1']
+    
+    def test_merge_memory_does_not_grow_with_parts(self, tmp_path):
+        def peak_merging(count):
+            parts = [str(tmp_path / f'{count}-{index}.pdf') for index in range(count)]
+            for part in parts:
+                write_blank_pdf(part, 4, padding=100_000)
+            tracemalloc.start()
+            try:
+                merge_pdf_files(parts, str(tmp_path / f'merged-{count}.pdf'))
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        
+        # Holding every page, as a single PdfWriter does, would need about six times as much
+        assert peak_merging(12) < 1.5 * peak_merging(2)
+        assert page_count(str(tmp_path / 'merged-12.pdf')) == 48
@@ -0,0 +1,78 @@
+import os
+import time
+from services.pdf_spool import PdfSpool
+
+
+class TestPdfSpool:
+    """Test cases for the bounded PDF spool"""
+    
+    def test_add_and_get_path(self, tmp_path):
+        spool = PdfSpool(str(tmp_path), max_bytes=1000, ttl=60)
+        token = spool.add(b'%PDF-test')
+        
+        path = spool.get_path(token)
+        assert path is not None
+        with open(path, 'rb') as f:
+            assert f.read() == b'%PDF-test'
+    
+    def test_rejects_unknown_and_malformed_tokens(self, tmp_path):
+        spool = PdfSpool(str(tmp_path), max_bytes=1000, ttl=60)
+        assert spool.get_path('0' * 32) is None
+        assert spool.get_path('../../etc/passwd') is None
+    
+    def test_sweep_removes_expired(self, tmp_path):
+        spool = PdfSpool(str(tmp_path), max_bytes=1000, ttl=60)
+        old = spool.add(b'old')
+        new = spool.add(b'new')
+        past = time.time() - 120
+        os.utime(spool.get_path(old), (past, past))
+        
+        assert spool.get_path(old) is None
+        assert spool.sweep() == 1
+        assert spool.get_path(new) is not None
+        assert len(os.listdir(tmp_path)) == 1
+    
+    def test_sweep_enforces_size_limit_oldest_first(self, tmp_path):
+        spool = PdfSpool(str(tmp_path), max_bytes=25, ttl=60)
+        tokens = [spool.add(b'x' * 10) for _ in range(4)]
+        for age, token in zip((40, 30, 20, 10), tokens):
+            stamp = time.time() - age
+            os.utime(spool.get_path(token), (stamp, stamp))
+        
+        assert spool.sweep() == 2
+        assert spool.get_path(tokens[0]) is None
+        assert spool.get_path(tokens[1]) is None
+        assert spool.get_path(tokens[3]) is not None
+    
+    def test_part_is_served_only_after_publish(self, tmp_path):
+        spool = PdfSpool(str(tmp_path), max_bytes=1000, ttl=60)
+        part_path = spool.new_part()
+        with open(part_path, 'wb') as f:
+            f.write(b'%PDF-large')
+        
+        token = spool.publish(part_path)
+        assert not os.path.exists(part_path)
+        with open(spool.get_path(token), 'rb') as f:
+            assert f.read() == b'%PDF-large'
+    
+    def test_sweep_removes_abandoned_parts(self, tmp_path):
+        spool = PdfSpool(str(tmp_path), max_bytes=1000, ttl=60)
+        part_path = spool.new_part()
+        past = time.time() - 120
+        os.utime(part_path, (past, past))
+        
+        assert spool.sweep() == 1
+        assert not os.path.exists(part_path)
+    
+    def test_size_limit_keeps_parts_in_progress(self, tmp_path):
+        spool = PdfSpool(str(tmp_path), max_bytes=15, ttl=60)
+        part_path = spool.new_part()
+        with open(part_path, 'wb') as f:
+            f.write(b'x' * 10)
+        stamp = time.time() - 30
+        os.utime(part_path, (stamp, stamp))
+        token = spool.add(b'x' * 10)
+        
+        assert spool.sweep() == 1
+        assert os.path.exists(part_path)
+        assert spool.get_path(token) is None